@@ -0,0 +1,25 @@
+"""Performance benchmarks for sqlbuilder.smartsql.
+
+These modules are not a part of the distribution. Run them from the root of repository, for example::
+
+    python -m benchmarks.dispatch
+"""
+from __future__ import absolute_import, print_function
+import timeit
+
+__all__ = ('measure', 'report', )
+
+
+def measure(func, number=1000, repeat=5, setup='pass'):
+    """Returns the best time of a single call of func in seconds.
+
+    setup is called before each repeat out of timing. Use it to build new expressions,
+    since compiled fragments of the same expression objects are cached, see cached_compile().
+    """
+    timer = timeit.Timer(func, setup)
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def report(name, seconds, per=1, unit='op'):
+    """Prints the time of a single operation in human readable form."""
+    print("{0:<48} {1:>12.1f} ns/{2}".format(name, seconds / per * 1e9, unit))
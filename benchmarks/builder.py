@@ -0,0 +1,56 @@
+"""Typical chains of builder methods and queries derived from a base query.
+
+Every builder method returns a clone, which shares the unchanged clauses with the original query,
+and only the changed clause is copied. The lists of clauses are created on demand,
+so the memory of new query doesn't depend on the number of unused clauses.
+"""
+from __future__ import absolute_import, print_function
+import gc
+import tracemalloc
+
+from benchmarks import measure, report
+from benchmarks.compile_cache import build_query
+from sqlbuilder.smartsql import Q, T
+
+COUNT = 1000
+
+
+def chain(i):
+    a = T.author
+    return Q(a).fields(a.id, a.first_name, a.last_name).where(a.id > i).order_by(a.last_name).limit(10)
+
+
+def derived_size(base, derive):
+    """Returns memory held by COUNT queries derived from base, in bytes per query."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        derived = [derive(base, i) for i in range(COUNT)]
+        gc.collect()
+        return tracemalloc.get_traced_memory()[0] / len(derived)
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    base = build_query(0)
+    author = T.author
+    conditions = [author.id > i for i in range(COUNT)]
+    report("clone()", measure(lambda: [base.clone() for i in range(COUNT)], 1, 10), COUNT, 'query')
+    report("where() of base query", measure(lambda: [base.where(c) for c in conditions], 1, 10), COUNT, 'query')
+    report("limit() of base query", measure(lambda: [base.limit(i) for i in range(COUNT)], 1, 10), COUNT, 'query')
+    report("fields() appended to base query", measure(lambda: [base.fields(c) for c in conditions], 1, 10), COUNT, 'query')
+    report("chain of fields/where/order_by/limit", measure(lambda: [chain(i) for i in range(COUNT)], 1, 10), COUNT, 'query')
+    print("memory of new query: {0:.0f} bytes".format(
+        derived_size(author, lambda table, i: Q(table))
+    ))
+    print("memory of query derived by where(): {0:.0f} bytes".format(
+        derived_size(base, lambda q, i: q.where(conditions[i]))
+    ))
+    print("memory of query derived by fields(): {0:.0f} bytes".format(
+        derived_size(base, lambda q, i: q.fields(conditions[i]))
+    ))
+
+
+if __name__ == '__main__':
+    main()
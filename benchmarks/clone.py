@@ -0,0 +1,38 @@
+"""Compilation of clones of a base query, which differ only by WHERE and LIMIT.
+
+The clones share the field list, the join tree, GROUP BY and ORDER BY of the base query,
+so only the changed clauses are compiled.
+"""
+from __future__ import absolute_import, print_function
+
+from benchmarks import measure, report
+from benchmarks.compile_cache import build_query
+from benchmarks.dispatch import DIALECTS
+from sqlbuilder.smartsql import T
+
+
+def main():
+    for name, dialect_compile in DIALECTS:
+        base = build_query(0)
+        clones = []
+        fresh_queries = []
+
+        def build():
+            clones[:] = [base.where(T.book.id > i).limit(i) for i in range(100)]
+            fresh_queries[:] = [build_query(i) for i in range(100)]
+
+        def compiled_clones():
+            for q in clones:
+                dialect_compile(q)
+
+        def compiled():
+            for q in fresh_queries:
+                dialect_compile(q)
+
+        print("{0}:".format(name))
+        report("  compile new query", measure(compiled, 1, 20, build), len(fresh_queries), 'query')
+        report("  compile clone of base query", measure(compiled_clones, 1, 20, build), len(clones), 'query')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""Compilation of repeated query shapes with and without the shape-keyed CompileCache and specialized functions.
+
+Every call builds a query of the same shape with different parameters, like a typical web request does.
+"""
+from __future__ import absolute_import, print_function
+
+from benchmarks import measure, report
+from benchmarks.dispatch import DIALECTS
+from sqlbuilder.smartsql import CompileCache, Q, T, func, fingerprint
+
+
+def build_query(author_id):
+    a, b = T.author, T.book
+    return Q().tables(
+        (a & b).on(b.author_id == a.id)
+    ).fields(
+        a.id, a.first_name, a.last_name, func.Count(b.id).as_('book_count')
+    ).where(
+        (a.id > author_id) & (a.status == 'active') & b.title.startswith('Python')
+    ).group_by(
+        a.id, a.first_name, a.last_name
+    ).order_by(
+        a.last_name, a.first_name.desc()
+    ).limit(10)
+
+
+def main():
+    queries = [build_query(i) for i in range(100)]
+    report("fingerprint", measure(lambda: [fingerprint(q) for q in queries], 20), len(queries), 'query')
+    for name, dialect_compile in DIALECTS:
+        cache = CompileCache()
+
+        fresh_queries = []
+
+        def build():
+            fresh_queries[:] = [build_query(i) for i in range(100)]
+
+        def compiled():
+            for q in fresh_queries:
+                dialect_compile(q)
+
+        def compiled_again():
+            for q in queries:
+                dialect_compile(q)
+
+        def cached():
+            for q in queries:
+                cache(q, dialect_compile)
+
+        def specialized(specialized_compile=dialect_compile.specialize(queries[0])):
+            for q in queries:
+                specialized_compile(q)
+
+        print("{0}:".format(name))
+        report("  compile", measure(compiled, 1, 20, build), len(queries), 'query')
+        report("  compile again (cached fragments)", measure(compiled_again, 20), len(queries), 'query')
+        report("  compile via CompileCache", measure(cached, 20), len(queries), 'query')
+        report("  compile via Compiler.specialize()", measure(specialized, 20), len(queries), 'query')
+
+
+if __name__ == '__main__':
+    main()
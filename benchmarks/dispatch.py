@@ -0,0 +1,115 @@
+"""Per-node cost of handler dispatch and precedence lookup in Compiler.__call__().
+
+Compares the walk along cls.__mro__ over the merged registry (the behavior before the handler cache)
+with the memoized Compiler.get_handler() lookup, and the probing of expr.sql (the behavior before the
+precedence cache) with Compiler.get_inner_precedence(), for the base compiler and child dialect compilers.
+"""
+from __future__ import absolute_import, print_function
+import operator
+from functools import reduce
+
+from benchmarks import measure, report
+from sqlbuilder.smartsql import MAX_PRECEDENCE, Compiler, Error, Q, T, func, compile
+from sqlbuilder.smartsql.dialects.mysql import compile as mysql_compile
+from sqlbuilder.smartsql.dialects.sqlite import compile as sqlite_compile
+from django_sqlbuilder.dialects.sqlite import compile as django_sqlite_compile
+
+DIALECTS = (
+    ('postgres', compile),
+    ('mysql', mysql_compile),
+    ('sqlite', sqlite_compile),
+    ('django sqlite', django_sqlite_compile),
+)
+
+
+def build_query():
+    a, b = T.author, T.book
+    return Q().tables(
+        (a & b).on(b.author_id == a.id)
+    ).fields(
+        a.id, a.first_name, a.last_name, func.Count(b.id).as_('book_count')
+    ).where(
+        reduce(operator.and_, [(a.status == 'active'), (a.age > 18), b.title.startswith('Python')] +
+               [b.id != i for i in range(30)])
+    ).group_by(
+        a.id, a.first_name, a.last_name
+    ).order_by(
+        a.last_name, a.first_name.desc()
+    ).limit(10)
+
+
+class Recorder(Compiler):
+    """Records classes of all compiled nodes."""
+
+    def __init__(self, parent):
+        Compiler.__init__(self, parent)
+        self.classes = []
+        self.exprs = []
+
+    def __call__(self, expr, state=None):
+        if state is not None:
+            self.classes.append(expr.__class__)
+            self.exprs.append(expr)
+        return Compiler.__call__(self, expr, state)
+
+
+def walk_mro(compile, cls):
+    for c in cls.__mro__:
+        if c in compile._registry:
+            return compile._registry[c]
+    raise Error("Unknown compiler for {0}".format(cls))
+
+
+def probe_precedence(compile, expr):
+    cls = expr.__class__
+    if hasattr(expr, 'sql'):
+        try:
+            if (cls, expr.sql) in compile._precedence:
+                return compile._precedence[(cls, expr.sql)]
+            elif expr.sql in compile._precedence:
+                return compile._precedence[expr.sql]
+        except TypeError:
+            pass
+    if cls in compile._precedence:
+        return compile._precedence[cls]
+    return MAX_PRECEDENCE
+
+
+def main():
+    query = build_query()
+    for name, dialect_compile in DIALECTS:
+        recorder = Recorder(dialect_compile)
+        recorder(query)
+        classes = recorder.classes
+        exprs = recorder.exprs
+        get_handler = dialect_compile.get_handler
+        get_inner_precedence = dialect_compile.get_inner_precedence
+
+        def uncached():
+            for cls in classes:
+                walk_mro(dialect_compile, cls)
+
+        def cached():
+            for cls in classes:
+                get_handler(cls)
+
+        def probed():
+            for expr in exprs:
+                probe_precedence(dialect_compile, expr)
+
+        def precomputed():
+            for expr in exprs:
+                get_inner_precedence(expr)
+
+        print("{0}: {1} nodes".format(name, len(classes)))
+        report("  dispatch via __mro__ walk", measure(uncached, 200), len(classes), 'node')
+        report("  dispatch via handler cache", measure(cached, 200), len(classes), 'node')
+        report("  precedence via probing expr.sql", measure(probed, 200), len(exprs), 'node')
+        report("  precedence via precomputed table", measure(precomputed, 200), len(exprs), 'node')
+        queries = []
+        report("  compile query", measure(lambda: dialect_compile(queries[0]), 1, 200,
+                                          lambda: queries.__setitem__(slice(None), [build_query()])), 1, 'query')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,29 @@
+"""Compilation of IN predicate with 50k values.
+
+"IN" compiles every value as a node of the list, like In(expr, values) did before InList.
+"InList" repeats the placeholder of the first value, and "= ANY" passes the single array parameter.
+"""
+from __future__ import absolute_import, print_function
+
+from benchmarks import measure, report
+from sqlbuilder.smartsql import In, InList, InListCompiler, T, compile
+
+COUNT = 50000
+
+
+def main():
+    values = list(range(COUNT))
+    array_compile = compile.create_child()
+    array_compile.when(InList)(InListCompiler(array=True))
+    cases = (
+        ("IN", compile, lambda: In(T.author.id, values)),
+        ("InList", compile, lambda: T.author.id.in_(values)),
+        ("InList = ANY", array_compile, lambda: T.author.id.in_(values)),
+    )
+    for label, dialect_compile, build in cases:
+        exprs = []
+        report(label, measure(lambda: dialect_compile(exprs.pop()), 1, 5, lambda: exprs.append(build())), COUNT, 'value')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+"""Memory of a catalog of prebuilt queries, without and with interning of leaf nodes, see Interner.
+
+Every query of catalog is built separately, like queries of a catalog declared in many modules,
+so identical names, tables and fields are different objects until they are interned.
+"""
+from __future__ import absolute_import, print_function
+import gc
+import tracemalloc
+
+from sqlbuilder.smartsql import Interner, Q, Table, func
+
+COUNT = 2000
+
+
+def build(i):
+    a, b = Table('author'), Table('book')
+    return Q().tables(
+        (a & b).on(b.author_id == a.id)
+    ).fields(
+        a.id, a.first_name, a.last_name, b.title, func.Count(b.id).as_('book_count')
+    ).where(
+        (a.status == 'active') & (b.pub_date > i)
+    ).group_by(
+        a.id, a.first_name, a.last_name, b.title
+    ).order_by(
+        a.last_name, a.first_name
+    )
+
+
+def catalog_size(intern=None):
+    """Returns memory held by the catalog of COUNT queries, in bytes."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        catalog = [build(i) for i in range(COUNT)]
+        if intern is not None:
+            catalog = [intern(query) for query in catalog]
+        gc.collect()
+        return tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    before = catalog_size()
+    intern = Interner()
+    after = catalog_size(intern)
+    print("{0:<48} {1:>12.1f} bytes/query".format("catalog", before / float(COUNT)))
+    print("{0:<48} {1:>12.1f} bytes/query".format("interned catalog", after / float(COUNT)))
+    print("{0:<48} {1:>12d} nodes".format("pool of interner", len(intern)))
+
+
+if __name__ == '__main__':
+    main()
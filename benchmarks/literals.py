@@ -0,0 +1,53 @@
+"""Compilation of predicate-heavy queries with inline literals, like startswith(), contains() and endswith().
+
+Every such predicate has literals Value('%') and the escape character of EscapeForLike.
+"sequential" compiles the literals by str.replace() one by one, like ValueCompiler did before.
+"""
+from __future__ import absolute_import, print_function
+from functools import reduce
+import operator
+
+from benchmarks import measure, report
+from benchmarks.dispatch import DIALECTS
+from sqlbuilder.smartsql import Q, T, Value, ValueCompiler
+
+COUNT = 100
+
+
+class SequentialValueCompiler(ValueCompiler):
+
+    def __call__(self, compile, expr, state):
+        state.sql.append(self._delimiter)
+        value = str(expr.value)
+        value = value.replace(self._delimiter, self._escape_delimiter + self._delimiter)
+        for k, v in self._translation_mapping:
+            value = value.replace(k, v)
+        state.sql.append(value)
+        state.sql.append(self._delimiter)
+
+
+def build_query():
+    a = T.author
+    predicates = []
+    for i in range(COUNT):
+        predicates.append(a.first_name.startswith('a{0}'.format(i)))
+        predicates.append(a.last_name.contains('b'))
+        predicates.append(a.email.endswith('@example.com'))
+    return Q(a).fields(a.id).where(reduce(operator.or_, predicates))
+
+
+def main():
+    for name, dialect_compile in DIALECTS:
+        compile_value = dialect_compile.get_handler(Value)
+        sequential = dialect_compile.create_child()
+        sequential.when(Value)(SequentialValueCompiler(
+            delimiter=compile_value._delimiter, escape_delimiter=compile_value._escape_delimiter
+        ))
+        for label, compile_ in ((name, dialect_compile), ("{0} sequential".format(name), sequential)):
+            queries = []
+            report(label, measure(lambda: compile_(queries.pop()), 1, 20, lambda: queries.append(build_query())),
+                   COUNT * 3, 'predicate')
+
+
+if __name__ == '__main__':
+    main()
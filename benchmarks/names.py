@@ -0,0 +1,59 @@
+"""Quoting of names by NameCompiler of every dialect.
+
+"cached" quotes the same names again, like every compilation does,
+"not cached" clears the cache of quoted names before each call,
+and "sequential" applies the delimiter and the translation mapping by str.replace() one by one,
+like NameCompiler did before.
+"""
+from __future__ import absolute_import, print_function
+
+from benchmarks import measure, report
+from sqlbuilder.smartsql import Name, NameCompiler, State
+
+NAMES = ['id', 'first_name', 'last_name', 'author_id', 'book', 'title', 'pub_date', 'weird"name', '50%']
+
+COMPILERS = (
+    ('base', NameCompiler()),
+    ('mysql', NameCompiler(delimiter='`', escape_delimiter='`', max_length=64)),
+    ('sqlite', NameCompiler(delimiter='`', escape_delimiter='`')),
+)
+
+
+def replace_sequentially(compile_name, name):
+    name = name.replace(compile_name._delimiter, compile_name._escape_delimiter + compile_name._delimiter)
+    for k, v in compile_name._translation_mapping:
+        name = name.replace(k, v)
+    return name
+
+
+def main():
+    names = [Name(name) for name in NAMES]
+    state = State()
+
+    for label, compile_name in COMPILERS:
+        def cached():
+            for name in names:
+                compile_name(None, name, state)
+            del state.sql[:]
+
+        def not_cached():
+            for name in names:
+                compile_name._cache.clear()
+                compile_name(None, name, state)
+            del state.sql[:]
+
+        def sequential():
+            for name in names:
+                delimiter = compile_name._delimiter
+                state.sql.append(delimiter)
+                state.sql.append(replace_sequentially(compile_name, name.name))
+                state.sql.append(delimiter)
+            del state.sql[:]
+
+        report("{0} cached".format(label), measure(cached, 10000), len(names), 'name')
+        report("{0} not cached".format(label), measure(not_cached, 10000), len(names), 'name')
+        report("{0} sequential".format(label), measure(sequential, 10000), len(names), 'name')
+
+
+if __name__ == '__main__':
+    main()
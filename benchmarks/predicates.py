@@ -0,0 +1,68 @@
+"""Building of 100k predicates by operators of Operable, like T.author.age > 18 or T.author.name.like('a%').
+
+The operators are dispatched by the table of operations of datatype, without datatype(expr) delegate per operation.
+The "via delegate" lines reproduce the dispatch before the table of operations: Operable allocated
+the delegate datatype(expr) per operation, and the delegate resolved the operator by tuple(map(datatypeof, operands)).
+"""
+from __future__ import absolute_import, print_function
+
+from benchmarks import measure, report
+from sqlbuilder.smartsql import OPERATOR, T, datatypeof
+from sqlbuilder.smartsql.operator_registry import operator_registry
+from sqlbuilder.smartsql.utils import Undef, is_list
+
+COUNT = 100000
+
+
+class Delegate(object):
+    """Datatype delegate, like BaseType before the table of operations."""
+    __slots__ = ('_expr',)
+
+    def __init__(self, expr):
+        self._expr = expr
+
+    def _op(self, operator, operands, *args, **kwargs):
+        expression_factory = operator_registry.get(operator, tuple(map(datatypeof, operands)))[1]
+        return expression_factory(*(operands + args), **kwargs)
+
+    def __and__(self, other):
+        return self._op(OPERATOR.AND, (self._expr, other))
+
+    def __gt__(self, other):
+        return self._op(OPERATOR.GT, (self._expr, other))
+
+    def __eq__(self, other):
+        if other is None:
+            return self.is_(None)
+        if is_list(other):
+            return self.in_(other)
+        return self._op(OPERATOR.EQ, (self._expr, other))
+
+    def is_(self, other):
+        return self._op(OPERATOR.IS, (self._expr, other))
+
+    def in_(self, other):
+        return self._op(OPERATOR.IN, (self._expr, other))
+
+    def like(self, other, escape=Undef):
+        return self._op(OPERATOR.LIKE, (self._expr, other), escape=escape)
+
+
+def main():
+    age, name = T.author.age, T.author.name
+    values = list(range(COUNT))
+    cases = (
+        ("==", lambda: [age == i for i in values], lambda: [Delegate(age).__eq__(i) for i in values]),
+        (">", lambda: [age > i for i in values], lambda: [Delegate(age).__gt__(i) for i in values]),
+        ("like()", lambda: [name.like('a%') for i in values], lambda: [Delegate(name).like('a%') for i in values]),
+        ("in_()", lambda: [age.in_((i, 1)) for i in values], lambda: [Delegate(age).in_((i, 1)) for i in values]),
+        ("& of two predicates", lambda: [(age > i) & (name == 'a') for i in values],
+         lambda: [Delegate(Delegate(age).__gt__(i)).__and__(Delegate(name).__eq__('a')) for i in values]),
+    )
+    for label, direct, delegated in cases:
+        report("{0}".format(label), measure(direct, 1, 5), COUNT, 'predicate')
+        report("{0} via delegate".format(label), measure(delegated, 1, 5), COUNT, 'predicate')
+
+
+if __name__ == '__main__':
+    main()
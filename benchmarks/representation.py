@@ -0,0 +1,27 @@
+"""repr() of a large Insert and of a Select with a long IN list, with the default budget of expr_repr and without limits.
+
+The budgeted representation stops compilation when the SQL is longer than Representer.max_length,
+the unlimited one compiles the whole SQL, like expr_repr did before.
+"""
+from __future__ import absolute_import, print_function
+
+from benchmarks import measure, report
+from sqlbuilder.smartsql import Insert, Q, Representer, T, expr_repr
+
+ROWS = 10000
+
+
+def main():
+    author = T.author
+    insert = Insert(author, fields=('id', 'name', 'age'), values=[(i, 'name', i) for i in range(ROWS)])
+    select = Q(author).fields(author.id).where(author.id.in_(list(range(ROWS))) & (author.age > 18))
+    unlimited = Representer(max_length=None, max_params=None, max_seconds=None)
+    not_compiled = Representer(compiled=False)
+    for label, expr in (("Insert of {0} rows".format(ROWS), insert), ("Select with IN of {0} values".format(ROWS), select)):
+        report("{0}, budgeted".format(label), measure(lambda: expr_repr(expr), 10, 5), 1, 'repr')
+        report("{0}, unlimited".format(label), measure(lambda: unlimited(expr), 10, 5), 1, 'repr')
+        report("{0}, not compiled".format(label), measure(lambda: not_compiled(expr), 10, 5), 1, 'repr')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,35 @@
+"""Compilation of nested subqueries, which save and restore the most of compilation State.
+
+Every subquery compiles its FROM clause into separate lists and restores the outer ones,
+so the cost of State handling grows with the depth of nesting.
+"""
+from __future__ import absolute_import, print_function
+
+from benchmarks import measure, report
+from benchmarks.dispatch import DIALECTS
+from sqlbuilder.smartsql import Q, T
+
+
+def build_query(depth):
+    q = Q(T.t0).fields(T.t0.id).where(T.t0.status == 'active')
+    for i in range(1, depth + 1):
+        t = getattr(T, 't{0:d}'.format(i))
+        q = Q(t).fields(t.id, t.name).where((t.parent_id.in_(q)) & (t.level > i))
+    return q
+
+
+def main():
+    for depth in (1, 5, 20):
+        queries = []
+
+        def build(depth=depth):
+            queries[:] = [build_query(depth)]
+
+        print("depth {0:d}:".format(depth))
+        for name, dialect_compile in DIALECTS:
+            report("  {0}".format(name), measure(lambda: dialect_compile(queries[0]), 1, 200, build),
+                   depth + 1, 'subquery')
+
+
+if __name__ == '__main__':
+    main()
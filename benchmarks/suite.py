@@ -0,0 +1,176 @@
+"""Compile throughput of realistic workloads for the base compiler and child dialect compilers.
+
+Reports compiled expressions per second, cost per compiled node and peak memory allocated by compilation,
+and writes them to a JSON baseline, which can be compared with baseline of other release::
+
+    python -m benchmarks.suite --output baseline-0.7.10.json
+    python -m benchmarks.suite --compare baseline-0.7.10.json
+
+Every compilation gets a new expression, since compiled fragments of the same expression objects are cached.
+"""
+from __future__ import absolute_import, print_function
+import argparse
+import gc
+import json
+import operator
+import platform
+import tracemalloc
+from functools import reduce
+
+from benchmarks import measure
+from benchmarks.dispatch import Recorder
+from sqlbuilder.smartsql import Case, Error, Insert, Intersect, Q, T, Union, compile
+from sqlbuilder.smartsql.dialects.cassandra import compile as cassandra_compile
+from sqlbuilder.smartsql.dialects.mysql import compile as mysql_compile
+from sqlbuilder.smartsql.dialects.sqlite import compile as sqlite_compile
+
+COMPILERS = (
+    ('base', compile),
+    ('mysql', mysql_compile),
+    ('sqlite', sqlite_compile),
+    ('cassandra', cassandra_compile),
+)
+
+
+def wide_select():
+    a, b, p, c = T.author, T.book, T.publisher, T.category
+    return Q().tables(
+        (a & b).on(b.author_id == a.id) + p.on(p.id == b.publisher_id) + c.on(c.id == b.category_id)
+    ).fields(
+        [getattr(t, 'field{0:d}'.format(i)) for t in (a, b, p, c) for i in range(25)]
+    ).where(
+        (a.status == 'active') & (b.price > 10) & p.name.startswith('A') & c.id.in_((1, 2, 3))
+    ).order_by(a.last_name, b.title.desc()).limit(20)
+
+
+def in_list():
+    return Q(T.book).fields(T.book.id).where(T.book.id.in_(list(range(10000))))
+
+
+def and_chain():
+    return Q(T.book).fields(T.book.id).where(reduce(operator.and_, [T.book.id != i for i in range(2000)]))
+
+
+def insert():
+    fields = ('id', 'title', 'author_id', 'price', 'status')
+    return Insert(T.book, fields=fields, values=[(i, 'title', i % 100, i * 1.5, 'new') for i in range(10000)])
+
+
+def nested_sets():
+    query = Q(T.t0).fields(T.t0.id).where(T.t0.id > 0)
+    for i in range(1, 21):
+        t = getattr(T, 't{0:d}'.format(i))
+        other = Q(t).fields(t.id).where(t.id > i)
+        query = Union(query, other) if i % 2 else Intersect(query, other)
+    return query
+
+
+def case_projection():
+    b = T.book
+    return Q(b).fields([
+        Case([(b.status == j, 'status{0:d}'.format(j)) for j in range(10)], default='other').as_('c{0:d}'.format(i))
+        for i in range(20)
+    ])
+
+
+WORKLOADS = (
+    ('wide_select', wide_select),
+    ('in_list', in_list),
+    ('and_chain', and_chain),
+    ('insert', insert),
+    ('nested_sets', nested_sets),
+    ('case_projection', case_projection),
+)
+
+
+def count_nodes(dialect_compile, build):
+    recorder = Recorder(dialect_compile)
+    recorder(build())
+    return len(recorder.classes)
+
+
+def peak_memory(dialect_compile, build, repeat=3):
+    """Returns the peak of memory allocated by compilation, in bytes, the lowest of repeat compilations."""
+    peaks = []
+    for _ in range(repeat):
+        expr = build()
+        gc.collect()
+        tracemalloc.start()
+        try:
+            dialect_compile(expr)
+            peaks.append(tracemalloc.get_traced_memory()[1])
+        finally:
+            tracemalloc.stop()
+    return min(peaks)
+
+
+def run_workload(dialect_compile, build, repeat):
+    try:
+        nodes = count_nodes(dialect_compile, build)
+    except (Error, NotImplementedError) as e:
+        return {'error': str(e) or type(e).__name__}
+    exprs = []
+    seconds = measure(lambda: dialect_compile(exprs[0]), 1, repeat, lambda: exprs.__setitem__(slice(None), [build()]))
+    return {
+        'ops_per_sec': round(1 / seconds, 2),
+        'ns_per_node': round(seconds / nodes * 1e9, 1),
+        'nodes': nodes,
+        'peak_bytes': peak_memory(dialect_compile, build),
+    }
+
+
+def run(repeat=5):
+    results = {}
+    for workload, build in WORKLOADS:
+        results[workload] = {}
+        for name, dialect_compile in COMPILERS:
+            results[workload][name] = run_workload(dialect_compile, build, repeat)
+    return {
+        'python': platform.python_implementation() + ' ' + platform.python_version(),
+        'platform': platform.platform(),
+        'repeat': repeat,
+        'results': results,
+    }
+
+
+def print_results(baseline, previous=None):
+    print("{0} on {1}".format(baseline['python'], baseline['platform']))
+    print("{0:<28} {1:>14} {2:>12} {3:>8} {4:>12}".format('', 'ops/s', 'ns/node', 'nodes', 'peak bytes'))
+    for workload, _ in WORKLOADS:
+        print(workload)
+        for name, _ in COMPILERS:
+            result = baseline['results'][workload][name]
+            if 'error' in result:
+                print("  {0:<26} {1}".format(name, result['error']))
+                continue
+            line = "  {0:<26} {ops_per_sec:>14.1f} {ns_per_node:>12.1f} {nodes:>8d} {peak_bytes:>12d}".format(
+                name, **result
+            )
+            old = previous and previous['results'].get(workload, {}).get(name)
+            if old and 'error' not in old:
+                line += "  {0:>+7.1%} ops/s {1:>+7.1%} peak".format(
+                    result['ops_per_sec'] / old['ops_per_sec'] - 1, result['peak_bytes'] / float(old['peak_bytes']) - 1
+                )
+            print(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--output', help="write the baseline to JSON file")
+    parser.add_argument('--compare', help="compare with the baseline from JSON file")
+    parser.add_argument('--repeat', type=int, default=5, help="the best of REPEAT compilations is taken")
+    args = parser.parse_args(argv)
+    previous = None
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)
+    baseline = run(args.repeat)
+    print_results(baseline, previous)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write('\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+"""Throughput of compilation from 1 to N threads.
+
+Every thread compiles its own queries of the shape of benchmarks.compile_cache.
+The throughput scales with the number of threads only on free-threaded CPython (3.13t and newer),
+with GIL the total throughput stays about the same.
+"""
+from __future__ import absolute_import, print_function
+import os
+import sys
+import threading
+import time
+
+from benchmarks.compile_cache import build_query
+from sqlbuilder.smartsql import compile
+
+
+def run(threads, queries_per_thread=2000):
+    """Returns the number of compiled queries per second of all threads together."""
+    barrier = threading.Barrier(threads + 1)
+
+    def worker():
+        # New queries, since compiled fragments of the same query are cached.
+        queries = [build_query(i % 100) for i in range(queries_per_thread)]
+        barrier.wait()
+        for q in queries:
+            compile(q)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for worker_thread in workers:
+        worker_thread.start()
+    barrier.wait()
+    start = time.time()
+    for worker_thread in workers:
+        worker_thread.join()
+    return threads * queries_per_thread / (time.time() - start)
+
+
+def main():
+    gil = getattr(sys, '_is_gil_enabled', lambda: True)()
+    print("GIL {0}, {1} CPU".format("enabled" if gil else "disabled", os.cpu_count()))
+    single = None
+    for threads in (1, 2, 4, 8):
+        throughput = run(threads)
+        single = single or throughput
+        print("{0:d} threads {1:>36.0f} queries/s {2:>8.2f}x".format(threads, throughput, throughput / single))
+
+
+if __name__ == '__main__':
+    main()
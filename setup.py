@@ -11,7 +11,7 @@ setup(
     name = app_name,
     version = '0.7.10.18',
 
-    packages = find_packages(),
+    packages = find_packages(exclude=('benchmarks', 'benchmarks.*')),
     include_package_data=True,
 
     author = "Ivan Zakrevsky and contributors",
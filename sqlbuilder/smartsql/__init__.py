@@ -4,27 +4,32 @@
 # of Storm ORM http://bazaar.launchpad.net/~storm/storm/trunk/view/head:/storm/expr.py
 from __future__ import absolute_import
 
-from sqlbuilder.smartsql.compiler import Compiler, State, cached_compile, compile
+from sqlbuilder.smartsql.compiler import Compiler, State, Prepared, cached_compile, compile
+from sqlbuilder.smartsql.codegen import Specialized
 from sqlbuilder.smartsql.constants import CONTEXT, DEFAULT_DIALECT, LOOKUP_SEP, MAX_PRECEDENCE, OPERATOR, PLACEHOLDER
 from sqlbuilder.smartsql.exceptions import Error, MaxLengthError, OperatorNotFound
 from sqlbuilder.smartsql.expressions import (
     Operable, Expr, ExprList, CompositeExpr, Param, Parentheses, OmitParentheses,
     Callable, NamedCallable, Constant, ConstantSpace, Case, Cast, Concat,
-    Alias, Name, NameCompiler, Value, ValueCompiler, Array, ArrayItem,
-    expr_repr, datatypeof, const, func, compile_exprlist
+    Alias, Name, Quoter, NameCompiler, Value, ValueCompiler, Array, ArrayItem,
+    Representer, expr_repr, datatypeof, const, func, compile_exprlist
 )
 from sqlbuilder.smartsql.factory import factory, Factory
+from sqlbuilder.smartsql.fingerprint import (
+    Fingerprinter, FingerprintState, StructuralKey, CompileCache, fingerprint, structural_key, compile_cache
+)
 from sqlbuilder.smartsql.fields import MetaFieldSpace, F, MetaField, Field, Subfield, FieldList
 from sqlbuilder.smartsql.operator_registry import OperatorRegistry, operator_registry
 from sqlbuilder.smartsql.operators import (
-    Binary, NamedBinary, NamedCompound, Add, Sub, Mul, Div, Gt, Lt, Ge, Le, And, Or,
-    Eq, Ne, Is, IsNot, In, NotIn, RShift, LShift, EscapeForLike, Like, ILike,
+    Binary, NamedBinary, NamedCompound, NamedFlatCompound, Add, Sub, Mul, Div, Gt, Lt, Ge, Le, And, Or,
+    Eq, Ne, Is, IsNot, In, NotIn, InList, NotInList, InListCompiler, RShift, LShift, EscapeForLike, Like, ILike,
     Ternary, NamedTernary, Between, NotBetween,
     Prefix, NamedPrefix, Not, All, Distinct, Exists,
     Unary, NamedUnary, Pos, Neg,
     Postfix, NamedPostfix, OrderDirection, Asc, Desc,
-    compile_binary
+    compile_binary, compile_binary_chain, is_deep_binary
 )
+from sqlbuilder.smartsql.profiler import Profiler
 from sqlbuilder.smartsql.pycompat import str, string_types
 from sqlbuilder.smartsql.tables import (
     MetaTableSpace, T, MetaTable, FieldProxy, Table, TableAlias, TableJoin,
@@ -37,6 +42,9 @@ from sqlbuilder.smartsql.queries import (
     Modify, Insert, Update, Delete,
     Set, Union, Intersect, Except,
 )
+from sqlbuilder.smartsql.interning import Interner
+from sqlbuilder.smartsql.simplifier import Simplifier, simplify
+from sqlbuilder.smartsql.visitor import Children, Visitor, Transformer, children, walk, replace
 
 SPACE = " "
 Placeholder = Param
@@ -62,7 +70,7 @@ compile.set_precedence(180, '#')
 compile.set_precedence(170, '|')
 compile.set_precedence(160, Is, 'IS')
 compile.set_precedence(150, (Postfix, 'ISNULL'), (Postfix, 'NOTNULL'))
-compile.set_precedence(140, '(any other)')  # all other native and user-defined operators
+compile.set_precedence(140, '(any other)', Binary)  # all other native and user-defined operators
 compile.set_precedence(130, In, NotIn, 'IN')
 compile.set_precedence(120, Between, 'BETWEEN')
 compile.set_precedence(110, 'OVERLAPS')
@@ -0,0 +1,234 @@
+"""Compile functions specialized for a shape of expression tree, see Compiler.specialize()."""
+from __future__ import absolute_import
+import re
+from sqlbuilder.smartsql.pycompat import string_types
+from sqlbuilder.smartsql.fingerprint import Fingerprinter, FingerprintState, fingerprint, _is_same
+
+__all__ = ('Specialized', 'specialize', )
+
+IDENTIFIER = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+
+class Specialized(object):
+    """Compile function specialized for a shape of expression tree.
+
+    The SQL is compiled once, and the parameters are read from a new tree of the same shape
+    by generated Python code, without handlers. The shape of the new tree is not checked,
+    use fingerprint() or CompileCache if the shape is not known in advance.
+
+    If the shape can not be specialized, for example handler transforms parameters,
+    or the same object is used twice in a node, then the expression is compiled in usual way.
+    """
+    __slots__ = ('compile', 'shape', 'sql', 'source', '_extract')
+
+    def __init__(self, compile, shape, sql=None, source=None, extract=None):
+        self.compile = compile
+        self.shape = shape
+        self.sql = sql
+        self.source = source
+        self._extract = extract
+
+    def __call__(self, expr):
+        """Returns tuple with SQL string and list of parameters, like Compiler.__call__()."""
+        if self._extract is None:
+            return self.compile(expr)
+        return self.sql, self._extract(expr)
+
+    def __repr__(self):
+        return "<{0}: {1}>".format(type(self).__name__, self.sql)
+
+
+def specialize(compile, expr):
+    """Returns the compile function generated for the shape of expr, see Compiler.specialize().
+
+    :param compile: Compiler of dialect
+    :type compile: Compiler
+    :param expr: sample expression of the shape
+    :type expr: Expr
+    :rtype: Specialized
+    """
+    cache = compile._specialized  # is replaced on registration of handlers
+    shape = fingerprint(expr)
+    try:
+        return cache[shape]
+    except KeyError:
+        pass
+    state = _TracingState()
+    specialized = _generate(compile, expr, shape, state)
+    # Another sample of the same shape can be traced if this one has the same object in several places.
+    if not state.ambiguous and len(cache) < compile.max_specialized:
+        cache[shape] = specialized
+    return specialized
+
+
+def _generate(compile, expr, shape, state):
+    try:
+        _Tracer(fingerprint)(expr, state)
+    except (_Untraceable, RuntimeError):  # RecursionError is RuntimeError
+        return Specialized(compile, shape)
+    sql, params = compile(expr)
+    if not _is_same(params, state.values):
+        return Specialized(compile, shape)
+    source = _generate_source(state.paths)
+    namespace = {}
+    exec(source, namespace)
+    extract = namespace['extract']
+    if not _is_same(extract(expr), params):
+        return Specialized(compile, shape)
+    return Specialized(compile, shape, sql, source, extract)
+
+
+class _Untraceable(Exception):
+    pass
+
+
+_AMBIGUOUS = object()
+
+
+class _TracingState(FingerprintState):
+    __slots__ = ('nodes', 'paths', 'claimed', 'ambiguous', )
+
+    def __init__(self):
+        FingerprintState.__init__(self)
+        self.nodes = []  # stack of visited nodes with their paths from the root
+        self.paths = []  # paths of state.values
+        self.claimed = set()
+        self.ambiguous = False
+
+
+class _Tracer(Fingerprinter):
+    """Fingerprinter which finds the path of each extracted value in expression tree.
+
+    Handlers of the given fingerprinter are wrapped, so handlers like fingerprint_binary()
+    don't shortcut nested nodes, and every node is visited through __call__().
+    """
+
+    def __init__(self, fingerprinter):
+        Fingerprinter.__init__(self)
+        self._fingerprinter = fingerprinter
+
+    def __call__(self, expr, state=None):
+        if state.nodes:
+            self._resolve(state)
+            owner, owner_path = state.nodes[-1]
+            path = _find_path(owner, owner_path, expr, state)
+        else:
+            path = ()
+        state.nodes.append((expr, path))
+        Fingerprinter.__call__(self, expr, state)
+        self._resolve(state)
+        state.nodes.pop()
+
+    def get_handler(self, cls):
+        handlers = self._handlers
+        try:
+            return handlers[cls]
+        except KeyError:
+            pass
+        handler = self._fingerprinter.get_handler(cls)
+
+        def traced(fingerprint, expr, state):
+            handler(fingerprint, expr, state)
+
+        handlers[cls] = traced
+        return traced
+
+    @staticmethod
+    def _resolve(state):
+        """Finds paths of the values which were extracted by the current node itself."""
+        owner, owner_path = state.nodes[-1]
+        for value in state.values[len(state.paths):]:
+            if value is owner:
+                path = owner_path
+            else:
+                path = _find_path(owner, owner_path, value, state)
+            if path is None or path is _AMBIGUOUS:
+                state.ambiguous = path is _AMBIGUOUS
+                raise _Untraceable(value)
+            state.paths.append(path)
+
+
+def _find_path(parent, parent_path, target, state, depth=3):
+    """Returns path of target among the nearest descendants of parent.
+
+    Returns None if the target is not found,
+    or _AMBIGUOUS if the same object is found more than once on the same depth.
+    """
+    if parent_path is None or parent_path is _AMBIGUOUS:
+        return parent_path
+    level = [((), parent)]
+    for _ in range(depth):
+        found = []
+        next_level = []
+        for path, obj in level:
+            for step, child in _iter_children(obj):
+                if child is target:
+                    found.append(parent_path + path + (step,))
+                else:
+                    next_level.append((path + (step,), child))
+        if found:
+            found = [path for path in found if path not in state.claimed]
+            if len(found) != 1:
+                return _AMBIGUOUS
+            state.claimed.add(found[0])
+            return found[0]
+        level = next_level
+    return None
+
+
+def _iter_children(obj):
+    if isinstance(obj, (list, tuple)):
+        for i, item in enumerate(obj):
+            yield i, item
+        return
+    if isinstance(obj, type):
+        return
+    for cls in type(obj).__mro__:
+        slots = cls.__dict__.get('__slots__', ())
+        if isinstance(slots, string_types):
+            slots = (slots,)
+        for name in slots:
+            if name in ('__dict__', '__weakref__'):
+                continue
+            if name.startswith('__') and not name.endswith('__'):
+                name = '_{0}{1}'.format(cls.__name__.lstrip('_'), name)
+            try:
+                yield name, cls.__dict__[name].__get__(obj, cls)
+            except (KeyError, AttributeError):
+                pass
+    try:
+        attrs = object.__getattribute__(obj, '__dict__')
+    except AttributeError:
+        return
+    for name, value in list(attrs.items()):
+        if IDENTIFIER.match(name):
+            yield name, value
+
+
+def _generate_source(paths):
+    """Returns the source of function which reads the values by paths, the branching prefixes are read once."""
+    branches = {}
+    for path in paths:
+        for i in range(1, len(path)):
+            branches.setdefault(path[:i], set()).add(path[i])
+    names = {(): 'expr'}
+    lines = ["def extract(expr):"]
+
+    def access(path):
+        i = len(path)
+        while path[:i] not in names:
+            i -= 1
+        code = names[path[:i]]
+        for step in path[i:]:
+            code += '[{0:d}]'.format(step) if isinstance(step, int) else '.' + step
+        return code
+
+    for path in paths:
+        for i in range(1, len(path)):
+            prefix = path[:i]
+            if len(branches[prefix]) > 1 and prefix not in names:
+                name = '_{0:d}'.format(len(names))
+                lines.append("    {0} = {1}".format(name, access(prefix)))
+                names[prefix] = name
+    lines.append("    return [{0}]".format(', '.join(access(path) for path in paths)))
+    return '\n'.join(lines) + '\n'
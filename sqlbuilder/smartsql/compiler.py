@@ -1,13 +1,31 @@
 import copy
+import threading
 import weakref
 from functools import wraps
 from sqlbuilder.smartsql.constants import CONTEXT, MAX_PRECEDENCE
 from sqlbuilder.smartsql.exceptions import Error
+from sqlbuilder.smartsql.pycompat import string_types
+from sqlbuilder.smartsql.utils import is_list
 
-__all__ = ('Compiler', 'State', 'cached_compile', 'compile', )
+__all__ = ('Compiler', 'State', 'Prepared', 'cached_compile', 'compile', )
+
+
+_MISSING = object()
+
+# Registration is rare, so one lock is shared by all compilers, it also guards the tree of compilers.
+_registration_lock = threading.RLock()
 
 
 class Compiler(object):
+    """Registry of handlers and precedences.
+
+    Handlers can be registered at runtime while other threads compile.
+    Readers take no lock: the merged registries are rebuilt and replaced, not mutated in place,
+    and the memoized lookups are kept in dicts which are replaced on each registration.
+    """
+
+    max_cached_precedences = 4096
+    max_specialized = 1024
 
     def __init__(self, parent=None):
         self._children = weakref.WeakKeyDictionary()
@@ -16,46 +34,93 @@ class Compiler(object):
         self._local_precedence = {}
         self._registry = {}
         self._precedence = {}
+        self._handlers = {}
+        self._precedences = {}
+        self._specialized = {}
+        self._generation = 0
+        self._local_profiler = None
+        self._profiler = None
         if parent:
-            self._parents.extend(parent._parents)
-            self._parents.append(parent)
-            parent._children[self] = True
-            self._update_cache()
+            with _registration_lock:
+                self._parents.extend(parent._parents)
+                self._parents.append(parent)
+                parent._children[self] = True
+                self._update_cache()
 
     def create_child(self):
         return self.__class__(self)
 
     def when(self, cls):
         def deco(func):
-            self._local_registry[cls] = func
-            self._update_cache()
+            with _registration_lock:
+                self._local_registry[cls] = func
+                self._update_cache()
             return func
         return deco
 
     def set_precedence(self, precedence, *types):
-        for type in types:
-            self._local_precedence[type] = precedence
-        self._update_cache()
+        with _registration_lock:
+            for type in types:
+                self._local_precedence[type] = precedence
+            self._update_cache()
+
+    def set_profiler(self, profiler):
+        """Sets the profiler of handlers of this compiler and of its children, None disables profiling.
+
+        Handlers are wrapped by the profiler on lookup, so disabled profiler costs nothing.
+
+        :param profiler: Profiler or None
+        :type profiler: sqlbuilder.smartsql.profiler.Profiler
+        """
+        with _registration_lock:
+            self._local_profiler = profiler
+            self._update_cache()
 
     def _update_cache(self):
+        registry = {}
+        precedence = {}
+        profiler = None
         for parent in self._parents:
-            self._registry.update(parent._local_registry)
-            self._precedence.update(parent._local_precedence)
-        self._registry.update(self._local_registry)
-        self._precedence.update(self._local_precedence)
-        for child in self._children:
+            registry.update(parent._local_registry)
+            precedence.update(parent._local_precedence)
+            profiler = parent._local_profiler or profiler
+        registry.update(self._local_registry)
+        precedence.update(self._local_precedence)
+        self._profiler = self._local_profiler or profiler
+        # The sources are replaced before the memoized lookups, and readers take the memo before the sources,
+        # so a lookup resolved from an old source is never stored into a new memo.
+        self._registry = registry
+        self._precedence = precedence
+        self._handlers = {}
+        self._precedences = {}
+        self._specialized = {}
+        self._generation += 1
+        for child in list(self._children):
             child._update_cache()
 
     def __call__(self, expr, state=None):
         if state is None:
-            state = State()
-            self(expr, state)
-            return ''.join(state.sql), state.params
+            try:
+                state = _free_states.pop()
+            except IndexError:
+                state = State()
+            try:
+                self(expr, state)
+                return ''.join(state.sql), state.params
+            finally:
+                state.reset()
+                if len(_free_states) < _max_free_states:
+                    _free_states.append(state)
 
         cls = expr.__class__
         parentheses = None
         outer_precedence = state.precedence
-        inner_precedence = self.get_inner_precedence(expr)
+        try:
+            sql_getter, inner_precedence = self._precedences[cls]
+        except KeyError:
+            sql_getter, inner_precedence = self._resolve_precedence(cls)
+        if sql_getter is not None:
+            inner_precedence = self._get_sql_precedence(expr, sql_getter, inner_precedence)
         if inner_precedence is None:
             # pass current precedence
             # FieldList, ExprList, All, Distinct...?
@@ -67,40 +132,173 @@ class Compiler(object):
         if parentheses:
             state.sql.append('(')
 
-        for c in cls.__mro__:
-            if c in self._registry:
-                self._registry[c](self, expr, state)
-                break
-        else:
-            raise Error("Unknown compiler for {0}".format(cls))
+        try:
+            handler = self._handlers[cls]
+        except KeyError:
+            handler = self.get_handler(cls)
+        handler(self, expr, state)
 
         if parentheses:
             state.sql.append(')')
         state.precedence = outer_precedence
 
+    def prepare(self, expr):
+        """Compiles expr once and returns the template to be executed many times with other parameters.
+
+        :param expr: Expression to be compiled
+        :type expr: Expr
+        :rtype: Prepared
+        """
+        state = State()
+        state.slots = True
+        self(expr, state)
+        params = []
+        slots = {}
+        for i, param in enumerate(state.params):
+            if isinstance(param, ParamSlot):
+                slots.setdefault(param.owner, []).append(i)
+                param = param.value
+            params.append(param)
+        return Prepared(''.join(state.sql), params, slots)
+
+    def specialize(self, expr):
+        """Returns the compile function generated for the shape of expr.
+
+        The function returns SQL and parameters of any expression of the same shape
+        without walking handlers, see Specialized. The functions are cached per shape
+        until the next registration of handler or precedence on this compiler or its parents.
+
+        :param expr: sample expression of the shape
+        :type expr: Expr
+        :rtype: sqlbuilder.smartsql.codegen.Specialized
+        """
+        from sqlbuilder.smartsql.codegen import specialize
+        return specialize(self, expr)
+
+    def get_handler(self, cls):
+        """Returns the handler registered for the nearest class in cls.__mro__.
+
+        The result is memoized per concrete class until the next registration
+        on this compiler or on any of its parents.
+        """
+        handlers = self._handlers
+        try:
+            return handlers[cls]
+        except KeyError:
+            pass
+        registry, profiler = self._registry, self._profiler
+        for c in cls.__mro__:
+            if c in registry:
+                handler = registry[c]
+                if profiler is not None:
+                    handler = profiler.wrap(handler)
+                handlers[cls] = handler
+                return handler
+        raise Error("Unknown compiler for {0}".format(cls))
+
     def get_inner_precedence(self, cls_or_expr):
         if isinstance(cls_or_expr, type):
-            cls = cls_or_expr
-            if cls in self._precedence:
-                return self._precedence[cls]
+            return self._precedence.get(cls_or_expr, MAX_PRECEDENCE)
+        return self._get_precedence(cls_or_expr)
+
+    def _get_precedence(self, expr):
+        try:
+            sql_getter, precedence = self._precedences[expr.__class__]
+        except KeyError:
+            sql_getter, precedence = self._resolve_precedence(expr.__class__)
+        if sql_getter is not None:
+            return self._get_sql_precedence(expr, sql_getter, precedence)
+        return precedence
+
+    def _get_sql_precedence(self, expr, sql_getter, default):
+        sql = sql_getter(expr)
+        if sql is None:
+            return default
+        key = (expr.__class__, sql)
+        precedence = self._precedences.get(key, _MISSING)
+        if precedence is _MISSING:
+            precedence = self._resolve_sql_precedence(key, default)
+        return precedence
+
+    def _resolve_precedence(self, cls):
+        """Resolves the precedence of class and tells how to read the operator of its instances.
+
+        If the operator is a class attribute that can't be overridden by instance,
+        then precedence is fully resolved for the class.
+        """
+        precedences, registry = self._precedences, self._precedence  # see _update_cache() for order
+        static_sql, sql_getter = _get_sql_accessor(cls)
+        precedence = registry.get(cls, MAX_PRECEDENCE)
+        if static_sql is not None:
+            if (cls, static_sql) in registry:
+                precedence = registry[(cls, static_sql)]
+            elif static_sql in registry:
+                precedence = registry[static_sql]
+        precedences[cls] = (sql_getter, precedence)
+        return sql_getter, precedence
+
+    def _resolve_sql_precedence(self, key, default):
+        precedences, registry = self._precedences, self._precedence  # see _update_cache() for order
+        cls, sql = key
+        if key in registry:
+            precedence = registry[key]
+        elif sql in registry:
+            precedence = registry[sql]
         else:
-            expr = cls_or_expr
-            cls = expr.__class__
-            if hasattr(expr, 'sql'):
-                try:
-                    if (cls, expr.sql) in self._precedence:
-                        return self._precedence[(cls, expr.sql)]
-                    elif expr.sql in self._precedence:
-                        return self._precedence[expr.sql]
-                except TypeError:
-                    # For case when expr.sql is unhashable, for example we can allow T('tablename').sql (in future).
-                    pass
-            return self.get_inner_precedence(cls)
+            precedence = default
+        # Arbitrary SQL of Expr('...') can be used as key, so, the cache should stay bounded.
+        if len(precedences) < self.max_cached_precedences:
+            precedences[key] = precedence
+        return precedence
+
+
+def _get_sql_accessor(cls):
+    """Returns pair (static_sql, sql_getter) for the "sql" attribute of instances of cls.
+
+    Only string values are meaningful for precedence, all other values are treated as None.
+    """
+    for c in cls.__mro__:
+        if 'sql' in c.__dict__:
+            attr = c.__dict__['sql']
+            break
+    else:
+        return None, None
+
+    has_dict = any('__dict__' in c.__dict__ for c in cls.__mro__)
+    if attr is None or isinstance(attr, string_types):
+        if not has_dict:
+            return attr, None
+
+    elif hasattr(attr, '__get__') and hasattr(attr, '__set__'):
+        # Data descriptor, for example slot, can't be shadowed by instance dict
+        # and allows to omit Operable.__getattr__() for unset value.
+        def sql_getter(expr):
+            try:
+                sql = attr.__get__(expr, cls)
+            except AttributeError:
+                return None
+            return sql if isinstance(sql, string_types) else None
+
+        return None, sql_getter
 
-        return MAX_PRECEDENCE  # self._precedence.get('(any other)', MAX_PRECEDENCE)
+    def sql_getter(expr):
+        sql = getattr(expr, 'sql', None)
+        return sql if isinstance(sql, string_types) else None
+
+    return None, sql_getter
 
 
 class State(object):
+    """State of compilation.
+
+    The attributes used by built-in handlers are slots. Hot handlers save and restore them
+    with local variables, push() and pop() are kept for the rest,
+    including own attributes of third-party handlers.
+    """
+    __slots__ = (
+        'sql', 'params', '_stack', 'auto_tables', 'auto_join_tables', 'joined_table_statements',
+        'context', 'precedence', 'slots', 'inline', '__dict__',
+    )
 
     def __init__(self):
         self.sql = []
@@ -111,6 +309,8 @@ class State(object):
         self.joined_table_statements = set()
         self.context = CONTEXT.QUERY
         self.precedence = 0
+        self.slots = False  # True if Compiler.prepare() is in progress
+        self.inline = False  # True if compiled fragments are not cached, see cached_compile()
 
     def push(self, attr, new_value=None):
         old_value = getattr(self, attr, None)
@@ -123,30 +323,156 @@ class State(object):
     def pop(self):
         setattr(self, *self._stack.pop(-1))
 
+    def new_sql(self):
+        """Returns an empty list for SQL of fragment, which is compiled apart from state.sql.
+
+        The fragment is inserted into state.sql later, see compile_query() and querify().
+        """
+        return []
+
+    def reset(self):
+        """Makes the instance ready for the next compilation.
+
+        The list of params is replaced, not cleared, since it's returned to the caller.
+        """
+        del self.sql[:]
+        self.params = []
+        del self._stack[:]
+        del self.auto_tables[:]
+        del self.auto_join_tables[:]
+        self.joined_table_statements.clear()
+        self.context = CONTEXT.QUERY
+        self.precedence = 0
+        self.slots = False
+        self.inline = False
+        self.__dict__.clear()
+
+
+# Free list of State instances for top-level compilation, see Compiler.__call__().
+# A state is taken by list.pop() and returned by list.append(),
+# so the same instance is never used by two threads or by nested compilations.
+_free_states = []
+_max_free_states = 16
+
+
+class ParamSlot(object):
+    """Marks the parameter produced by owner (Param) during Compiler.prepare().
+
+    The marker is unique, so it survives reordering of parameters by handlers,
+    see for example compilation of FROM clause of Select.
+    """
+    __slots__ = ('owner', 'value')
+
+    def __init__(self, owner, value):
+        self.owner = owner
+        self.value = value
+
+
+class Prepared(object):
+    """Compiled SQL with ordered parameter slots, see Compiler.prepare()."""
+
+    __slots__ = ('sql', 'params', '_slots')
+
+    def __init__(self, sql, params, slots):
+        self.sql = sql
+        self.params = params
+        self._slots = slots
+
+    def bind(self, params=None):
+        """Substitutes parameters without compilation.
+
+        :param params: all parameters in order of slots,
+            or mapping of Param instances of compiled expression to their new values.
+            The parameters of Param with a list value should be a list of the same length.
+        :type params: list or tuple or dict or None
+        :return: tuple with SQL string and list of parameters, like Compiler.__call__()
+        :rtype: tuple
+        """
+        if params is None:
+            return self.sql, list(self.params)
+        if isinstance(params, dict):
+            result = list(self.params)
+            for owner, value in params.items():
+                try:
+                    positions = self._slots[owner]
+                except (KeyError, TypeError):
+                    raise Error("Unknown parameter {0!r}".format(owner))
+                if len(positions) == 1 and not is_list(owner.params):
+                    result[positions[0]] = value
+                elif is_list(value) and len(value) == len(positions):
+                    for position, item in zip(positions, value):
+                        result[position] = item
+                else:
+                    raise Error("Parameter {0!r} expects {1:d} values".format(owner, len(positions)))
+            return self.sql, result
+        if len(params) != len(self.params):
+            raise Error("Expected {0:d} parameters, got {1:d}".format(len(self.params), len(params)))
+        return self.sql, list(params)
+
+    def __repr__(self):
+        return "<{0}: {1}, {2!r}>".format(type(self).__name__, self.sql, self.params)
+
 
 def cached_compile(f):
+    """Caches the compiled fragment of node per compiler and context.
+
+    The fragment keeps SQL, parameters and the tables added to state.auto_tables,
+    and it's replayed on the next compilation of the node instead of calling the handler.
+    The node class opts in by decorating its handler and by the dict attribute __cached__,
+    which should be replaced by a new one when the node is changed in place.
+    The cache is bypassed by Compiler.prepare(), when state.inline or state.auto_join_tables is set,
+    and it's invalidated on registration of handlers. The inline state appends SQL directly to state.sql,
+    which is watched by Representer.
+    """
     @wraps(f)
     def deco(compile, expr, state):
-        cache_key = (compile, state.context)
-        if cache_key not in expr.__cached__:
-            state.push('sql', [])
+        if state.slots or state.inline or state.auto_join_tables:
             f(compile, expr, state)
-            # TODO: also cache state.tables?
-            expr.__cached__[cache_key] = ''.join(state.sql)
-            state.pop()
-        state.sql.append(expr.__cached__[cache_key])
+            return
+        cache_key = (compile, state.context)
+        # The key and the cached value are read once, since other threads can fill the cache concurrently.
+        cached = expr.__cached__.get(cache_key)
+        if cached is None or cached[0] != compile._generation:
+            generation = compile._generation
+            cached = (generation, compile_fragment(compile, expr, state, f))
+            expr.__cached__[cache_key] = cached
+        append_fragment(cached[1], state)
     return deco
 
 
+def compile_fragment(compile, expr, state, handler=None):
+    """Compiles expr into separate lists and returns tuple of SQL string, parameters and auto tables.
+
+    The fragment can be added to any state by append_fragment().
+    """
+    sql, params, auto_tables = state.sql, state.params, state.auto_tables
+    state.sql, state.params, state.auto_tables = [], [], []
+    try:
+        if handler is None:
+            compile(expr, state)
+        else:
+            handler(compile, expr, state)
+        return (''.join(state.sql), tuple(state.params), tuple(state.auto_tables))
+    finally:
+        state.sql, state.params, state.auto_tables = sql, params, auto_tables
+
+
+def append_fragment(fragment, state):
+    state.sql.append(fragment[0])
+    if fragment[1]:
+        state.params += fragment[1]
+    if fragment[2]:
+        state.auto_tables += fragment[2]
+
+
 def querify(compile, expr, state):
-    state.push('sql', [])
-    state.push('params', [])
-    compile(expr, state)
+    sql, params = state.sql, state.params
+    state.sql, state.params = state.new_sql(), []
     try:
+        compile(expr, state)
         return (state.sql, state.params)
     finally:
-        state.pop()
-        state.pop()
+        state.sql, state.params = sql, params
 
 
 compile = Compiler()
@@ -1,17 +1,108 @@
 import sys
 from sqlbuilder.smartsql.constants import OPERATOR
-from sqlbuilder.smartsql.expressions import Alias, Concat, Value, datatypeof, func
+from sqlbuilder.smartsql.expressions import Alias, Concat, Operable, Value, datatypeof, func
 from sqlbuilder.smartsql.operator_registry import operator_registry
 from sqlbuilder.smartsql.operators import (
-    Binary, EscapeForLike, Like, ILike, All, Asc, Desc, Between, Distinct, Neg, Not, Pos
+    Binary, EscapeForLike, Like, ILike, All, Asc, Desc, Between, Distinct, In, InList, Neg, Not, NotIn, NotInList, Pos
 )
 from sqlbuilder.smartsql.utils import Undef, is_list, warn
 
-__all__ = ('AbstractType', 'BaseType', )
+__all__ = ('AbstractType', 'BaseType', 'operation', )
+
+# Special methods of Operable, which are always looked up in the table of operations.
+OPERABLE_METHODS = tuple(
+    name for name, value in vars(Operable).items()
+    if name.startswith('__') and callable(value) and name not in ('__init__', '__getattr__', '__hash__')
+)
+
+
+def operation(func):
+    """Makes method of datatype from function of expression.
+
+    Operable calls the function directly, without allocation of datatype(expr) delegate per operation.
+    The function can't use the delegate, other methods are called on the expression.
+    """
+    def method(self, *args, **kwargs):
+        return func(self._expr, *args, **kwargs)
+
+    method.__name__ = func.__name__
+    method.__doc__ = func.__doc__
+    method.operation = func
+    return method
+
+
+# The default factories are replaced for lists of values, see InListCompiler.
+_list_factories = {In: InList, NotIn: NotInList}
+
+
+def _op(expr, operator, operands, **kwargs):
+    """Makes expression of operator, like AbstractType._op() of datatype of expr, but without delegate.
+
+    The delegate is used only if the datatype overrides AbstractType._op().
+    """
+    datatype = datatypeof(expr)
+    if datatype._custom_op:
+        return datatype(expr)._op(operator, operands, **kwargs)
+    left, right = operands
+    expression_factory = operator_registry.get(operator, (datatypeof(left), datatypeof(right)))[1]
+    if is_list(right):
+        expression_factory = _list_factories.get(expression_factory, expression_factory)
+    return expression_factory(left, right, **kwargs)
+
+
+class MetaType(type):
+    """Keeps the table of operations per datatype class, see Operable.
+
+    Methods made by operation() are called without delegate. Other methods,
+    for example, methods overridden by subclass in usual way, are called by delegate datatype(expr).
+    Operators are made by _op() of delegate as well, if a subclass overrides AbstractType._op().
+    The tables are rebuilt when an attribute of the datatype class or of its base is changed or deleted.
+    """
+
+    def __init__(cls, name, bases, attrs):
+        super(MetaType, cls).__init__(name, bases, attrs)
+        cls._update_operations()
+
+    def __setattr__(cls, name, value):
+        super(MetaType, cls).__setattr__(name, value)
+        if name not in ('_operations', '_custom_op'):
+            cls._update_operations()
+
+    def __delattr__(cls, name):
+        super(MetaType, cls).__delattr__(name)
+        cls._update_operations()
+
+    def _update_operations(cls):
+        owners = [c for c in cls.__mro__ if '_op' in c.__dict__]
+        cls._custom_op = bool(owners) and owners[0] is not owners[-1]  # see _op()
+        operations = {}
+        for name in set(dir(cls)).union(OPERABLE_METHODS):
+            if name in OPERABLE_METHODS or not name.startswith('__'):
+                operation = cls._make_operation(name)
+                if operation is not None:
+                    operations[name] = operation
+        cls._operations = operations  # replaced, not changed in place, since other threads can read it
+        for subclass in cls.__subclasses__():
+            subclass._update_operations()
+
+    def _make_operation(cls, name):
+        for c in cls.__mro__:
+            if name in c.__dict__:
+                attr = c.__dict__[name]
+                if hasattr(attr, 'operation'):
+                    return attr.operation
+                if not callable(attr) or isinstance(attr, (type, classmethod, staticmethod)):
+                    return None  # Attributes other than methods are read from delegate.
+                break
+
+        def delegated(expr, *args, **kwargs):
+            return getattr(cls(expr), name)(*args, **kwargs)
+
+        return delegated
 
 
 # TODO: Datatype should be aware about its scheme/operator_registry. Pass operator_registry to constructor?
-class AbstractType(object):
+class AbstractType(MetaType("NewBase", (object, ), {'__slots__': ()})):
     __slots__ = ('_expr',)
 
     def __init__(self, expr):
@@ -24,222 +115,275 @@ class AbstractType(object):
 
 class BaseType(AbstractType):
 
-    def __add__(self, other):
-        return self._op(OPERATOR.ADD, (self._expr, other))
-
-    def __radd__(self, other):
-        return self._op(OPERATOR.ADD, (other, self._expr))
-
-    def __sub__(self, other):
-        return self._op(OPERATOR.SUB, (self._expr, other))
-
-    def __rsub__(self, other):
-        return self._op(OPERATOR.SUB, (other, self._expr))
+    @operation
+    def __add__(expr, other):
+        return _op(expr, OPERATOR.ADD, (expr, other))
 
-    def __mul__(self, other):
-        return self._op(OPERATOR.MUL, (self._expr, other))
+    @operation
+    def __radd__(expr, other):
+        return _op(expr, OPERATOR.ADD, (other, expr))
 
-    def __rmul__(self, other):
-        return self._op(OPERATOR.MUL, (other, self._expr))
+    @operation
+    def __sub__(expr, other):
+        return _op(expr, OPERATOR.SUB, (expr, other))
 
-    def __div__(self, other):
-        return self._op(OPERATOR.DIV, (self._expr, other))
+    @operation
+    def __rsub__(expr, other):
+        return _op(expr, OPERATOR.SUB, (other, expr))
 
-    def __rdiv__(self, other):
-        return self._op(OPERATOR.DIV, (other, self._expr))
+    @operation
+    def __mul__(expr, other):
+        return _op(expr, OPERATOR.MUL, (expr, other))
 
-    def __truediv__(self, other):
-        return self._op(OPERATOR.DIV, (self._expr, other))
+    @operation
+    def __rmul__(expr, other):
+        return _op(expr, OPERATOR.MUL, (other, expr))
 
-    def __rtruediv__(self, other):
-        return self._op(OPERATOR.DIV, (other, self._expr))
+    @operation
+    def __div__(expr, other):
+        return _op(expr, OPERATOR.DIV, (expr, other))
 
-    def __floordiv__(self, other):
-        return self._op(OPERATOR.DIV, (self._expr, other))
+    @operation
+    def __rdiv__(expr, other):
+        return _op(expr, OPERATOR.DIV, (other, expr))
 
-    def __rfloordiv__(self, other):
-        return self._op(OPERATOR.DIV, (other, self._expr))
+    __truediv__ = __floordiv__ = __div__
+    __rtruediv__ = __rfloordiv__ = __rdiv__
 
-    def __and__(self, other):
-        return self._op(OPERATOR.AND, (self._expr, other))
+    @operation
+    def __and__(expr, other):
+        return _op(expr, OPERATOR.AND, (expr, other))
 
-    def __rand__(self, other):
-        return self._op(OPERATOR.AND, (other, self._expr))
+    @operation
+    def __rand__(expr, other):
+        return _op(expr, OPERATOR.AND, (other, expr))
 
-    def __or__(self, other):
-        return self._op(OPERATOR.OR, (self._expr, other))
+    @operation
+    def __or__(expr, other):
+        return _op(expr, OPERATOR.OR, (expr, other))
 
-    def __ror__(self, other):
-        return self._op(OPERATOR.OR, (other, self._expr))
+    @operation
+    def __ror__(expr, other):
+        return _op(expr, OPERATOR.OR, (other, expr))
 
-    def __gt__(self, other):
-        return self._op(OPERATOR.GT, (self._expr, other))
+    @operation
+    def __gt__(expr, other):
+        return _op(expr, OPERATOR.GT, (expr, other))
 
-    def __lt__(self, other):
-        return self._op(OPERATOR.LT, (self._expr, other))
+    @operation
+    def __lt__(expr, other):
+        return _op(expr, OPERATOR.LT, (expr, other))
 
-    def __ge__(self, other):
-        return self._op(OPERATOR.GE, (self._expr, other))
+    @operation
+    def __ge__(expr, other):
+        return _op(expr, OPERATOR.GE, (expr, other))
 
-    def __le__(self, other):
-        return self._op(OPERATOR.LE, (self._expr, other))
+    @operation
+    def __le__(expr, other):
+        return _op(expr, OPERATOR.LE, (expr, other))
 
-    def __eq__(self, other):
+    @operation
+    def __eq__(expr, other):
         if other is None:
-            return self.is_(None)
+            return expr.is_(None)
         if is_list(other):
-            return self.in_(other)
-        return self._op(OPERATOR.EQ, (self._expr, other))
+            return expr.in_(other)
+        return _op(expr, OPERATOR.EQ, (expr, other))
 
-    def __ne__(self, other):
+    @operation
+    def __ne__(expr, other):
         if other is None:
-            return self.is_not(None)
+            return expr.is_not(None)
         if is_list(other):
-            return self.not_in(other)
-        return self._op(OPERATOR.NE, (self._expr, other))
+            return expr.not_in(other)
+        return _op(expr, OPERATOR.NE, (expr, other))
 
-    def __rshift__(self, other):
-        return self._op(OPERATOR.RSHIFT, (self._expr, other))
+    @operation
+    def __rshift__(expr, other):
+        return _op(expr, OPERATOR.RSHIFT, (expr, other))
 
-    def __rrshift__(self, other):
-        return self._op(OPERATOR.RSHIFT, (other, self._expr))
+    @operation
+    def __rrshift__(expr, other):
+        return _op(expr, OPERATOR.RSHIFT, (other, expr))
 
-    def __lshift__(self, other):
-        return self._op(OPERATOR.LSHIFT, (self._expr, other))
+    @operation
+    def __lshift__(expr, other):
+        return _op(expr, OPERATOR.LSHIFT, (expr, other))
 
-    def __rlshift__(self, other):
-        return self._op(OPERATOR.LSHIFT, (other, self._expr))
+    @operation
+    def __rlshift__(expr, other):
+        return _op(expr, OPERATOR.LSHIFT, (other, expr))
 
-    def is_(self, other):
-        return self._op(OPERATOR.IS, (self._expr, other))
+    @operation
+    def is_(expr, other):
+        return _op(expr, OPERATOR.IS, (expr, other))
 
-    def is_not(self, other):
-        return self._op(OPERATOR.IS_NOT, (self._expr, other))
+    @operation
+    def is_not(expr, other):
+        return _op(expr, OPERATOR.IS_NOT, (expr, other))
 
-    def in_(self, other):
-        return self._op(OPERATOR.IN, (self._expr, other))
+    @operation
+    def in_(expr, other):
+        return _op(expr, OPERATOR.IN, (expr, other))
 
-    def not_in(self, other):
-        return self._op(OPERATOR.NOT_IN, (self._expr, other))
+    @operation
+    def not_in(expr, other):
+        return _op(expr, OPERATOR.NOT_IN, (expr, other))
 
-    def like(self, other, escape=Undef):
-        return self._op(OPERATOR.LIKE, (self._expr, other), escape=escape)
+    @operation
+    def like(expr, other, escape=Undef):
+        return _op(expr, OPERATOR.LIKE, (expr, other), escape=escape)
 
-    def ilike(self, other, escape=Undef):
-        return ILike(self._expr, other, escape=escape)
+    @operation
+    def ilike(expr, other, escape=Undef):
+        return ILike(expr, other, escape=escape)
 
-    def rlike(self, other, escape=Undef):
-        return Like(other, self._expr, escape=escape)
+    @operation
+    def rlike(expr, other, escape=Undef):
+        return Like(other, expr, escape=escape)
 
-    def rilike(self, other, escape=Undef):
-        return ILike(other, self._expr, escape=escape)
+    @operation
+    def rilike(expr, other, escape=Undef):
+        return ILike(other, expr, escape=escape)
 
-    def startswith(self, other):
+    @operation
+    def startswith(expr, other):
         pattern = EscapeForLike(other)
-        return Like(self._expr, Concat(pattern, Value('%')), escape=pattern.escape)
+        return Like(expr, Concat(pattern, Value('%')), escape=pattern.escape)
 
-    def istartswith(self, other):
+    @operation
+    def istartswith(expr, other):
         pattern = EscapeForLike(other)
-        return ILike(self._expr, Concat(pattern, Value('%')), escape=pattern.escape)
+        return ILike(expr, Concat(pattern, Value('%')), escape=pattern.escape)
 
-    def contains(self, other):  # TODO: ambiguous with "@>" operator of postgresql.
+    @operation
+    def contains(expr, other):  # TODO: ambiguous with "@>" operator of postgresql.
         pattern = EscapeForLike(other)
-        return Like(self._expr, Concat(Value('%'), pattern, Value('%')), escape=pattern.escape)
+        return Like(expr, Concat(Value('%'), pattern, Value('%')), escape=pattern.escape)
 
-    def icontains(self, other):
+    @operation
+    def icontains(expr, other):
         pattern = EscapeForLike(other)
-        return ILike(self._expr, Concat(Value('%'), pattern, Value('%')), escape=pattern.escape)
+        return ILike(expr, Concat(Value('%'), pattern, Value('%')), escape=pattern.escape)
 
-    def endswith(self, other):
+    @operation
+    def endswith(expr, other):
         pattern = EscapeForLike(other)
-        return Like(self._expr, Concat(Value('%'), pattern), escape=pattern.escape)
+        return Like(expr, Concat(Value('%'), pattern), escape=pattern.escape)
 
-    def iendswith(self, other):
+    @operation
+    def iendswith(expr, other):
         pattern = EscapeForLike(other)
-        return ILike(self._expr, Concat(Value('%'), pattern), escape=pattern.escape)
+        return ILike(expr, Concat(Value('%'), pattern), escape=pattern.escape)
 
-    def rstartswith(self, other):
-        pattern = EscapeForLike(self._expr)
+    @operation
+    def rstartswith(expr, other):
+        pattern = EscapeForLike(expr)
         return Like(other, Concat(pattern, Value('%')), escape=pattern.escape)
 
-    def ristartswith(self, other):
-        pattern = EscapeForLike(self._expr)
+    @operation
+    def ristartswith(expr, other):
+        pattern = EscapeForLike(expr)
         return ILike(other, Concat(pattern, Value('%')), escape=pattern.escape)
 
-    def rcontains(self, other):
-        pattern = EscapeForLike(self._expr)
+    @operation
+    def rcontains(expr, other):
+        pattern = EscapeForLike(expr)
         return Like(other, Concat(Value('%'), pattern, Value('%')), escape=pattern.escape)
 
-    def ricontains(self, other):
-        pattern = EscapeForLike(self._expr)
+    @operation
+    def ricontains(expr, other):
+        pattern = EscapeForLike(expr)
         return ILike(other, Concat(Value('%'), pattern, Value('%')), escape=pattern.escape)
 
-    def rendswith(self, other):
-        pattern = EscapeForLike(self._expr)
+    @operation
+    def rendswith(expr, other):
+        pattern = EscapeForLike(expr)
         return Like(other, Concat(Value('%'), pattern), escape=pattern.escape)
 
-    def riendswith(self, other):
-        pattern = EscapeForLike(self._expr)
+    @operation
+    def riendswith(expr, other):
+        pattern = EscapeForLike(expr)
         return ILike(other, Concat(Value('%'), pattern), escape=pattern.escape)
 
-    def __pos__(self):
-        return Pos(self._expr)
+    @operation
+    def __pos__(expr):
+        return Pos(expr)
 
-    def __neg__(self):
-        return Neg(self._expr)
+    @operation
+    def __neg__(expr):
+        return Neg(expr)
 
-    def __invert__(self):
-        return Not(self._expr)
+    @operation
+    def __invert__(expr):
+        return Not(expr)
 
-    def all(self):
-        return All(self._expr)
+    @operation
+    def all(expr):
+        return All(expr)
 
-    def distinct(self):
-        return Distinct(self._expr)
+    @operation
+    def distinct(expr):
+        return Distinct(expr)
 
-    def __pow__(self, other):
-        return func.Power(self._expr, other)
+    @operation
+    def __pow__(expr, other):
+        return func.Power(expr, other)
 
-    def __rpow__(self, other):
-        return func.Power(other, self._expr)
+    @operation
+    def __rpow__(expr, other):
+        return func.Power(other, expr)
 
-    def __mod__(self, other):
-        return func.Mod(self._expr, other)
+    @operation
+    def __mod__(expr, other):
+        return func.Mod(expr, other)
 
-    def __rmod__(self, other):
-        return func.Mod(other, self._expr)
+    @operation
+    def __rmod__(expr, other):
+        return func.Mod(other, expr)
 
-    def __abs__(self):
-        return func.Abs(self._expr)
+    @operation
+    def __abs__(expr):
+        return func.Abs(expr)
 
-    def count(self):
-        return func.Count(self._expr)
+    @operation
+    def count(expr):
+        return func.Count(expr)
 
-    def as_(self, alias):
-        return Alias(self._expr, alias)
+    @operation
+    def as_(expr, alias):
+        return Alias(expr, alias)
 
-    def between(self, start, end):
-        return Between(self._expr, start, end)
+    @operation
+    def between(expr, start, end):
+        return Between(expr, start, end)
 
-    def concat(self, *args):
-        return Concat(self._expr, *args)
+    @operation
+    def concat(expr, *args):
+        return Concat(expr, *args)
 
-    def concat_ws(self, sep, *args):
-        return Concat(self._expr, *args).ws(sep)
+    @operation
+    def concat_ws(expr, sep, *args):
+        return Concat(expr, *args).ws(sep)
 
-    def op(self, op):
-        return lambda other: Binary(self._expr, op, other)
+    @operation
+    def op(expr, op):
+        return lambda other: Binary(expr, op, other)
 
-    def rop(self, op):  # useless, can be P('lookingfor').op('=')(expr)
-        return lambda other: Binary(other, op, self._expr)
+    @operation
+    def rop(expr, op):  # useless, can be P('lookingfor').op('=')(expr)
+        return lambda other: Binary(other, op, expr)
 
-    def asc(self):
-        return Asc(self._expr)
+    @operation
+    def asc(expr):
+        return Asc(expr)
 
-    def desc(self):
-        return Desc(self._expr)
+    @operation
+    def desc(expr):
+        return Desc(expr)
 
-    def __getitem__(self, key):
+    @operation
+    def __getitem__(expr, key):
         """Returns self.between()"""
         # Is it should return ArrayItem(key) or Subfield(self._expr, key)?
         # Ambiguity with Query and ExprList!!!
@@ -249,9 +393,9 @@ class BaseType(AbstractType):
             warn('__getitem__(slice(...))', 'between(start, end)')
             start = key.start or 0
             end = key.stop or sys.maxsize
-            return Between(self._expr, start, end)
+            return Between(expr, start, end)
         else:
             warn('__getitem__(key)', '__eq__(key)')
-            return self.__eq__(key)
+            return expr.__eq__(key)
 
     __hash__ = object.__hash__
@@ -1,6 +1,7 @@
 import copy
 import operator
 import weakref
+from sqlbuilder.smartsql.compiler import _registration_lock
 from sqlbuilder.smartsql.constants import CONTEXT, OPERATOR
 from sqlbuilder.smartsql.expressions import Param, Name
 from sqlbuilder.smartsql.exceptions import Error
@@ -35,26 +36,30 @@ class Compiler(object):
         self._local_registry = {}
         self._registry = {}
         if parent:
-            self._parents.extend(parent._parents)
-            self._parents.append(parent)
-            parent._children[self] = True
-            self._update_cache()
+            with _registration_lock:
+                self._parents.extend(parent._parents)
+                self._parents.append(parent)
+                parent._children[self] = True
+                self._update_cache()
 
     def create_child(self):
         return self.__class__(self)
 
     def when(self, cls):
         def deco(func):
-            self._local_registry[cls] = func
-            self._update_cache()
+            with _registration_lock:
+                self._local_registry[cls] = func
+                self._update_cache()
             return func
         return deco
 
     def _update_cache(self):
+        registry = {}
         for parent in self._parents:
-            self._registry.update(parent._local_registry)
-        self._registry.update(self._local_registry)
-        for child in self._children:
+            registry.update(parent._local_registry)
+        registry.update(self._local_registry)
+        self._registry = registry  # is replaced, not mutated, for concurrent readers
+        for child in list(self._children):
             child._update_cache()
 
     def __call__(self, expr, state=None):
@@ -62,9 +67,10 @@ class Compiler(object):
             state = State()
 
         cls = expr.__class__
+        registry = self._registry
         for c in cls.__mro__:
-            if c in self._registry:
-                return self._registry[c](self, expr, state)
+            if c in registry:
+                return registry[c](self, expr, state)
         else:
             raise Error("Unknown executor for {0}".format(cls))
 
@@ -160,8 +166,8 @@ def compile_field(compile, expr, state):
     state.context = CONTEXT.EXPR
     if expr.where():
         result['$query'] = compile(expr.where(), state)
-    if expr.order_by():
-        result['$orderby'] = compile(expr.order_by(), state)
+    if expr._order_by:
+        result['$orderby'] = compile(expr._order_by, state)
     result['$collectionName'] = state.collection_name
     state.pop()
     return result
@@ -1,6 +1,6 @@
 from .. import (
     compile as parent_compile, SPACE, Binary, Concat, ExprList, Insert, Name,
-    NameCompiler, Parentheses, Query, Value, ValueCompiler
+    NameCompiler, Parentheses, Query, Value, ValueCompiler, compile_binary_chain, is_deep_binary
 )
 
 try:
@@ -28,6 +28,9 @@ compile.when(Value)(compile_value)
 
 @compile.when(Binary)
 def compile_condition(compile, expr, state):
+    if (isinstance(expr.left, Binary) or isinstance(expr.right, Binary)) and is_deep_binary(expr):
+        compile_binary_chain(compile, expr, state, compile_condition, TRANSLATION_MAP)
+        return
     compile(expr.left, state)
     state.sql.append(SPACE)
     state.sql.append(TRANSLATION_MAP.get(expr.sql, expr.sql))
@@ -1,12 +1,13 @@
 import copy
 import operator
 import weakref
+from functools import reduce
 from sqlbuilder.smartsql.constants import CONTEXT, OPERATOR
 from sqlbuilder.smartsql.expressions import Param
 from sqlbuilder.smartsql.exceptions import Error
-from sqlbuilder.smartsql.compiler import compile
+from sqlbuilder.smartsql.compiler import compile, _registration_lock
 from sqlbuilder.smartsql.fields import Field
-from sqlbuilder.smartsql.operators import Binary
+from sqlbuilder.smartsql.operators import Binary, NamedFlatCompound
 
 __all__ = ('Executor', 'State', 'execute')
 
@@ -40,26 +41,30 @@ class Executor(object):
         self._local_registry = {}
         self._registry = {}
         if parent:
-            self._parents.extend(parent._parents)
-            self._parents.append(parent)
-            parent._children[self] = True
-            self._update_cache()
+            with _registration_lock:
+                self._parents.extend(parent._parents)
+                self._parents.append(parent)
+                parent._children[self] = True
+                self._update_cache()
 
     def create_child(self):
         return self.__class__(self)
 
     def when(self, cls):
         def deco(func):
-            self._local_registry[cls] = func
-            self._update_cache()
+            with _registration_lock:
+                self._local_registry[cls] = func
+                self._update_cache()
             return func
         return deco
 
     def _update_cache(self):
+        registry = {}
         for parent in self._parents:
-            self._registry.update(parent._local_registry)
-        self._registry.update(self._local_registry)
-        for child in self._children:
+            registry.update(parent._local_registry)
+        registry.update(self._local_registry)
+        self._registry = registry  # is replaced, not mutated, for concurrent readers
+        for child in list(self._children):
             child._update_cache()
 
     def get_row_key(self, field):
@@ -67,9 +72,10 @@ class Executor(object):
 
     def __call__(self, expr, state=None):
         cls = expr.__class__
+        registry = self._registry
         for c in cls.__mro__:
-            if c in self._registry:
-                return self._registry[c](self, expr, state)
+            if c in registry:
+                return registry[c](self, expr, state)
         else:
             raise Error("Unknown executor for {0}".format(cls))
 
@@ -118,3 +124,8 @@ def execute_field(execute, expr, state):
 @execute.when(Binary)
 def execute_field(execute, expr, state):
     return OPERATOR_MAPPING[expr.sql](execute(expr.left, state), execute(expr.right, state))
+
+
+@execute.when(NamedFlatCompound)
+def execute_field(execute, expr, state):
+    return reduce(OPERATOR_MAPPING[expr.sql], (execute(a, state) for a in expr.data))
@@ -1,4 +1,4 @@
-from .. import compile as parent_compile, SPACE, Name, NameCompiler, Binary
+from .. import compile as parent_compile, SPACE, Name, NameCompiler, Binary, compile_binary_chain, is_deep_binary
 
 compile = parent_compile.create_child()
 
@@ -20,6 +20,9 @@ compile.when(Name)(compile_name)
 
 @compile.when(Binary)
 def compile_condition(compile, expr, state):
+    if (isinstance(expr.left, Binary) or isinstance(expr.right, Binary)) and is_deep_binary(expr):
+        compile_binary_chain(compile, expr, state, compile_condition, TRANSLATION_MAP)
+        return
     compile(expr.left, state)
     state.sql.append(SPACE)
     state.sql.append(TRANSLATION_MAP.get(expr.sql, expr.sql))
@@ -1,19 +1,23 @@
 from __future__ import absolute_import
 import sys
-import copy
+import types
 import operator
+import re
 from functools import reduce
-from sqlbuilder.smartsql.compiler import compile
+from timeit import default_timer
+from sqlbuilder.smartsql.compiler import ParamSlot, State, compile
 from sqlbuilder.smartsql.constants import CONTEXT, PLACEHOLDER, MAX_PRECEDENCE
 from sqlbuilder.smartsql.exceptions import MaxLengthError
-from sqlbuilder.smartsql.pycompat import string_types
-from sqlbuilder.smartsql.utils import Undef, is_list, warn
+from sqlbuilder.smartsql.fingerprint import fingerprint
+from sqlbuilder.smartsql.pycompat import integer_types, string_types
+from sqlbuilder.smartsql.utils import Undef, UndefType, is_list, warn
+from sqlbuilder.smartsql.visitor import children, copy_node
 
 __all__ = (
     'Operable', 'Expr', 'ExprList', 'CompositeExpr', 'Param', 'Parentheses', 'OmitParentheses',
     'Callable', 'NamedCallable', 'Constant', 'ConstantSpace', 'Case', 'Cast', 'Concat',
-    'Alias', 'Name', 'NameCompiler', 'Value', 'ValueCompiler', 'Array', 'ArrayItem',
-    'expr_repr', 'datatypeof', 'const', 'func'
+    'Alias', 'Name', 'Quoter', 'NameCompiler', 'Value', 'ValueCompiler', 'Array', 'ArrayItem',
+    'Representer', 'expr_repr', 'datatypeof', 'const', 'func'
 )
 
 SPACE = " "
@@ -25,11 +29,22 @@ def compile_object(compile, expr, state):
     state.params.append(expr)
 
 
+@fingerprint.when(object)
+def fingerprint_object(fingerprint, expr, state):
+    state.values.append(expr)
+
+
 @compile.when(type(None))
 def compile_none(compile, expr, state):
     state.sql.append('NULL')
 
 
+@fingerprint.when(type(None))
+@fingerprint.when(UndefType)
+def fingerprint_none(fingerprint, expr, state):
+    pass
+
+
 @compile.when(slice)
 def compile_slice(compile, expr, state):
     # FIXME: Should be here numrange()? Looks like not, see http://initd.org/psycopg/docs/extras.html#adapt-range
@@ -41,20 +56,31 @@ def compile_slice(compile, expr, state):
     state.sql.append("]")
 
 
+@fingerprint.when(slice)
+def fingerprint_slice(fingerprint, expr, state):
+    state.shape.append(expr.start)
+    state.shape.append(expr.stop)
+
+
 @compile.when(list)
 @compile.when(tuple)
 def compile_list(compile, expr, state):
     compile(Parentheses(ExprList(*expr).join(", ")), state)
 
 
+@fingerprint.when(list)
+@fingerprint.when(tuple)
+def fingerprint_list(fingerprint, expr, state):
+    state.shape.append(len(expr))
+    for item in expr:
+        fingerprint(item, state)
+
+
 class Operable(object):
-    __slots__ = ('_datatype', '__weakref__')
+    __slots__ = ('_datatype', '__weakref__', '__structural__')  # see Fingerprinter.key()
 
     def __init__(self, datatype=None):
-        if datatype is None:
-            from sqlbuilder.smartsql.datatypes import BaseType
-            datatype = BaseType
-        self._datatype = datatype
+        self._datatype = datatype or BaseType
 
     def __getattr__(self, name):
         """Use in derived classes:
@@ -66,115 +92,117 @@ class Operable(object):
         """
         if name.startswith('__'):  # All allowed special method already defined.
             raise AttributeError
-        delegate = self._datatype(self)
-        return getattr(delegate, name)
+        operation = self._datatype._operations.get(name)  # see MetaType of datatypes
+        if operation is None:
+            return getattr(self._datatype(self), name)
+        return types.MethodType(operation, self)
 
     __hash__ = object.__hash__
 
     def __add__(self, other):
-        return self._datatype(self).__add__(other)
+        return self._datatype._operations['__add__'](self, other)
 
     def __radd__(self, other):
-        return self._datatype(self).__radd__(other)
+        return self._datatype._operations['__radd__'](self, other)
 
     def __sub__(self, other):
-        return self._datatype(self).__sub__(other)
+        return self._datatype._operations['__sub__'](self, other)
 
     def __rsub__(self, other):
-        return self._datatype(self).__rsub__(other)
+        return self._datatype._operations['__rsub__'](self, other)
 
     def __mul__(self, other):
-        return self._datatype(self).__mul__(other)
+        return self._datatype._operations['__mul__'](self, other)
 
     def __rmul__(self, other):
-        return self._datatype(self).__rmul__(other)
+        return self._datatype._operations['__rmul__'](self, other)
 
     def __div__(self, other):
-        return self._datatype(self).__div__(other)
+        return self._datatype._operations['__div__'](self, other)
 
     def __rdiv__(self, other):
-        return self._datatype(self).__rdiv__(other)
+        return self._datatype._operations['__rdiv__'](self, other)
 
     def __truediv__(self, other):
-        return self._datatype(self).__truediv__(other)
+        return self._datatype._operations['__truediv__'](self, other)
 
     def __rtruediv__(self, other):
-        return self._datatype(self).__rtruediv__(other)
+        return self._datatype._operations['__rtruediv__'](self, other)
 
     def __floordiv__(self, other):
-        return self._datatype(self).__floordiv__(other)
+        return self._datatype._operations['__floordiv__'](self, other)
 
     def __rfloordiv__(self, other):
-        return self._datatype(self).__rfloordiv__(other)
+        return self._datatype._operations['__rfloordiv__'](self, other)
 
     def __and__(self, other):
-        return self._datatype(self).__and__(other)
+        return self._datatype._operations['__and__'](self, other)
 
     def __rand__(self, other):
-        return self._datatype(self).__rand__(other)
+        return self._datatype._operations['__rand__'](self, other)
 
     def __or__(self, other):
-        return self._datatype(self).__or__(other)
+        return self._datatype._operations['__or__'](self, other)
 
     def __ror__(self, other):
-        return self._datatype(self).__ror__(other)
+        return self._datatype._operations['__ror__'](self, other)
 
     def __gt__(self, other):
-        return self._datatype(self).__gt__(other)
+        return self._datatype._operations['__gt__'](self, other)
 
     def __lt__(self, other):
-        return self._datatype(self).__lt__(other)
+        return self._datatype._operations['__lt__'](self, other)
 
     def __ge__(self, other):
-        return self._datatype(self).__ge__(other)
+        return self._datatype._operations['__ge__'](self, other)
 
     def __le__(self, other):
-        return self._datatype(self).__le__(other)
+        return self._datatype._operations['__le__'](self, other)
 
     def __eq__(self, other):
-        return self._datatype(self).__eq__(other)
+        return self._datatype._operations['__eq__'](self, other)
 
     def __ne__(self, other):
-        return self._datatype(self).__ne__(other)
+        return self._datatype._operations['__ne__'](self, other)
 
     def __rshift__(self, other):
-        return self._datatype(self).__rshift__(other)
+        return self._datatype._operations['__rshift__'](self, other)
 
     def __rrshift__(self, other):
-        return self._datatype(self).__rshift__(other)
+        return self._datatype._operations['__rshift__'](self, other)
 
     def __lshift__(self, other):
-        return self._datatype(self).__lshift__(other)
+        return self._datatype._operations['__lshift__'](self, other)
 
     def __rlshift__(self, other):
-        return self._datatype(self).__lshift__(other)
+        return self._datatype._operations['__lshift__'](self, other)
 
     def __pos__(self):
-        return self._datatype(self).__pos__()
+        return self._datatype._operations['__pos__'](self)
 
     def __neg__(self):
-        return self._datatype(self).__neg__()
+        return self._datatype._operations['__neg__'](self)
 
     def __invert__(self):
-        return self._datatype(self).__invert__()
+        return self._datatype._operations['__invert__'](self)
 
     def __pow__(self, other):
-        return self._datatype(self).__pow__(other)
+        return self._datatype._operations['__pow__'](self, other)
 
     def __rpow__(self, other):
-        return self._datatype(self).__rpow__(other)
+        return self._datatype._operations['__rpow__'](self, other)
 
     def __mod__(self, other):
-        return self._datatype(self).__mod__(other)
+        return self._datatype._operations['__mod__'](self, other)
 
     def __rmod__(self, other):
-        return self._datatype(self).__rmod__(other)
+        return self._datatype._operations['__rmod__'](self, other)
 
     def __abs__(self):
-        return self._datatype(self).__abs__()
+        return self._datatype._operations['__abs__'](self)
 
     def __getitem__(self, key):
-        return self._datatype(self).__getitem__(key)
+        return self._datatype._operations['__getitem__'](self, key)
 
 
 class Expr(Operable):
@@ -197,9 +225,21 @@ def compile_expr(compile, expr, state):
     state.params += expr.params
 
 
+@fingerprint.when(Expr)
+def fingerprint_expr(fingerprint, expr, state):
+    state.shape.append(expr.sql)
+    state.shape.append(len(expr.params))
+    state.values.extend(expr.params)
+
+
+@children.when(Expr)
+def children_expr(children, expr):
+    return ('params', )
+
+
 class ExprList(Expr):
 
-    __slots__ = ('data', )
+    __slots__ = ('data', '__cached__')  # see compile_clause() of Select and Fingerprinter.key()
 
     def __init__(self, *args):
         # if args and is_list(args[0]):
@@ -207,9 +247,11 @@ class ExprList(Expr):
         #     return
         Expr.__init__(self, ' ')
         self.data = list(args)
+        self.__cached__ = {}
 
     def join(self, sep):
         self.sql = sep
+        self.__cached__ = {}
         return self
 
     def __len__(self):
@@ -217,6 +259,7 @@ class ExprList(Expr):
 
     def __setitem__(self, key, value):
         self.data[key] = value
+        self.__cached__ = {}
 
     def __getitem__(self, key):
         if isinstance(key, slice):
@@ -229,27 +272,34 @@ class ExprList(Expr):
         return iter(self.data)
 
     def append(self, x):
+        self.__cached__ = {}
         return self.data.append(x)
 
     def insert(self, i, x):
+        self.__cached__ = {}
         return self.data.insert(i, x)
 
     def extend(self, l):
+        self.__cached__ = {}
         return self.data.extend(l)
 
     def pop(self, i):
+        self.__cached__ = {}
         return self.data.pop(i)
 
     def remove(self, x):
+        self.__cached__ = {}
         return self.data.remove(x)
 
     def reset(self):
         del self.data[:]
+        self.__cached__ = {}
         return self
 
     def __copy__(self):
-        dup = copy.copy(super(ExprList, self))
+        dup = copy_node(self)
         dup.data = dup.data[:]
+        dup.__cached__ = {}
         return dup
 
 
@@ -264,6 +314,19 @@ def compile_exprlist(compile, expr, state):
         compile(a, state)
 
 
+@fingerprint.when(ExprList)
+def fingerprint_exprlist(fingerprint, expr, state):
+    state.shape.append(expr.sql)
+    state.shape.append(len(expr.data))
+    for a in expr.data:
+        fingerprint(a, state)
+
+
+@children.when(ExprList)
+def children_exprlist(children, expr):
+    return ('data', )
+
+
 class CompositeExpr(object):
 
     __slots__ = ('data', 'sql')
@@ -305,9 +368,23 @@ def compile_compositeexpr(compile, expr, state):
     compile_exprlist(compile, expr, state)
 
 
+@fingerprint.when(CompositeExpr)
+def fingerprint_compositeexpr(fingerprint, expr, state):
+    state.shape.append(expr.sql)
+    state.shape.append(len(expr.data))
+    for a in expr.data:
+        fingerprint(a, state)
+
+
+@children.when(CompositeExpr)
+def children_compositeexpr(children, expr):
+    return ('data', )
+
+
 class Param(Expr):
 
     __slots__ = ()
+    sql = None  # Has no operator. Allows to get precedence without AttributeError of unset slot.
 
     def __init__(self, params):
         Operable.__init__(self)
@@ -316,12 +393,26 @@ class Param(Expr):
 
 @compile.when(Param)
 def compile_param(compile, expr, state):
+    if not state.slots:
+        compile(expr.params, state)
+        return
+    outer_params = state.params
+    state.params = []
     compile(expr.params, state)
+    params = state.params
+    state.params = outer_params
+    state.params += [p if isinstance(p, ParamSlot) else ParamSlot(expr, p) for p in params]
+
+
+@fingerprint.when(Param)
+def fingerprint_param(fingerprint, expr, state):
+    fingerprint(expr.params, state)
 
 
 class Parentheses(Expr):
 
     __slots__ = ('expr', )
+    sql = None
 
     def __init__(self, expr):
         Operable.__init__(self)
@@ -334,6 +425,16 @@ def compile_parentheses(compile, expr, state):
     compile(expr.expr, state)
 
 
+@fingerprint.when(Parentheses)
+def fingerprint_parentheses(fingerprint, expr, state):
+    fingerprint(expr.expr, state)
+
+
+@children.when(Parentheses)
+def children_parentheses(children, expr):
+    return ('expr', )
+
+
 class OmitParentheses(Parentheses):
     pass
 
@@ -362,6 +463,17 @@ def compile_callable(compile, expr, state):
     state.sql.append(')')
 
 
+@fingerprint.when(Callable)
+def fingerprint_callable(fingerprint, expr, state):
+    fingerprint(expr.expr, state)
+    fingerprint(expr.args, state)
+
+
+@children.when(Callable)
+def children_callable(children, expr):
+    return ('expr', 'args')
+
+
 class NamedCallable(Callable):
     __slots__ = ()
 
@@ -378,6 +490,17 @@ def compile_namedcallable(compile, expr, state):
     state.sql.append(')')
 
 
+@fingerprint.when(NamedCallable)
+def fingerprint_namedcallable(fingerprint, expr, state):
+    state.shape.append(expr.sql)
+    fingerprint(expr.args, state)
+
+
+@children.when(NamedCallable)
+def children_namedcallable(children, expr):
+    return ('args', )
+
+
 class Constant(Expr):
 
     __slots__ = ()
@@ -394,6 +517,11 @@ def compile_constant(compile, expr, state):
     state.sql.append(expr.sql)
 
 
+@fingerprint.when(Constant)
+def fingerprint_constant(fingerprint, expr, state):
+    state.shape.append(expr.sql)
+
+
 class ConstantSpace(object):
 
     __slots__ = ()
@@ -404,6 +532,8 @@ class ConstantSpace(object):
 
 class Case(Expr):
     __slots__ = ('cases', 'expr', 'default')
+    __volatile__ = True  # The list of cases can be changed in place, see Fingerprinter.key().
+    sql = None
 
     def __init__(self, cases, expr=Undef, default=Undef):
         Operable.__init__(self)
@@ -429,6 +559,21 @@ def compile_case(compile, expr, state):
     state.sql.append(' END ')
 
 
+@fingerprint.when(Case)
+def fingerprint_case(fingerprint, expr, state):
+    fingerprint(expr.expr, state)
+    state.shape.append(len(expr.cases))
+    for clause, value in expr.cases:
+        fingerprint(clause, state)
+        fingerprint(value, state)
+    fingerprint(expr.default, state)
+
+
+@children.when(Case)
+def children_case(children, expr):
+    return ('expr', 'cases', 'default')
+
+
 class Cast(NamedCallable):
     __slots__ = ("expr", "type",)
     sql = "CAST"
@@ -449,6 +594,18 @@ def compile_cast(compile, expr, state):
     state.sql.append(')')
 
 
+@fingerprint.when(Cast)
+def fingerprint_cast(fingerprint, expr, state):
+    state.shape.append(expr.sql)
+    fingerprint(expr.expr, state)
+    state.shape.append(expr.type)
+
+
+@children.when(Cast)
+def children_cast(children, expr):
+    return ('expr', )
+
+
 class Concat(ExprList):
 
     __slots__ = ('_ws', )
@@ -463,6 +620,7 @@ class Concat(ExprList):
             return self._ws
         self._ws = sep
         self.sql = ', '
+        self.__cached__ = {}
         return self
 
 
@@ -478,6 +636,19 @@ def compile_concat(compile, expr, state):
     state.sql.append(')')
 
 
+@fingerprint.when(Concat)
+def fingerprint_concat(fingerprint, expr, state):
+    state.shape.append(bool(expr.ws()))
+    if expr.ws():
+        fingerprint(expr.ws(), state)
+    fingerprint_exprlist(fingerprint, expr, state)
+
+
+@children.when(Concat)
+def children_concat(children, expr):
+    return ('_ws', 'data')
+
+
 class Alias(Expr):
 
     __slots__ = ('expr', 'sql')
@@ -500,6 +671,18 @@ def compile_alias(compile, expr, state):
     compile(expr.sql, state)
 
 
+@fingerprint.when(Alias)
+def fingerprint_alias(fingerprint, expr, state):
+    if state.context == CONTEXT.FIELD:
+        fingerprint(expr.expr, state)
+    fingerprint(expr.sql, state)
+
+
+@children.when(Alias)
+def children_alias(children, expr):
+    return ('expr', 'sql')
+
+
 class Name(object):
 
     __slots__ = ('name', )
@@ -511,7 +694,12 @@ class Name(object):
         return expr_repr(self)
 
 
-class NameCompiler(object):
+class Quoter(object):
+    """Base of NameCompiler and ValueCompiler, which quotes string by delimiter and escapes special characters.
+
+    All special characters are replaced in a single pass, so the escaped delimiter is never escaped again.
+    The options can be passed to constructor without underscore, like NameCompiler(delimiter='`').
+    """
 
     _translation_mapping = (
         ("\\", "\\\\"),
@@ -524,22 +712,46 @@ class NameCompiler(object):
     )
     _delimiter = '"'
     _escape_delimiter = '"'
-    _max_length = 63
+    max_cached = 4096
 
     def __init__(self, **kwargs):
         for k, v in kwargs.items():
             setattr(self, '_{}'.format(k), v)
+        self._cache = {}
+        self._translation = translation = dict(self._translation_mapping)
+        translation[self._delimiter] = self._escape_delimiter + self._delimiter
+        self._special = re.compile('|'.join(map(re.escape, sorted(translation, key=len, reverse=True))))
+
+    def _escape(self, value):
+        special = self._special
+        if special.search(value) is None:
+            return value
+        translation = self._translation
+        return special.sub(lambda m: translation[m.group()], value)
+
+
+class NameCompiler(Quoter):
+    """Quotes names, the quoted names are cached per instance, i.e. per dialect."""
+
+    _max_length = 63
 
     def __call__(self, compile, expr, state):
-        state.sql.append(self._delimiter)
         name = expr.name
-        name = name.replace(self._delimiter, self._escape_delimiter + self._delimiter)
-        for k, v in self._translation_mapping:
-            name = name.replace(k, v)
-        if len(name) > self._get_max_length(state):
-            raise MaxLengthError("The length of name {0!r} is more than {1}".format(name, self._max_length))
-        state.sql.append(name)
-        state.sql.append(self._delimiter)
+        try:
+            quoted, length = self._cache[name]
+        except KeyError:
+            quoted, length = self._quote(name)
+        if length > self._get_max_length(state):
+            raise MaxLengthError("The length of name {0!r} is more than {1}".format(self._escape(name), self._max_length))
+        state.sql.append(quoted)
+
+    def _quote(self, name):
+        escaped = self._escape(name)
+        result = (self._delimiter + escaped + self._delimiter, len(escaped))
+        # Names can be built from user input, so, the cache should stay bounded.
+        if len(self._cache) < self.max_cached:
+            self._cache[name] = result
+        return result
 
     def _get_max_length(self, state):
         # Max length can depend on context.
@@ -549,6 +761,11 @@ compile_name = NameCompiler()
 compile.when(Name)(compile_name)
 
 
+@fingerprint.when(Name)
+def fingerprint_name(fingerprint, expr, state):
+    state.shape.append(expr.name)
+
+
 class Value(object):
 
     __slots__ = ('value', )
@@ -560,38 +777,42 @@ class Value(object):
         return expr_repr(self)
 
 
-class ValueCompiler(object):
+class ValueCompiler(Quoter):
+    """Quotes literals, the small literals of immutable types are cached per instance, i.e. per dialect."""
 
-    _translation_mapping = (
-        ("\\", "\\\\"),
-        ("\000", "\\0"),
-        ('\b', '\\b'),
-        ('\n', '\\n'),
-        ('\r', '\\r'),
-        ('\t', '\\t'),
-        ("%", "%%")
-    )
     _delimiter = "'"
     _escape_delimiter = "'"
-
-    def __init__(self, **kwargs):
-        for k, v in kwargs.items():
-            setattr(self, '_{}'.format(k), v)
+    # Floats are not cached, since 0.0 and -0.0 are equal keys of different literals, and nan isn't equal to itself.
+    _cached_types = frozenset((type(''), type(u''), bool) + integer_types)
+    max_cached_length = 64
 
     def __call__(self, compile, expr, state):
-        state.sql.append(self._delimiter)
-        value = str(expr.value)
-        value = value.replace(self._delimiter, self._escape_delimiter + self._delimiter)
-        for k, v in self._translation_mapping:
-            value = value.replace(k, v)
-        state.sql.append(value)
-        state.sql.append(self._delimiter)
+        value = expr.value
+        try:
+            quoted = self._cache[(value.__class__, value)]
+        except (KeyError, TypeError):
+            quoted = self._quote(value)
+        state.sql.append(quoted)
+
+    def _quote(self, value):
+        escaped = self._escape(str(value))
+        quoted = self._delimiter + escaped + self._delimiter
+        # 1 and True are equal, but they are different literals, so, the type is a part of key.
+        if (value.__class__ in self._cached_types and len(escaped) <= self.max_cached_length and
+                len(self._cache) < self.max_cached):
+            self._cache[(value.__class__, value)] = quoted
+        return quoted
 
 
 compile_value = ValueCompiler()
 compile.when(Value)(compile_value)
 
 
+@fingerprint.when(Value)
+def fingerprint_value(fingerprint, expr, state):
+    state.shape.append(str(expr.value))
+
+
 class Array(ExprList):  # TODO: use composition instead of inheritance, to solve ambiguous of __getitem__()???
     __slots__ = ()
 
@@ -607,6 +828,11 @@ def compile_array(compile, expr, state):
     state.sql.append("ARRAY[{0}]".format(compile_exprlist(compile, expr, state)))
 
 
+@fingerprint.when(Array)
+def fingerprint_array(fingerprint, expr, state):
+    fingerprint_exprlist(fingerprint, expr, state)
+
+
 class ArrayItem(Expr):
 
     __slots__ = ('array', 'key')
@@ -629,15 +855,151 @@ def compile_arrayitem(compile, expr, state):
     state.sql.append("]")
 
 
+@fingerprint.when(ArrayItem)
+def fingerprint_arrayitem(fingerprint, expr, state):
+    fingerprint(expr.array, state)
+    fingerprint(expr.key, state)
+
+
+@children.when(ArrayItem)
+def children_arrayitem(children, expr):
+    return ('array', 'key')
+
+
 def datatypeof(obj):
     if isinstance(obj, Operable):
         return obj._datatype
-
-    from sqlbuilder.smartsql.datatypes import BaseType
     return BaseType
 
 
-def expr_repr(expr):
-    return "<{0}: {1}, {2!r}>".format(type(expr).__name__, *compile(expr))
+class Representer(object):
+    """Representation of expression by its compiled SQL and parameters, see expr_repr().
+
+    The SQL is compiled until it's longer than max_length characters, or longer than max_seconds,
+    and then the representation is truncated, including the parameters. Only max_params parameters are represented.
+    If compiled is False, the expression is represented by its class and id without compilation,
+    for example, to log the expressions in production. None disables the limit.
+    """
+    max_length = 4096
+    max_params = 100
+    max_seconds = 0.05
+    compiled = True
+
+    def __init__(self, **kwargs):
+        for k, v in kwargs.items():
+            setattr(self, k, v)
+
+    def __call__(self, expr):
+        name = type(expr).__name__
+        if not self.compiled:
+            return "<{0} at {1:#x}>".format(name, id(expr))
+        state = _ReprState(_ReprBudget(self.max_length, self.max_seconds))
+        state.inline = True  # Compiled fragments are not cached, so the SQL is watched while it's compiled.
+        state.sql = state.new_sql()
+        try:
+            compile(expr, state)
+            truncated = False
+        except _ReprBudgetExceeded:
+            truncated = True
+        sql = ''.join(state.sql)
+        if self.max_length is not None and len(sql) > self.max_length:
+            sql, truncated = sql[:self.max_length], True
+        params = state.params
+        if self.max_params is not None and len(params) > self.max_params:
+            params, truncated_params = params[:self.max_params], True
+        else:
+            truncated_params = truncated  # The parameters of truncated SQL can be incomplete.
+        if truncated_params:
+            params = repr(params)[:-1] + (', ...]' if params else '...]')
+        else:
+            params = repr(params)
+        return "<{0}: {1}{2}, {3}>".format(name, sql, '...' if truncated else '', params)
+
+
+class _ReprBudgetExceeded(Exception):
+    pass
+
+
+class _ReprBudget(object):
+    """Budget of Representer, which is shared by all lists of SQL of the compilation."""
+
+    check_interval = 64  # Time is checked once per so many appends.
+
+    def __init__(self, max_length, max_seconds):
+        self.length = 0
+        self.max_length = max_length
+        self.deadline = None if max_seconds is None else default_timer() + max_seconds
+        self.countdown = self.check_interval
+
+    def spend(self, length):
+        self.length += length
+        if self.max_length is not None and self.length > self.max_length:
+            raise _ReprBudgetExceeded
+        self.countdown -= 1
+        if not self.countdown:
+            self.countdown = self.check_interval
+            if self.deadline is not None and default_timer() > self.deadline:
+                raise _ReprBudgetExceeded
+
+
+class _ReprState(State):
+    """State of Representer, which watches the SQL of fragments, like FROM of Select, too."""
+
+    __slots__ = ()
+
+    def __init__(self, budget):
+        State.__init__(self)
+        self.budget = budget
+
+    def new_sql(self):
+        return _ReprBuffer(self.budget)
+
+
+class _ReprBuffer(list):
+    """List of SQL, which interrupts compilation when the budget of Representer is exceeded.
+
+    The SQL of other buffers of the same budget is already spent, so it's not counted again when it's inserted.
+    """
+
+    def __init__(self, budget):
+        list.__init__(self)
+        self.budget = budget
+
+    def append(self, sql):
+        list.append(self, sql)
+        self.budget.spend(len(sql))
+
+    def extend(self, sqls):
+        sqls, length = self._measure(sqls)
+        list.extend(self, sqls)
+        self.budget.spend(length)
+
+    def __iadd__(self, sqls):
+        self.extend(sqls)
+        return self
+
+    def insert(self, index, sql):
+        list.insert(self, index, sql)
+        self.budget.spend(len(sql))
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            value, length = self._measure(value)
+            list.__setitem__(self, index, value)
+            self.budget.spend(length)
+        else:
+            list.__setitem__(self, index, value)
+
+    def _measure(self, sqls):
+        """Returns the list of SQL and its length, which is not spent yet."""
+        if isinstance(sqls, _ReprBuffer) and sqls.budget is self.budget:
+            return sqls, 0
+        sqls = list(sqls)
+        return sqls, sum(map(len, sqls))
+
+
+expr_repr = Representer()
 
 func = const = ConstantSpace()
+
+from sqlbuilder.smartsql.datatypes import BaseType  # circular import, see Operable.__init__()
@@ -2,7 +2,9 @@ from __future__ import absolute_import
 from sqlbuilder.smartsql.compiler import compile, cached_compile
 from sqlbuilder.smartsql.constants import LOOKUP_SEP, CONTEXT
 from sqlbuilder.smartsql.expressions import Operable, Expr, Constant, ExprList, Parentheses, Name, compile_exprlist
+from sqlbuilder.smartsql.fingerprint import fingerprint
 from sqlbuilder.smartsql.pycompat import string_types
+from sqlbuilder.smartsql.visitor import children
 
 __all__ = ('MetaFieldSpace', 'F', 'MetaField', 'Field', 'Subfield', 'FieldList', )
 
@@ -50,6 +52,7 @@ class Field(MetaField("NewBase", (Expr,), {})):
     # It's a field, not column, because prefix can be alias of subquery.
     # It also can be a field of composite column.
     __slots__ = ('_name', '_prefix', '__cached__')  # TODO: m_* prefix instead of _* prefix?
+    sql = None
 
     def __init__(self, name, prefix=None, datatype=None):
         Operable.__init__(self, datatype)
@@ -71,13 +74,30 @@ class Field(MetaField("NewBase", (Expr,), {})):
 def compile_field(compile, expr, state):
     if expr._prefix is not None and state.context != CONTEXT.FIELD_NAME:
         state.auto_tables.append(expr._prefix)  # it's important to know the concrete alias of table.
-        state.push("context", CONTEXT.FIELD_PREFIX)
+        context = state.context
+        state.context = CONTEXT.FIELD_PREFIX
         compile(expr._prefix, state)
-        state.pop()
+        state.context = context
         state.sql.append('.')
     compile(expr._name, state)
 
 
+@fingerprint.when(Field)
+def fingerprint_field(fingerprint, expr, state):
+    # The prefix is visited regardless of context, since some dialects compile it in FIELD_NAME context too.
+    if expr._prefix is not None:
+        context = state.context
+        state.context = CONTEXT.FIELD_PREFIX
+        fingerprint(expr._prefix, state)
+        state.context = context
+    fingerprint(expr._name, state)
+
+
+@children.when(Field)
+def children_field(children, expr):
+    return ('_prefix', '_name')
+
+
 class Subfield(Expr):
 
     __slots__ = ('parent', 'name', )
@@ -102,6 +122,17 @@ def compile_subfield(compile, expr, state):
     compile(expr.name, state)
 
 
+@fingerprint.when(Subfield)
+def fingerprint_subfield(fingerprint, expr, state):
+    fingerprint(expr.parent, state)
+    fingerprint(expr.name, state)
+
+
+@children.when(Subfield)
+def children_subfield(children, expr):
+    return ('parent', 'name')
+
+
 class FieldList(ExprList):
     __slots__ = ()
 
@@ -0,0 +1,244 @@
+from __future__ import absolute_import
+import threading
+from collections import OrderedDict
+from sqlbuilder.smartsql.compiler import State, compile as default_compile
+from sqlbuilder.smartsql.constants import CONTEXT
+from sqlbuilder.smartsql.exceptions import Error
+
+__all__ = (
+    'Fingerprinter', 'FingerprintState', 'StructuralKey', 'CompileCache', 'fingerprint', 'structural_key', 'compile_cache',
+)
+
+
+class Fingerprinter(object):
+    """Structural fingerprint of expression tree.
+
+    Two trees have the same fingerprint if they are compiled to the same SQL
+    and differ only by parameters. Handlers are registered in the same way as for Compiler,
+    and they should visit the parts of node in the same order and in the same context as compiler does,
+    so the extracted values have the order of compiled parameters.
+    """
+
+    def __init__(self):
+        self._registry = {}
+        self._handlers = {}
+        self._lock = threading.Lock()
+
+    def when(self, cls):
+        def deco(func):
+            with self._lock:
+                registry = dict(self._registry)
+                registry[cls] = func
+                self._registry = registry
+                self._handlers = {}
+            return func
+        return deco
+
+    def __call__(self, expr, state=None):
+        """Returns hashable fingerprint of expr if state is None."""
+        if state is None:
+            state = FingerprintState()
+            self(expr, state)
+            return tuple(state.shape)
+
+        cls = expr.__class__
+        state.shape.append(cls)
+        try:
+            handler = self._handlers[cls]
+        except KeyError:
+            handler = self.get_handler(cls)
+        handler(self, expr, state)
+
+    def extract(self, expr):
+        """Returns tuple of fingerprint and list of bound values of expr."""
+        state = FingerprintState()
+        self(expr, state)
+        return tuple(state.shape), state.values
+
+    def key(self, expr):
+        """Returns StructuralKey of expr, which is computed once and memoized on the node.
+
+        The key is kept in the __cached__ dict of node if the node has it, since this dict
+        is replaced when the node is changed in place, see cached_compile(). Otherwise it's kept
+        in the __structural__ slot of Operable, other expressions are immutable.
+        Leaf nodes without both attributes, like Name or Table, are not memoized.
+        Nodes with true class attribute __volatile__, like queries, are not memoized as well,
+        since their parts can be changed in place, like q.fields().append(f).
+        """
+        if getattr(expr.__class__, '__volatile__', False):
+            return StructuralKey(*self.extract(expr))
+        registry = self._registry  # is replaced on registration, so it's the generation of handlers
+        cached = getattr(expr, '__cached__', None)
+        if type(cached) is dict:
+            entry = cached.get(self)
+        else:
+            cached = None
+            entry = getattr(expr, '__structural__', None)
+        if entry is not None and entry[0] is self and entry[1] is registry:
+            return entry[2]
+
+        shape, values = self.extract(expr)
+        key = StructuralKey(shape, values)
+        entry = (self, registry, key)
+        if cached is not None:
+            cached[self] = entry
+        elif hasattr(type(expr), '__structural__'):
+            expr.__structural__ = entry
+        return key
+
+    def get_handler(self, cls):
+        handlers = self._handlers
+        try:
+            return handlers[cls]
+        except KeyError:
+            pass
+        registry = self._registry  # is replaced on registration, like in Compiler
+        for c in cls.__mro__:
+            if c in registry:
+                handler = handlers[cls] = registry[c]
+                return handler
+        raise Error("Unknown fingerprint for {0}".format(cls))
+
+
+class FingerprintState(State):
+    __slots__ = ('shape', 'values', )
+
+    def __init__(self):
+        self.shape = []
+        self.values = []
+        self._stack = []
+        self.context = CONTEXT.QUERY
+
+
+class StructuralKey(object):
+    """Hashable key of expression, since Operable.__eq__() returns expression instead of bool.
+
+    Expressions have equal keys if they are compiled to the same SQL with the same parameters.
+    Parameters are compared with their types, so 1 and True are different.
+    """
+    __slots__ = ('shape', 'values', '_hash')
+
+    def __init__(self, shape, values):
+        self.shape = _freeze(tuple(shape))
+        self.values = tuple((value.__class__, _freeze(value)) for value in values)
+        self._hash = hash((self.shape, self.values))
+
+    def __hash__(self):
+        return self._hash
+
+    def __eq__(self, other):
+        if self is other:
+            return True
+        if not isinstance(other, StructuralKey) or self._hash != other._hash:
+            return False
+        return self.shape == other.shape and self.values == other.values
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __repr__(self):
+        return "<{0}: {1:#x}>".format(type(self).__name__, self._hash & 0xffffffffffffffff)
+
+
+class _Identity(object):
+    """Unhashable value, which is equal only to itself."""
+    __slots__ = ('value', )
+
+    def __init__(self, value):
+        self.value = value
+
+    def __hash__(self):
+        return id(self.value)
+
+    def __eq__(self, other):
+        return isinstance(other, _Identity) and self.value is other.value
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+
+def _freeze(value):
+    try:
+        hash(value)
+        return value
+    except TypeError:
+        pass
+    if isinstance(value, (list, tuple)):
+        return tuple((item.__class__, _freeze(item)) for item in value)
+    if isinstance(value, dict):
+        return frozenset((_freeze(k), (v.__class__, _freeze(v))) for k, v in value.items())
+    if isinstance(value, (set, frozenset)):
+        return frozenset(_freeze(item) for item in value)
+    return _Identity(value)
+
+
+fingerprint = Fingerprinter()
+structural_key = fingerprint.key
+
+_UNCACHEABLE = object()
+
+
+class CompileCache(object):
+    """Process-wide bounded LRU cache of compiled SQL keyed by compiler and fingerprint of expression.
+
+    Returns cached SQL with parameters extracted from the given expression.
+    If the parameters extracted from the first compiled expression of the shape
+    are not the same as compiled parameters (for example, custom handler transforms the parameters),
+    then the shape is not cached and expressions of this shape are always compiled.
+    """
+
+    def __init__(self, maxsize=1024, fingerprinter=fingerprint):
+        self.maxsize = maxsize
+        self.fingerprint = fingerprinter
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __call__(self, expr, compile=None):
+        """Returns tuple with SQL string and list of parameters, like Compiler.__call__()."""
+        if compile is None:
+            compile = default_compile
+        shape, values = self.fingerprint.extract(expr)
+        key = (compile, compile._generation, shape)
+        with self._lock:
+            sql = self._data.pop(key, None)
+            if sql is not None:
+                self._data[key] = sql
+            if sql is None or sql is _UNCACHEABLE:
+                self.misses += 1
+            else:
+                self.hits += 1
+        if sql is None:
+            sql, params = compile(expr)
+            self._set(key, sql if _is_same(params, values) else _UNCACHEABLE)
+            return sql, params
+        if sql is _UNCACHEABLE:
+            return compile(expr)
+        return sql, values
+
+    def _set(self, key, sql):
+        with self._lock:
+            self._data[key] = sql
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = 0
+
+    def __len__(self):
+        return len(self._data)
+
+
+def _is_same(params, values):
+    if len(params) != len(values):
+        return False
+    for param, value in zip(params, values):
+        if param is not value:
+            return False
+    return True
+
+
+compile_cache = CompileCache()
@@ -0,0 +1,118 @@
+"""Opt-in interning of immutable leaf nodes for large catalogs of prebuilt queries."""
+from __future__ import absolute_import
+from sqlbuilder.smartsql.expressions import Constant, Name, Operable
+from sqlbuilder.smartsql.fields import Field
+from sqlbuilder.smartsql.pycompat import string_types
+from sqlbuilder.smartsql.tables import Table, TableJoin
+
+__all__ = ('Interner', )
+
+
+class Interner(object):
+    """Pool of shared leaf nodes, which replaces identical leaf nodes of expression.
+
+    Interned are instances of Name, Constant, Table without fields and parent, and Field
+    with the same name, the same prefix and the same datatype. Subclasses are never interned,
+    since they can have other state. So the queries of catalog share the leaf nodes
+    and their compiled fragments, see cached_compile().
+
+    The expression is changed in place, so interned leaf nodes should never be changed in place later.
+    """
+
+    def __init__(self):
+        self._pool = {}
+
+    def __call__(self, expr):
+        """Replaces leaf nodes of expr by the shared ones and returns expr, or its replacement if expr is a leaf."""
+        return self._intern(expr)
+
+    def __len__(self):
+        return len(self._pool)
+
+    def _intern(self, expr):
+        # Post-order with explicit stack, like Transformer, so deep chains of operators don't exhaust the stack.
+        seen = {}  # id(obj) -> (obj, interned), obj is kept, so its id can't be reused by a new tuple
+        stack = [(expr, None)]
+        while stack:
+            obj, items = stack.pop()
+            if items is None:
+                if id(obj) in seen:
+                    continue
+                items = _children(obj)
+                if items is None:
+                    seen[id(obj)] = (obj, self._intern_leaf(obj))
+                    continue
+                cls = type(obj)
+                if cls is not tuple and cls is not Table and cls is not Field:
+                    seen[id(obj)] = (obj, obj)  # changed in place, it also stops the cycles
+                stack.append((obj, items))
+                stack.extend((value, None) for name, value in reversed(items) if id(value) not in seen)
+                continue
+            changes = [(name, seen[id(value)][1]) for name, value in items if seen[id(value)][1] is not value]
+            seen[id(obj)] = (obj, self._rebuild(obj, changes))
+        return seen[id(expr)][1]
+
+    def _intern_leaf(self, obj):
+        cls = type(obj)
+        if cls is Name:
+            return self._pool.setdefault((cls, obj.name), obj)
+        if cls is Constant:
+            return self._pool.setdefault((cls, obj.sql, obj._datatype), obj)
+        return obj
+
+    def _rebuild(self, obj, changes):
+        cls = type(obj)
+        if cls is tuple:
+            if changes:
+                items = list(obj)
+                for i, value in changes:
+                    items[i] = value
+                obj = tuple(items)
+            return obj
+        if cls is list:
+            for i, value in changes:
+                obj[i] = value
+            return obj
+        for name, value in changes:
+            setattr(obj, name, value)
+        if cls is Table:
+            return self._pool.setdefault((cls, id(obj._name)), obj)
+        if cls is Field:
+            return self._pool.setdefault((cls, id(obj._name), id(obj._prefix), obj._datatype), obj)
+        return obj
+
+
+def _children(obj):
+    """Returns list of (name, value) to intern, or None if obj is a leaf."""
+    cls = type(obj)
+    if cls is Name or cls is Constant:
+        return None
+    if cls is Table:
+        if obj._fields or obj._parent is not None:
+            return None
+        return [('_name', obj._name)]
+    if cls is Field:
+        return [('_name', obj._name), ('_prefix', obj._prefix)]
+    if cls is list or cls is tuple:
+        return list(enumerate(obj))
+    if isinstance(obj, (Operable, Table, TableJoin)):
+        return list(_iter_attrs(obj))
+    return None
+
+
+def _iter_attrs(obj):
+    for cls in type(obj).__mro__:
+        slots = cls.__dict__.get('__slots__', ())
+        if isinstance(slots, string_types):
+            slots = (slots,)
+        for name in slots:
+            if name in ('__dict__', '__weakref__'):
+                continue
+            if name.startswith('__') and not name.endswith('__'):
+                name = '_{0}{1}'.format(cls.__name__.lstrip('_'), name)
+            try:
+                yield name, cls.__dict__[name].__get__(obj, cls)  # Operable.__getattr__() is omitted for unset slot
+            except (KeyError, AttributeError):
+                pass
+    for name, value in list(getattr(obj, '__dict__', {}).items()):
+        yield name, value
@@ -1,43 +1,100 @@
 from __future__ import absolute_import
+import itertools
+import threading
 import weakref
 
 __all__ = ('OperatorRegistry', 'operator_registry', )
 
 
+# Registration is rare, so one lock is shared by all registries, it also guards the tree of registries.
+_registration_lock = threading.RLock()
+
+
 class OperatorRegistry(object):
+    """Registry of operators, safe for concurrent readers with runtime registration, like Compiler.
+
+    Operators are resolved along the class hierarchy of operand datatypes, the nearest base of the left operand
+    is preferred. Resolutions are memoized per operator and operand datatypes, including the misses,
+    until the next registration on this registry or on any of its parents.
+    At most max_resolved resolutions are memoized, since datatypes and operators can be made at runtime.
+    """
+
+    max_resolved = 4096  # the number of (operator, operand datatypes) entries
 
     def __init__(self, parent=None):
         self._children = weakref.WeakKeyDictionary()
         self._parents = []
         self._local_registry = {}
         self._registry = {}
+        self._resolved = {}  # operator -> {operand datatypes -> (result_type, expression_factory)}
+        self._resolved_count = 0
         if parent:
-            self._parents.extend(parent._parents)
-            self._parents.append(parent)
-            parent._children[self] = True
-            self._update_cache()
+            with _registration_lock:
+                self._parents.extend(parent._parents)
+                self._parents.append(parent)
+                parent._children[self] = True
+                self._update_cache()
 
     def create_child(self):
         return self.__class__(self)
 
     def register(self, operator, operands, result_type, expression_factory):
-        self._registry[(operator, operands)] = (result_type, expression_factory)
-        self._update_cache()
+        with _registration_lock:
+            self._local_registry[(operator, operands)] = (result_type, expression_factory)
+            self._update_cache()
 
     def get(self, operator, operands):
+        resolved = self._resolved  # see _update_cache() for order
         try:
-            return self._registry[(operator, operands)]
+            return resolved[operator][operands]
         except KeyError:
+            return self._resolve(resolved, operator, operands)
+
+    def _resolve(self, resolved, operator, operands):
+        registry = self._registry
+        for candidate in itertools.product(*[getattr(t, '__mro__', (t,)) for t in operands]):
+            if (operator, candidate) in registry:
+                result = registry[(operator, candidate)]
+                break
+        else:
             # raise OperatorNotFound(operator, operands)
-            from sqlbuilder.smartsql.datatypes import BaseType
-            from sqlbuilder.smartsql.operators import Binary
-            return (BaseType, lambda l, r: Binary(l, operator, r))
+            result = get_default(operator)
+        # The count is approximate under concurrent resolution, it only has to keep the memo bounded.
+        if self._resolved_count < self.max_resolved:
+            entries = resolved.setdefault(operator, {})
+            if operands not in entries:
+                self._resolved_count += 1
+            entries[operands] = result
+        return result
 
     def _update_cache(self):
+        registry = {}
         for parent in self._parents:
-            self._registry.update(parent._local_registry)
-        self._registry.update(self._local_registry)
-        for child in self._children:
+            registry.update(parent._local_registry)
+        registry.update(self._local_registry)
+        # The source is replaced before the memo, and readers take the memo before the source.
+        self._registry = registry
+        self._resolved = {}
+        self._resolved_count = 0
+        for child in list(self._children):
             child._update_cache()
 
+
+def get_default(operator):
+    """Returns (result_type, expression_factory) of operator which is not registered, the generic Binary."""
+    try:
+        return _defaults[operator]
+    except KeyError:
+        pass
+    from sqlbuilder.smartsql.datatypes import BaseType
+    from sqlbuilder.smartsql.operators import Binary
+    default = (BaseType, lambda l, r: Binary(l, operator, r))
+    # Operator of Binary can be arbitrary SQL, so, the cache should stay bounded.
+    if len(_defaults) < OperatorRegistry.max_resolved:
+        default = _defaults.setdefault(operator, default)
+    return default
+
+
+_defaults = {}
+
 operator_registry = OperatorRegistry()
@@ -2,13 +2,15 @@ from __future__ import absolute_import
 from functools import reduce
 from sqlbuilder.smartsql.compiler import compile
 from sqlbuilder.smartsql.expressions import Expr, Operable, Value, datatypeof, func
+from sqlbuilder.smartsql.fingerprint import fingerprint
 from sqlbuilder.smartsql.operator_registry import operator_registry
 from sqlbuilder.smartsql.pycompat import string_types
 from sqlbuilder.smartsql.utils import Undef
+from sqlbuilder.smartsql.visitor import children
 
 __all__ = (
-    'Binary', 'NamedBinary', 'NamedCompound', 'Add', 'Sub', 'Mul', 'Div', 'Gt', 'Lt', 'Ge', 'Le', 'And', 'Or',
-    'Eq', 'Ne', 'Is', 'IsNot', 'In', 'NotIn', 'RShift', 'LShift', 'EscapeForLike', 'Like', 'ILike',
+    'Binary', 'NamedBinary', 'NamedCompound', 'NamedFlatCompound', 'Add', 'Sub', 'Mul', 'Div', 'Gt', 'Lt', 'Ge', 'Le', 'And', 'Or',
+    'Eq', 'Ne', 'Is', 'IsNot', 'In', 'NotIn', 'InList', 'NotInList', 'InListCompiler', 'RShift', 'LShift', 'EscapeForLike', 'Like', 'ILike',
     'Ternary', 'NamedTernary', 'Between', 'NotBetween',
     'Prefix', 'NamedPrefix', 'Not', 'All', 'Distinct', 'Exists',
     'Unary', 'NamedUnary', 'Pos', 'Neg',
@@ -31,6 +33,9 @@ class Binary(Expr):
 
 @compile.when(Binary)
 def compile_binary(compile, expr, state):
+    if (isinstance(expr.left, Binary) or isinstance(expr.right, Binary)) and is_deep_binary(expr):
+        compile_binary_chain(compile, expr, state, compile_binary)
+        return
     compile(expr.left, state)
     state.sql.append(SPACE)
     state.sql.append(expr.sql)
@@ -38,6 +43,110 @@ def compile_binary(compile, expr, state):
     compile(expr.right, state)
 
 
+def get_operands(expr):
+    if isinstance(expr, NamedFlatCompound):
+        return expr.data
+    return (expr.left, expr.right)
+
+
+def is_deep_binary(expr, depth=8):
+    """Returns True if the chain of first or last operands of expr is deeper than depth.
+
+    Short chains are cheaper to compile recursively.
+    """
+    for i in (0, -1):
+        node, level = get_operands(expr)[i], 0
+        while isinstance(node, Binary):
+            level += 1
+            if level > depth:
+                return True
+            node = get_operands(node)[i]
+    return False
+
+
+def compile_binary_chain(compile, expr, state, handler, translation_map=None):
+    """Compiles nested binary operators with explicit stack instead of recursion.
+
+    Chains like reduce(operator.add, terms) or Select.where() with alternating operators are nested
+    one level per operand and can exceed the recursion limit.
+    Operands compiled by the same handler are entered here like Compiler.__call__() does,
+    all other operands are passed to compiler.
+    """
+    handlers = compile._handlers
+    # The handler is wrapped in compile._handlers while the profiler is set, see Compiler.set_profiler().
+    wrapped = handlers.get(expr.__class__, handler)
+    get_precedence = compile._get_precedence
+    sql = state.sql
+    # Entered nodes waiting for the rest of operands. The last operand is the last part of node,
+    # so it's entered in place of node and closes its parentheses as well.
+    stack = []
+    node, operands, i, closing, outer_precedence = expr, get_operands(expr), 0, 0, state.precedence
+    while True:
+        if i == len(operands):
+            if closing:
+                sql.append(')' * closing)
+            state.precedence = outer_precedence
+            if not stack:
+                return
+            node, operands, i, closing, outer_precedence = stack.pop()
+            continue
+        if i:
+            sql.append(SPACE)
+            sql.append(translation_map.get(node.sql, node.sql) if translation_map else node.sql)
+            sql.append(SPACE)
+        operand = operands[i]
+        i += 1
+        if not (isinstance(operand, Binary) and handlers.get(operand.__class__) in (handler, wrapped)):
+            compile(operand, state)
+            continue
+        if i < len(operands):
+            stack.append((node, operands, i, closing, outer_precedence))
+            closing, outer_precedence = 0, state.precedence
+        node, operands, i = operand, get_operands(operand), 0
+        inner_precedence = get_precedence(node)
+        if inner_precedence is not None:
+            if inner_precedence < state.precedence:
+                sql.append('(')
+                closing += 1
+            state.precedence = inner_precedence
+
+
+@fingerprint.when(Binary)
+def fingerprint_binary(fingerprint, expr, state):
+    # Iterative for deep chains, see compile_binary_chain().
+    get_handler = fingerprint.get_handler
+    stack = []
+    operands, i = _fingerprint_operator(expr, state), 0
+    while True:
+        if i == len(operands):
+            if not stack:
+                return
+            operands, i = stack.pop()
+            continue
+        operand = operands[i]
+        i += 1
+        if isinstance(operand, Binary) and get_handler(operand.__class__) is fingerprint_binary:
+            state.shape.append(operand.__class__)
+            if i < len(operands):
+                stack.append((operands, i))
+            operands, i = _fingerprint_operator(operand, state), 0
+        else:
+            fingerprint(operand, state)
+
+
+@children.when(Binary)
+def children_binary(children, expr):
+    return ('left', 'right')
+
+
+def _fingerprint_operator(expr, state):
+    state.shape.append(expr.sql)
+    operands = get_operands(expr)
+    if isinstance(expr, NamedFlatCompound):
+        state.shape.append(len(operands))
+    return operands
+
+
 class NamedBinary(Binary):
     __slots__ = ()
 
@@ -60,6 +169,84 @@ class NamedCompound(NamedBinary):
         Operable.__init__(self, datatype)
 
 
+class NamedFlatCompound(NamedCompound):
+    """N-ary form of associative operator.
+
+    Operands of the same class are absorbed, so (a & b) & c is one node with three operands.
+    It's compiled to the same SQL as the chain of binary nodes,
+    and left/right are kept for handlers of Binary.
+    Note, the handler of NamedFlatCompound is more specific than handler of Binary,
+    so a dialect which overrides compilation of Binary has to override NamedFlatCompound too.
+    """
+    __slots__ = ('data', '_left')
+
+    def __init__(self, *exprs):
+        cls = self.__class__
+        data = []
+        for expr in exprs:
+            if expr.__class__ is cls:
+                data += expr.data
+            else:
+                data.append(expr)
+        datatype = datatypeof(exprs[0])
+        for expr in exprs[1:]:
+            datatype = operator_registry.get(self.sql, (datatype, datatypeof(expr)))[0]
+        Operable.__init__(self, datatype)
+        self.data = data
+        self._left = None
+
+    @property
+    def left(self):
+        """Returns the chain of nodes with two operands, like reduce() makes.
+
+        The chain is built in linear time and kept until data is changed, so handlers of Binary
+        can walk it without copying of operands per node.
+        """
+        data = self.data
+        if len(data) == 2:
+            return data[0]
+        operands = tuple(data[:-1])
+        if self._left is not None:
+            cached_operands, left = self._left
+            if len(cached_operands) == len(operands) and all(a is b for a, b in zip(cached_operands, operands)):
+                return left
+        cls = self.__class__
+        left = operands[0]
+        for operand in operands[1:]:
+            c = cls.__new__(cls)
+            Operable.__init__(c, self._datatype)
+            c.data = [left, operand]
+            c._left = None
+            left = c
+        self._left = (operands, left)
+        return left
+
+    @property
+    def right(self):
+        return self.data[-1]
+
+
+@compile.when(NamedFlatCompound)
+def compile_namedflatcompound(compile, expr, state):
+    if is_deep_binary(expr):
+        compile_binary_chain(compile, expr, state, compile_namedflatcompound)
+        return
+    first = True
+    for a in expr.data:
+        if first:
+            first = False
+        else:
+            state.sql.append(SPACE)
+            state.sql.append(expr.sql)
+            state.sql.append(SPACE)
+        compile(a, state)
+
+
+@children.when(NamedFlatCompound)
+def children_namedflatcompound(children, expr):
+    return ('data', )
+
+
 class Add(NamedCompound):
     sql = '+'
 
@@ -99,12 +286,12 @@ class Le(NamedBinary):
     sql = '<='
 
 
-class And(NamedCompound):
+class And(NamedFlatCompound):
     __slots__ = ()
     sql = 'AND'
 
 
-class Or(NamedCompound):
+class Or(NamedFlatCompound):
     __slots__ = ()
     sql = 'OR'
 
@@ -139,6 +326,72 @@ class NotIn(NamedBinary):
     sql = 'NOT IN'
 
 
+class InList(In):
+    """IN operator with list or tuple of values, like T.author.id.in_([1, 2, 3]) or T.author.id == [1, 2, 3].
+
+    The values are compiled in a single pass, see InListCompiler.
+    """
+    __slots__ = ()
+
+
+class NotInList(NotIn):
+    __slots__ = ()
+
+
+class InListCompiler(object):
+    """Compiles InList and NotInList without compilation of every value as a node.
+
+    If all values are compiled by the handler of object, i.e. as parameters, the first value is compiled as usual,
+    and its placeholder is repeated for the rest values. Otherwise, the node is compiled as In or NotIn.
+    With array=True the list is passed as the single array parameter, like "id" = ANY(%s) of PostgreSQL,
+    so the SQL doesn't depend on the length of list.
+    """
+
+    _array_operators = {
+        'IN': ' = ANY(',
+        'NOT IN': ' <> ALL(',
+    }
+
+    def __init__(self, array=False):
+        self._array = array
+
+    def __call__(self, compile, expr, state):
+        values = expr.right
+        get_handler = compile.get_handler
+        if values and not state.slots:
+            handler = get_handler(object)
+            if all(get_handler(cls) is handler for cls in set(map(type, values))):
+                compile(expr.left, state)
+                if self._array:
+                    self._compile_array(compile, expr, state)
+                else:
+                    self._compile_list(compile, expr, state)
+                return
+        get_handler(In if isinstance(expr, In) else NotIn)(compile, expr, state)
+
+    def _compile_array(self, compile, expr, state):
+        state.sql.append(self._array_operators[expr.sql])
+        compile(expr.right[0], state)
+        state.params[-1] = list(expr.right)
+        state.sql.append(')')
+
+    def _compile_list(self, compile, expr, state):
+        values = expr.right
+        sql = state.sql
+        sql.append(SPACE)
+        sql.append(expr.sql)
+        sql.append(' (')
+        compile(values[0], state)
+        sql.append((', ' + sql[-1]) * (len(values) - 1))
+        state.params.extend(values[1:])
+        sql.append(')')
+
+
+compile_in_list = InListCompiler()
+compile.when(InList)(compile_in_list)
+compile.when(NotInList)(compile_in_list)
+
+
 class RShift(NamedBinary):
     __slots__ = ()
     sql = ">>"
@@ -152,6 +405,7 @@ class LShift(NamedBinary):
 class EscapeForLike(Expr):
 
     __slots__ = ('expr',)
+    sql = None
 
     escape = "!"
     escape_map = tuple(  # Ordering is important!
@@ -171,6 +425,17 @@ def compile_escapeforlike(compile, expr, state):
     compile(escaped, state)
 
 
+@fingerprint.when(EscapeForLike)
+def fingerprint_escapeforlike(fingerprint, expr, state):
+    state.shape.append(tuple(expr.escape_map))
+    fingerprint(expr.expr, state)
+
+
+@children.when(EscapeForLike)
+def children_escapeforlike(children, expr):
+    return ('expr', )
+
+
 class Like(NamedBinary):
     __slots__ = ('escape',)
     sql = 'LIKE'
@@ -201,6 +466,20 @@ def compile_like(compile, expr, state):
         compile(Value(expr.escape) if isinstance(expr.escape, string_types) else expr.escape, state)
 
 
+@fingerprint.when(Like)
+def fingerprint_like(fingerprint, expr, state):
+    fingerprint_binary(fingerprint, expr, state)
+    if isinstance(expr.escape, string_types):
+        state.shape.append(expr.escape)
+    else:
+        fingerprint(expr.escape, state)
+
+
+@children.when(Like)
+def children_like(children, expr):
+    return ('left', 'right', 'escape')
+
+
 # Ternary
 
 class Ternary(Expr):
@@ -227,6 +506,20 @@ def compile_ternary(compile, expr, state):
     compile(expr.third, state)
 
 
+@fingerprint.when(Ternary)
+def fingerprint_ternary(fingerprint, expr, state):
+    fingerprint(expr.first, state)
+    state.shape.append(expr.sql)
+    fingerprint(expr.second, state)
+    state.shape.append(expr.second_sql)
+    fingerprint(expr.third, state)
+
+
+@children.when(Ternary)
+def children_ternary(children, expr):
+    return ('first', 'second', 'third')
+
+
 class NamedTernary(Ternary):
     __slots__ = ()
 
@@ -266,6 +559,17 @@ def compile_prefix(compile, expr, state):
     compile(expr.expr, state)
 
 
+@fingerprint.when(Prefix)
+def fingerprint_prefix(fingerprint, expr, state):
+    state.shape.append(expr.sql)
+    fingerprint(expr.expr, state)
+
+
+@children.when(Prefix)
+def children_prefix(children, expr):
+    return ('expr', )
+
+
 class NamedPrefix(Prefix):
     __slots__ = ()
 
@@ -340,6 +644,17 @@ def compile_postfix(compile, expr, state):
     state.sql.append(expr.sql)
 
 
+@fingerprint.when(Postfix)
+def fingerprint_postfix(fingerprint, expr, state):
+    fingerprint(expr.expr, state)
+    state.shape.append(expr.sql)
+
+
+@children.when(Postfix)
+def children_postfix(children, expr):
+    return ('expr', )
+
+
 class NamedPostfix(Postfix):
     __slots__ = ()
 
@@ -0,0 +1,133 @@
+"""Opt-in profiler of compile handlers, see Compiler.set_profiler()."""
+from __future__ import absolute_import
+import collections
+import threading
+import time
+
+__all__ = ('Profiler', )
+
+default_timer = getattr(time, 'perf_counter', time.time)
+
+
+class Profiler(object):
+    """Counts calls and time of compile handlers per handler and per node type.
+
+    The inclusive time includes the time of nested handlers, the exclusive time doesn't.
+    The inclusive time of recursive calls is counted once, by the outermost call.
+    Nodes with cached fragments (see cached_compile()) are counted with the time of cache lookup,
+    and operands of deep chains of binary operators, which are compiled without recursion,
+    are counted in the outermost operator.
+
+    The statistics of the latest max_queries top level compilations are kept in the queries attribute.
+    """
+
+    def __init__(self, max_queries=100, timer=default_timer):
+        self.timer = timer
+        self.handlers = {}  # name of handler -> [calls, inclusive, exclusive]
+        self.node_types = {}  # name of node class -> [calls, inclusive, exclusive]
+        self.queries = collections.deque(maxlen=max_queries)
+        self._wrapped = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def wrap(self, handler):
+        """Returns the profiled handler, it's called by Compiler.get_handler()."""
+        try:
+            return self._wrapped[handler]
+        except KeyError:
+            pass
+        name = get_handler_name(handler)
+        timer, local, record = self.timer, self._local, self._record
+
+        def profiled(compile, expr, state):
+            try:
+                frames, active = local.frames, local.active
+            except AttributeError:
+                frames, active = local.frames, local.active = [], {}
+            if not frames:
+                local.query = {}
+            node_type = expr.__class__.__name__
+            handler_key, node_type_key = (name, True), (node_type, False)
+            active[handler_key] = active.get(handler_key, 0) + 1
+            active[node_type_key] = active.get(node_type_key, 0) + 1
+            frames.append(0.0)  # time of nested handlers
+            start = timer()
+            try:
+                handler(compile, expr, state)
+            finally:
+                inclusive = timer() - start
+                exclusive = inclusive - frames.pop()
+                if frames:
+                    frames[-1] += inclusive
+                active[handler_key] -= 1
+                active[node_type_key] -= 1
+                record(name, node_type, inclusive, exclusive, not active[handler_key], not active[node_type_key])
+                if not frames:
+                    self._record_query(node_type, inclusive)
+
+        profiled.__wrapped__ = handler
+        return self._wrapped.setdefault(handler, profiled)
+
+    def _record(self, name, node_type, inclusive, exclusive, outermost_handler, outermost_node_type):
+        query = self._local.query
+        with self._lock:
+            _add(self.handlers, name, inclusive if outermost_handler else 0.0, exclusive)
+            _add(self.node_types, node_type, inclusive if outermost_node_type else 0.0, exclusive)
+        _add(query, node_type, inclusive if outermost_node_type else 0.0, exclusive)
+
+    def _record_query(self, node_type, inclusive):
+        query = {
+            'node_type': node_type,
+            'time': inclusive,
+            'node_types': _export(self._local.query),
+        }
+        with self._lock:
+            self.queries.append(query)
+
+    def hottest(self, limit=10, query=None):
+        """Returns list of pairs (name of node type, stats), sorted by exclusive time.
+
+        :param query: one of self.queries, all compilations are taken into account if None
+        """
+        node_types = query['node_types'] if query is not None else self.as_dict()['node_types']
+        return sorted(node_types.items(), key=lambda item: item[1]['exclusive'], reverse=True)[:limit]
+
+    def as_dict(self):
+        """Returns the statistics as dict of builtin types, which can be serialized to JSON."""
+        with self._lock:
+            return {
+                'handlers': _export(self.handlers),
+                'node_types': _export(self.node_types),
+                'queries': list(self.queries),
+            }
+
+    def reset(self):
+        with self._lock:
+            self.handlers = {}
+            self.node_types = {}
+            self.queries.clear()
+
+
+def get_handler_name(handler):
+    """Returns name of handler function, or "Class.__call__" for callable instance like NameCompiler."""
+    name = getattr(handler, '__qualname__', None) or getattr(handler, '__name__', None)
+    if name is None:
+        name = '{0}.__call__'.format(type(handler).__name__)
+    return name
+
+
+def _add(stats, key, inclusive, exclusive):
+    try:
+        item = stats[key]
+    except KeyError:
+        item = stats[key] = [0, 0.0, 0.0]
+    item[0] += 1
+    item[1] += inclusive
+    item[2] += exclusive
+
+
+def _export(stats):
+    return dict(
+        (key, {'calls': calls, 'inclusive': inclusive, 'exclusive': exclusive})
+        for key, (calls, inclusive, exclusive) in stats.items()
+    )
@@ -2,16 +2,21 @@ from __future__ import absolute_import
 import copy
 import types
 import operator
-from sqlbuilder.smartsql.compiler import compile
+from sqlbuilder.smartsql.compiler import compile, compile_fragment, append_fragment
+from sqlbuilder.smartsql.compiler import compile as default_compile
 from sqlbuilder.smartsql.constants import CONTEXT
 from sqlbuilder.smartsql.exceptions import Error
-from sqlbuilder.smartsql.expressions import Operable, Expr, ExprList, Constant, Parentheses, OmitParentheses, func, expr_repr
+from sqlbuilder.smartsql.expressions import (
+    Operable, Expr, ExprList, Alias, Constant, Parentheses, OmitParentheses, func, expr_repr
+)
 from sqlbuilder.smartsql.factory import factory
 from sqlbuilder.smartsql.fields import Field, FieldList
+from sqlbuilder.smartsql.fingerprint import fingerprint
 from sqlbuilder.smartsql.operators import Asc, Desc
 from sqlbuilder.smartsql.pycompat import string_types
 from sqlbuilder.smartsql.tables import TableJoin
 from sqlbuilder.smartsql.utils import is_list, opt_checker, same, warn
+from sqlbuilder.smartsql.visitor import children, copy_node
 
 __all__ = (
     'Result', 'Executable', 'Select', 'Query', 'SelectCount', 'Raw',
@@ -51,6 +56,7 @@ class settable(object):
                 setattr(instance, attr, val)
         else:
             setattr(instance, self._property_name, value)
+        instance.__cached__ = {}  # see cached_compile()
 
 
 class Result(object):
@@ -59,11 +65,13 @@ class Result(object):
     It uses the Bridge pattern to separate implementation from interface.
     """
 
-    compile = compile
+    __slots__ = ('compile', '_query')  # Subclasses can override compile by class attribute.
 
     def __init__(self, compile=None):
         if compile is not None:
             self.compile = compile
+        elif isinstance(type(self).compile, types.MemberDescriptorType):
+            self.compile = default_compile
         self._query = None
 
     def execute(self):
@@ -77,7 +85,7 @@ class Result(object):
         return c
 
     def clone(self):
-        c = copy.copy(super(Result, self))
+        c = copy_node(self)
         c._query = None
         return c
 
@@ -100,7 +108,8 @@ class Result(object):
 
 class Executable(object):
 
-    result = Result()  # IoC
+    __slots__ = ()
+    result = Result()  # IoC, Query keeps the result of instance in slot, which shadows this default.
 
     def __init__(self, result=None):
         """ Query class.
@@ -110,10 +119,12 @@ class Executable(object):
         :param result: Object of implementation.
         :type result: Result
         """
-        if result is not None:
-            self.result = result
-        else:
-            self.result = self.result.clone()
+        if result is None:
+            result = type(self).result
+            if isinstance(result, types.MemberDescriptorType):
+                result = Executable.result
+            result = result.clone()
+        self.result = result
 
     def clone(self, *attrs):
         c = super(Executable, self).clone(*attrs)
@@ -122,6 +133,8 @@ class Executable(object):
 
     def __getattr__(self, name):
         """Delegates unknown attributes to object of implementation."""
+        if name == 'result':  # Unset slot, for example of object which is being copied.
+            raise AttributeError(name)
         try:
             return super(Executable, self).__getattr__(name)
         except AttributeError:
@@ -138,6 +151,14 @@ class Executable(object):
 @factory.register
 class Select(Expr):
 
+    __slots__ = (
+        '_distinct', '_fields', '_tables', '_where', '_having', '_group_by', '_order_by',
+        '_limit', '_offset', '_for_update', '__factory__', '__cached__'
+    )
+    sql = None
+    __volatile__ = True  # The lists of clauses can be changed in place, see Fingerprinter.key().
+    _clause_types = {'_distinct': ExprList, '_fields': FieldList, '_group_by': ExprList, '_order_by': ExprList}
+
     def __init__(self, tables=None):
         """ Select class.
 
@@ -145,16 +166,27 @@ class Select(Expr):
         :type tables: Table, TableAlias, TableJoin or None
         """
         Operable.__init__(self)
-        self._distinct = ExprList().join(", ")
-        self._fields = FieldList().join(", ")
+        self.params = ()  # All slots are set, since clone() is much faster without unset slots.
+        self.__factory__ = factory  # It's replaced by factory, which creates the query.
+        self._distinct = None  # The lists of clauses are created on demand, see _clause().
+        self._fields = None
         self._tables = tables
         self._where = None
         self._having = None
-        self._group_by = ExprList().join(", ")
-        self._order_by = ExprList().join(", ")
+        self._group_by = None
+        self._order_by = None
         self._limit = None
         self._offset = None
         self._for_update = False
+        self.__cached__ = {}
+
+    def _clause(self, name):
+        """Returns list of clause, which is created on first demand, since most queries don't use all clauses."""
+        clause = getattr(self, name)
+        if clause is None:
+            clause = self._clause_types[name]().join(", ")
+            setattr(self, name, clause)
+        return clause
 
     def tables(self, tables=None):
         if tables is None:
@@ -166,7 +198,7 @@ class Select(Expr):
     @opt_checker(["reset", ])
     def distinct(self, *args, **opts):
         if not args and not opts:
-            return self._distinct
+            return self._clause('_distinct')
 
         if args:
             if is_list(args[0]):
@@ -178,9 +210,9 @@ class Select(Expr):
 
         c = self.clone('_distinct')
         if opts.get("reset"):
-            c._distinct.reset()
+            c._distinct = None
         if args:
-            c._distinct.extend(args)
+            c._clause('_distinct').extend(args)
         return c
 
     @opt_checker(["reset", ])
@@ -189,16 +221,16 @@ class Select(Expr):
         # Because it wil be a lie. The argument can be a list of expressions.
         # The name "argument" is not entirely clear, but truthful and not misleading.
         if not args and not opts:
-            return self._fields
+            return self._clause('_fields')
 
         if args and is_list(args[0]):
             return self.fields(*args[0], reset=True)
 
         c = self.clone('_fields')
         if opts.get("reset"):
-            c._fields.reset()
+            c._fields = None
         if args:
-            c._fields.extend([Field(f) if isinstance(f, string_types) else f for f in args])
+            c._clause('_fields').extend([Field(f) if isinstance(f, string_types) else f for f in args])
         return c
 
     def on(self, cond):
@@ -227,16 +259,16 @@ class Select(Expr):
     @opt_checker(["reset", ])
     def group_by(self, *args, **opts):
         if not args and not opts:
-            return self._group_by
+            return self._clause('_group_by')
 
         if args and is_list(args[0]):
             return self.group_by(*args[0], reset=True)
 
         c = self.clone('_group_by')
         if opts.get("reset"):
-            c._group_by.reset()
+            c._group_by = None
         if args:
-            c._group_by.extend(args)
+            c._clause('_group_by').extend(args)
         return c
 
     def having(self, cond=None, op=operator.and_):
@@ -256,17 +288,17 @@ class Select(Expr):
     @opt_checker(["desc", "reset", ])
     def order_by(self, *args, **opts):
         if not args and not opts:
-            return self._order_by
+            return self._clause('_order_by')
 
         if args and is_list(args[0]):
             return self.order_by(*args[0], reset=True)
 
         c = self.clone('_order_by')
         if opts.get("reset"):
-            c._order_by.reset()
+            c._order_by = None
         if args:
             wraps = Desc if opts.get("desc") else Asc
-            c._order_by.extend([f if isinstance(f, (Asc, Desc)) else wraps(f) for f in args])
+            c._clause('_order_by').extend([f if isinstance(f, (Asc, Desc)) else wraps(f) for f in args])
         return c
 
     def limit(self, *args, **kwargs):
@@ -286,11 +318,14 @@ class Select(Expr):
         return factory.get(self).TableAlias(self, alias)
 
     def clone(self, *attrs):
-        c = copy.copy(super(Select, self))
-        # if not attrs:
-        #     attrs = ('_fields', '_tables', '_group_by', '_order_by')
+        """Returns copy of query, which shares the clauses with the query, except the clauses of attrs.
+
+        The shared clauses are copied by builder methods before they are changed.
+        """
+        c = copy_node(self)
         for a in attrs:
             setattr(c, a, copy.copy(getattr(c, a, None)))
+        c.__cached__ = {}
         return c
 
     columns = same('fields')
@@ -299,67 +334,146 @@ class Select(Expr):
 
 @compile.when(Select)
 def compile_query(compile, expr, state):
-    state.push("auto_tables", [])  # this expr can be a subquery
-    state.push("context", CONTEXT.FIELD)
+    auto_tables, context = state.auto_tables, state.context
+    state.auto_tables = []  # this expr can be a subquery
+    state.context = CONTEXT.FIELD
     state.sql.append("SELECT ")
-    if expr.distinct():
+    if expr._distinct:
         state.sql.append("DISTINCT ")
-        if expr.distinct()[0] is not True:
+        if expr._distinct[0] is not True:
             state.sql.append("ON ")
             compile(Parentheses(expr._distinct), state)
             state.sql.append(SPACE)
-    compile(expr.fields(), state)
+    if expr._fields:
+        compile_clause(compile, expr._fields, state)
 
     tables_sql_pos = len(state.sql)
     tables_params_pos = len(state.params)
 
+    try:
+        state.context = CONTEXT.EXPR
+        if expr.where():
+            state.sql.append(" WHERE ")
+            compile(expr.where(), state)
+        if expr._group_by:
+            state.sql.append(" GROUP BY ")
+            compile_clause(compile, expr._group_by, state)
+        if expr.having():
+            state.sql.append(" HAVING ")
+            compile(expr.having(), state)
+        if expr._order_by:
+            state.sql.append(" ORDER BY ")
+            compile_clause(compile, expr._order_by, state)
+        if expr._limit is not None:
+            state.sql.append(" LIMIT ")
+            compile(expr._limit, state)
+        if expr._offset:
+            state.sql.append(" OFFSET ")
+            compile(expr._offset, state)
+        if expr._for_update:
+            state.sql.append(" FOR UPDATE")
+
+        if expr.tables():
+            sql, params, joined_table_statements = state.sql, state.params, state.joined_table_statements
+            state.sql, state.params = state.new_sql(), []
+            state.joined_table_statements = set()
+            state.context = CONTEXT.TABLE
+            tables = expr.tables()
+            for join in state.auto_join_tables:
+                tables = join.left(tables)
+            try:
+                state.sql.append(" FROM ")
+                compile(tables, state)
+                tables_sql, tables_params = state.sql, state.params
+            finally:
+                state.sql, state.params, state.joined_table_statements = sql, params, joined_table_statements
+            sql[tables_sql_pos:tables_sql_pos] = tables_sql
+            params[tables_params_pos:tables_params_pos] = tables_params
+    except Exception:
+        # FROM is not inserted yet, so the rest is cut to keep the SQL and the params consistent,
+        # for example, when the compilation is interrupted by Representer.
+        del state.sql[tables_sql_pos:]
+        del state.params[tables_params_pos:]
+        raise
+
+    state.auto_tables, state.context = auto_tables, context
+
+
+def compile_clause(compile, clause, state):
+    """Compiles list of clause of query, like fields or ORDER BY.
+
+    The lists are shared by clones of query until a clone changes the list,
+    so a clone which changes only WHERE or LIMIT reuses the compiled fragments of other clauses.
+    The fragment is valid while the list has the same separator and the same items.
+    Only lists of fields are cached, since other items, like subqueries or Case,
+    can be changed in place without change of the list.
+    """
+    if state.slots or state.inline or state.auto_join_tables or not all(map(is_field, clause.data)):
+        compile(clause, state)
+        return
+    cache = getattr(clause, '__cached__', None)
+    if cache is None:
+        cache = clause.__cached__ = {}
+    cache_key = (compile, state.context)
+    cached = cache.get(cache_key)
+    items = clause.data
+    if (cached is None or cached[0] != compile._generation or cached[1] != clause.sql or
+            len(cached[2]) != len(items) or not all(map(operator.is_, cached[2], items))):
+        cached = (compile._generation, clause.sql, tuple(items), compile_fragment(compile, clause, state))
+        cache[cache_key] = cached
+    append_fragment(cached[3], state)
+
+
+def is_field(expr):
+    """Returns True if expr is a field, or its alias or ordering, see compile_clause()."""
+    while isinstance(expr, (Alias, Asc, Desc)):
+        expr = expr.expr
+    return isinstance(expr, Field)
+
+
+@fingerprint.when(Select)
+def fingerprint_query(fingerprint, expr, state):
+    # Parts are visited in order of compiled params, so FROM goes before WHERE.
+    context = state.context
+    state.context = CONTEXT.FIELD
+    if expr._distinct:
+        if expr._distinct[0] is True:
+            state.shape.append(True)
+        else:
+            fingerprint(expr._distinct, state)
+    if expr._fields:
+        fingerprint(expr._fields, state)
+    else:
+        state.shape.append(None)  # The empty list of fields is the same as not created list.
+    state.context = CONTEXT.TABLE
+    fingerprint(expr.tables(), state)
     state.context = CONTEXT.EXPR
-    if expr.where():
-        state.sql.append(" WHERE ")
-        compile(expr.where(), state)
-    if expr.group_by():
-        state.sql.append(" GROUP BY ")
-        compile(expr.group_by(), state)
-    if expr.having():
-        state.sql.append(" HAVING ")
-        compile(expr.having(), state)
-    if expr.order_by():
-        state.sql.append(" ORDER BY ")
-        compile(expr.order_by(), state)
-    if expr._limit is not None:
-        state.sql.append(" LIMIT ")
-        compile(expr._limit, state)
+    for part in (expr.where(), expr._group_by, expr.having(), expr._order_by):
+        if part:
+            fingerprint(part, state)
+        else:
+            state.shape.append(None)
+    fingerprint(expr._limit, state)
     if expr._offset:
-        state.sql.append(" OFFSET ")
-        compile(expr._offset, state)
-    if expr._for_update:
-        state.sql.append(" FOR UPDATE")
+        fingerprint(expr._offset, state)
+    else:
+        state.shape.append(None)
+    state.shape.append(bool(expr._for_update))
+    state.context = context
+
 
-    if expr.tables():
-        state.push('joined_table_statements', set())
-        state.push('sql', [])
-        state.push('params', [])
-        state.context = CONTEXT.TABLE
-        state.sql.append(" FROM ")
-        tables = expr.tables()
-        for join in state.auto_join_tables:
-            tables = join.left(tables)
-        compile(tables, state)
-        tables_sql = state.sql
-        tables_params = state.params
-        state.pop()
-        state.pop()
-        state.pop()
-        state.sql[tables_sql_pos:tables_sql_pos] = tables_sql
-        state.params[tables_params_pos:tables_params_pos] = tables_params
-
-    state.pop()
-    state.pop()
+@children.when(Select)
+def children_select(children, expr):
+    return (
+        '_distinct', '_fields', '_tables', '_where', '_group_by', '_having', '_order_by', '_limit', '_offset'
+    )
 
 
 @factory.register
 class Query(Executable, Select):
 
+    __slots__ = ('result', )
+
     def __init__(self, tables=None, result=None):
         """ Query class.
 
@@ -392,7 +506,7 @@ class Query(Executable, Select):
 
     def insert(self, key_values=None, **kw):
         kw.setdefault('table', self._tables)
-        kw.setdefault('fields', self._fields)
+        kw.setdefault('fields', self.fields())
         return self.result(factory.get(self).Insert(mapping=key_values, **kw)).insert()
 
     def insert_many(self, fields, values, **kw):
@@ -401,7 +515,7 @@ class Query(Executable, Select):
 
     def update(self, key_values=None, **kw):
         kw.setdefault('table', self._tables)
-        kw.setdefault('fields', self._fields)
+        kw.setdefault('fields', self.fields())
         kw.setdefault('where', self._where)
         kw.setdefault('order_by', self._order_by)
         kw.setdefault('limit', self._limit)
@@ -440,14 +554,18 @@ QuerySet = Query
 @factory.register
 class SelectCount(Query):
 
+    __slots__ = ()
+
     def __init__(self, q, table_alias='count_list', field_alias='count_value'):
         Query.__init__(self, q.order_by(reset=True).as_table(table_alias))
-        self._fields.append(func.Count(Constant('1')).as_(field_alias))
+        self._fields = FieldList(func.Count(Constant('1')).as_(field_alias))
 
 
 @factory.register
 class Raw(Query):
 
+    __slots__ = ('_raw', )
+
     def __init__(self, sql, params, result=None):
         Query.__init__(self, result=result)
         self._raw = OmitParentheses(Expr(sql, params))
@@ -464,6 +582,21 @@ def compile_raw(compile, expr, state):
         compile(expr._offset, state)
 
 
+@fingerprint.when(Raw)
+def fingerprint_raw(fingerprint, expr, state):
+    fingerprint(expr._raw, state)
+    fingerprint(expr._limit, state)
+    if expr._offset:
+        fingerprint(expr._offset, state)
+    else:
+        state.shape.append(None)
+
+
+@children.when(Raw)
+def children_raw(children, expr):
+    return ('_raw', '_limit', '_offset')
+
+
 class Modify(object):
 
     def __repr__(self):
@@ -492,7 +625,8 @@ class Insert(Modify):
 
 @compile.when(Insert)
 def compile_insert(compile, expr, state):
-    state.push("context", CONTEXT.TABLE)
+    context = state.context
+    state.context = CONTEXT.TABLE
     state.sql.append("INSERT ")
     state.sql.append("INTO ")
     compile(expr.table, state)
@@ -528,7 +662,34 @@ def compile_insert(compile, expr, state):
             state.context = CONTEXT.EXPR
             state.sql.append(" = ")
             compile(v, state)
-    state.pop()
+    state.context = context
+
+
+@fingerprint.when(Insert)
+def fingerprint_insert(fingerprint, expr, state):
+    context = state.context
+    state.context = CONTEXT.TABLE
+    fingerprint(expr.table, state)
+    state.context = CONTEXT.FIELD_NAME
+    fingerprint(expr.fields, state)
+    state.context = CONTEXT.EXPR
+    fingerprint(expr.values, state)
+    state.shape.append(bool(expr.ignore))
+    if expr.on_duplicate_key_update:
+        state.context = CONTEXT.FIELD_NAME
+        fingerprint(expr.duplicate_key, state)
+        state.shape.append(len(expr.on_duplicate_key_update))
+        for f, v in expr.on_duplicate_key_update:
+            state.context = CONTEXT.FIELD_NAME
+            fingerprint(f, state)
+            state.context = CONTEXT.EXPR
+            fingerprint(v, state)
+    state.context = context
+
+
+@children.when(Insert)
+def children_insert(children, expr):
+    return ('table', 'fields', 'values', 'on_duplicate_key_update', 'duplicate_key')
 
 
 @factory.register
@@ -546,7 +707,8 @@ class Update(Modify):
 
 @compile.when(Update)
 def compile_update(compile, expr, state):
-    state.push("context", CONTEXT.TABLE)
+    context = state.context
+    state.context = CONTEXT.TABLE
     state.sql.append("UPDATE ")
     if expr.ignore:
         state.sql.append("IGNORE ")
@@ -573,7 +735,39 @@ def compile_update(compile, expr, state):
     if expr.limit is not None:
         state.sql.append(" LIMIT ")
         compile(expr.limit, state)
-    state.pop()
+    state.context = context
+
+
+@fingerprint.when(Update)
+def fingerprint_update(fingerprint, expr, state):
+    context = state.context
+    state.context = CONTEXT.TABLE
+    state.shape.append(bool(expr.ignore))
+    fingerprint(expr.table, state)
+    pairs = list(zip(expr.fields, expr.values))
+    state.shape.append(len(pairs))
+    for field, value in pairs:
+        state.context = CONTEXT.FIELD_NAME
+        fingerprint(field, state)
+        state.context = CONTEXT.EXPR
+        fingerprint(value, state)
+    state.context = CONTEXT.EXPR
+    _fingerprint_modify(fingerprint, expr, state)
+    state.context = context
+
+
+@children.when(Update)
+def children_update(children, expr):
+    return ('table', 'fields', 'values', 'where', 'order_by', 'limit')
+
+
+def _fingerprint_modify(fingerprint, expr, state):
+    for part in (expr.where, expr.order_by):
+        if part:
+            fingerprint(part, state)
+        else:
+            state.shape.append(None)
+    fingerprint(expr.limit, state)
 
 
 @factory.register
@@ -589,7 +783,8 @@ class Delete(Modify):
 @compile.when(Delete)
 def compile_delete(compile, expr, state):
     state.sql.append("DELETE FROM ")
-    state.push("context", CONTEXT.TABLE)
+    context = state.context
+    state.context = CONTEXT.TABLE
     compile(expr.table, state)
     state.context = CONTEXT.EXPR
     if expr.where:
@@ -601,16 +796,32 @@ def compile_delete(compile, expr, state):
     if expr.limit is not None:
         state.sql.append(" LIMIT ")
         compile(expr.limit, state)
-    state.pop()
+    state.context = context
+
+
+@fingerprint.when(Delete)
+def fingerprint_delete(fingerprint, expr, state):
+    context = state.context
+    state.context = CONTEXT.TABLE
+    fingerprint(expr.table, state)
+    state.context = CONTEXT.EXPR
+    _fingerprint_modify(fingerprint, expr, state)
+    state.context = context
+
+
+@children.when(Delete)
+def children_delete(children, expr):
+    return ('table', 'where', 'order_by', 'limit')
 
 
 @factory.register
 class Set(Query):
 
+    __slots__ = ('sql', '_all', '_exprs')  # Subclasses set default operator in __init__(), not by class attribute.
+
     def __init__(self, *exprs, **kw):
         super(Set, self).__init__(result=kw.get('result'))
-        if 'op' in kw:
-            self.sql = kw['op']
+        self.sql = kw.get('op')
         self._all = kw.get('all', False)  # Use All() instead?
         self._exprs = ExprList()
         for expr in exprs:
@@ -671,24 +882,34 @@ class Set(Query):
 @factory.register
 class Union(Set):
     __slots__ = ()
-    sql = 'UNION'
+
+    def __init__(self, *exprs, **kw):
+        kw.setdefault('op', 'UNION')
+        super(Union, self).__init__(*exprs, **kw)
 
 
 @factory.register
 class Intersect(Set):
     __slots__ = ()
-    sql = 'INTERSECT'
+
+    def __init__(self, *exprs, **kw):
+        kw.setdefault('op', 'INTERSECT')
+        super(Intersect, self).__init__(*exprs, **kw)
 
 
 @factory.register
 class Except(Set):
     __slots__ = ()
-    sql = 'EXCEPT'
+
+    def __init__(self, *exprs, **kw):
+        kw.setdefault('op', 'EXCEPT')
+        super(Except, self).__init__(*exprs, **kw)
 
 
 @compile.when(Set)
 def compile_set(compile, expr, state):
-    state.push("context", CONTEXT.SELECT)
+    context = state.context
+    state.context = CONTEXT.SELECT
     if expr._all:
         op = ' {0} ALL '.format(expr.sql)
     else:
@@ -710,4 +931,32 @@ def compile_set(compile, expr, state):
         compile(expr._offset, state)
     if expr._for_update:
         state.sql.append(" FOR UPDATE")
-    state.pop()
+    state.context = context
+
+
+@fingerprint.when(Set)
+def fingerprint_set(fingerprint, expr, state):
+    context = state.context
+    state.context = CONTEXT.SELECT
+    state.shape.append(expr.sql)
+    state.shape.append(bool(expr._all))
+    state.shape.append(len(expr._exprs))  # compile_set() changes the separator of expr._exprs
+    for a in expr._exprs:
+        fingerprint(a, state)
+    state.context = CONTEXT.EXPR
+    if expr._order_by:
+        fingerprint(expr._order_by, state)
+    else:
+        state.shape.append(None)
+    fingerprint(expr._limit, state)
+    if expr._offset:
+        fingerprint(expr._offset, state)
+    else:
+        state.shape.append(None)
+    state.shape.append(bool(expr._for_update))
+    state.context = context
+
+
+@children.when(Set)
+def children_set(children, expr):
+    return ('_exprs', '_order_by', '_limit', '_offset')
@@ -0,0 +1,161 @@
+"""Opt-in simplification of expressions before compilation, see Simplifier."""
+from __future__ import absolute_import
+import collections
+from sqlbuilder.smartsql.expressions import Case, Param, Parentheses
+from sqlbuilder.smartsql.fingerprint import fingerprint, structural_key
+from sqlbuilder.smartsql.operators import And, Eq, In, NamedFlatCompound, Ne, Not, NotIn, Or
+from sqlbuilder.smartsql.queries import Select
+from sqlbuilder.smartsql.utils import Undef, is_list
+from sqlbuilder.smartsql.visitor import Transformer, children
+
+__all__ = ('Simplifier', 'simplify', )
+
+
+def _children(node):
+    """Returns children of node for Simplifier.
+
+    The conditions of Select are simplified by its handler, since the absent condition is None,
+    and the condition simplified to None is NULL.
+    """
+    items = children(node)
+    if isinstance(node, Select):
+        return [(name, child) for name, child in items if name not in ('_where', '_having')]
+    return items
+
+
+class Simplifier(Transformer):
+    """Folds expression into smaller equivalent expression, the expression itself is not changed.
+
+    For example, And(x, True) becomes x, duplicate operands of Or are removed, Not(Not(x)) becomes x,
+    In(f, [v]) becomes Eq(f, v), In(f, []) becomes False, and branches of Case with constant conditions are folded.
+    Python True and False are the boolean constants. Operands are supposed to be deterministic,
+    so duplicate calls of functions like random() are removed as well.
+    Handlers are registered in the same way as for Transformer, so node is passed with the already simplified children,
+    and deep chains of operators don't exhaust the stack. Handler returns the simplified node,
+    or the same node if nothing is changed.
+    """
+
+    def __init__(self, children=_children):
+        Transformer.__init__(self, children)
+
+    def apply(self, expr):
+        """Returns tuple of simplified expr and the number of removed nodes."""
+        result = self(expr)
+        return result, count_nodes(expr) - count_nodes(result)
+
+
+def count_nodes(expr):
+    """Returns the number of nodes of expr, including plain values like parameters."""
+    return sum(1 for item in fingerprint(expr) if isinstance(item, type))
+
+
+simplify = Simplifier()
+
+
+# The neutral and the absorbing constants of operator.
+_constants = {
+    And: (True, False),
+    Or: (False, True),
+}
+
+
+@simplify.when(NamedFlatCompound)
+def simplify_namedflatcompound(simplify, expr):
+    cls = expr.__class__
+    neutral, absorbing = _constants.get(cls, (Undef, Undef))
+    if neutral is not Undef:  # Only AND and OR are idempotent.
+        classes = collections.Counter(operand.__class__ for operand in expr.data)
+    operands, keys, changed = [], set(), False
+    for operand in expr.data:
+        if operand is absorbing:
+            return absorbing
+        if operand is neutral:
+            changed = True
+            continue
+        if neutral is not Undef and classes[operand.__class__] > 1:  # The keys of different classes differ.
+            key = structural_key(operand)
+            if key in keys:
+                changed = True
+                continue
+            keys.add(key)
+        operands.append(operand)
+        changed = changed or operand.__class__ is cls  # It's absorbed by the constructor.
+    if not changed:
+        return expr
+    if not operands:
+        return neutral
+    if len(operands) == 1:
+        return operands[0]
+    return cls(*operands)
+
+
+@simplify.when(In)
+@simplify.when(NotIn)
+def simplify_in(simplify, expr):
+    values = expr.right
+    if is_list(values) and len(values) < 2:
+        positive = isinstance(expr, In)
+        if not values:
+            return not positive
+        return (Eq if positive else Ne)(expr.left, values[0])
+    return expr
+
+
+@simplify.when(Not)
+def simplify_not(simplify, expr):
+    operand = expr.expr
+    if operand is True or operand is False:
+        return not operand
+    if operand.__class__ is Not:
+        return operand.expr
+    return expr
+
+
+@simplify.when(Parentheses)
+def simplify_parentheses(simplify, expr):
+    operand = expr.expr
+    if operand is True or operand is False or operand is None:
+        return operand
+    return expr
+
+
+@simplify.when(Case)
+def simplify_case(simplify, expr):
+    if expr.expr is not Undef:
+        return expr  # Simple CASE compares values, the conditions are not boolean.
+    cases, default, changed = [], expr.default, False
+    for condition, value in expr.cases:
+        if condition is False or condition is None:
+            changed = True
+            continue
+        if condition is True:
+            default, changed = value, True
+            break
+        cases.append((condition, value))
+    if not changed:
+        return expr
+    if not cases:
+        return None if default is Undef else default
+    return Case(cases, default=default)
+
+
+@simplify.when(Select)
+def simplify_select(simplify, expr):
+    where = expr._where if expr._where is None else simplify(expr._where)
+    having = expr._having if expr._having is None else simplify(expr._having)
+    if where is expr._where and having is expr._having:
+        return expr
+    c = expr.clone()
+    c._where = _condition(where, expr._where)
+    c._having = _condition(having, expr._having)
+    return c
+
+
+def _condition(cond, original):
+    if cond is original:
+        return cond
+    if cond is True:
+        return None
+    if cond is False or cond is None:
+        return Param(cond)  # Falsy condition is omitted by compile_select()
+    return cond
@@ -5,9 +5,11 @@ from sqlbuilder.smartsql.compiler import compile
 from sqlbuilder.smartsql.constants import LOOKUP_SEP, CONTEXT
 from sqlbuilder.smartsql.expressions import CompositeExpr, Expr, ExprList, OmitParentheses, Name, expr_repr
 from sqlbuilder.smartsql.factory import factory
+from sqlbuilder.smartsql.fingerprint import fingerprint
 from sqlbuilder.smartsql.fields import Field
 from sqlbuilder.smartsql.pycompat import string_types
 from sqlbuilder.smartsql.utils import same, warn
+from sqlbuilder.smartsql.visitor import children, copy_node
 
 __all__ = (
     'MetaTableSpace', 'T', 'MetaTable', 'FieldProxy', 'Table', 'TableAlias', 'TableJoin',
@@ -76,6 +78,11 @@ def compile_fieldproxy(compile, expr, state):
     compile(expr.id._prefix, state)
 
 
+@fingerprint.when(FieldProxy)
+def fingerprint_fieldproxy(fingerprint, expr, state):
+    fingerprint(expr.id._prefix, state)
+
+
 # TODO: Schema support. Not only for table.
 # A database contains one or more named schemas, which in turn contain tables.
 # Schemas also contain other kinds of named objects, including data types, functions, and operators.
@@ -144,25 +151,23 @@ class Table(MetaTable("NewBase", (object, ), {})):
         field.prefix = self
 
     def get_field(self, key):
+        # setdefault() keeps the single instance of field when it's concurrently created by other thread.
         cache = self.f.__dict__
-        if key in cache:
-            return cache[key]
+        f = cache.get(key)
+        if f is not None:
+            return f
 
         if type(key) == tuple:
-            cache[key] = CompositeExpr(*(self.get_field(k) for k in key))
-            return cache[key]
+            return cache.setdefault(key, CompositeExpr(*(self.get_field(k) for k in key)))
 
         parts = key.split(LOOKUP_SEP, 1)
         name, alias = parts + [None] * (2 - len(parts))
 
-        if name in cache:
-            f = cache[name]
-        else:
-            f = self._fields[name] if name in self._fields else Field(name, self)
-            cache[name] = f
+        f = cache.get(name)
+        if f is None:
+            f = cache.setdefault(name, self._fields[name] if name in self._fields else Field(name, self))
         if alias:
-            f = f.as_(alias)
-            cache[key] = f
+            f = cache.setdefault(key, f.as_(alias))
         return f
 
     def __getattr__(self, key):
@@ -188,6 +193,11 @@ def compile_table(compile, expr, state):
     compile(expr._name, state)
 
 
+@fingerprint.when(Table)
+def fingerprint_table(fingerprint, expr, state):
+    fingerprint(expr._name, state)
+
+
 @factory.register
 class TableAlias(Table):
 
@@ -216,6 +226,18 @@ def compile_tablealias(compile, expr, state):
     compile(expr._name, state)
 
 
+@fingerprint.when(TableAlias)
+def fingerprint_tablealias(fingerprint, expr, state):
+    if expr._table is not None and state.context == CONTEXT.TABLE:
+        fingerprint(expr._table, state)
+    fingerprint(expr._name, state)
+
+
+@children.when(TableAlias)
+def children_tablealias(children, expr):
+    return ('_table', )  # Table is a leaf, since its fields refer to it
+
+
 @factory.register
 class TableJoin(object):
 
@@ -294,7 +316,7 @@ class TableJoin(object):
         return self
 
     def __copy__(self):
-        dup = copy.copy(super(TableJoin, self))
+        dup = copy_node(self)
         for a in ['_hint', ]:
             setattr(dup, a, copy.copy(getattr(dup, a, None)))
         return dup
@@ -323,14 +345,15 @@ def compile_tablejoin(compile, expr, state):
             state.sql.append('NATURAL ')
         state.sql.append(expr._join_type)
         state.sql.append(SPACE)
-    state.push('context', CONTEXT.TABLE)
+    context = state.context
+    state.context = CONTEXT.TABLE
     compile(expr._table, state)
-    state.pop()
+    state.context = context
     if expr._on is not None:
         state.sql.append(' ON ')
-        state.push("context", CONTEXT.EXPR)
+        state.context = CONTEXT.EXPR
         compile(expr._on, state)
-        state.pop()
+        state.context = context
     elif expr._using is not None:
         state.sql.append(' USING ')
         compile(expr._using, state)
@@ -341,6 +364,30 @@ def compile_tablejoin(compile, expr, state):
         state.sql.append(')')
 
 
+@fingerprint.when(TableJoin)
+def fingerprint_tablejoin(fingerprint, expr, state):
+    state.shape.append(bool(expr._nested))
+    fingerprint(expr._left, state)
+    state.shape.append(expr._join_type)
+    state.shape.append(bool(expr._natural))
+    context = state.context
+    state.context = CONTEXT.TABLE
+    fingerprint(expr._table, state)
+    state.context = context
+    if expr._on is not None:
+        state.context = CONTEXT.EXPR
+        fingerprint(expr._on, state)
+        state.context = context
+    else:
+        fingerprint(expr._using, state)
+    fingerprint(expr._hint, state)
+
+
+@children.when(TableJoin)
+def children_tablejoin(children, expr):
+    return ('_left', '_table', '_on', '_using', '_hint')
+
+
 # Model based table
 
 class NamedJoin(TableJoin):
@@ -403,4 +450,9 @@ def compile_type(compile, model, state):
     compile(model_registry[model], state)
 
 
+@fingerprint.when(type)
+def fingerprint_type(fingerprint, model, state):
+    fingerprint(model_registry[model], state)
+
+
 model_registry = ModelRegistry()
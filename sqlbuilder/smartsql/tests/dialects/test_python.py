@@ -136,6 +136,8 @@ class TestBinary(TestCase):
         self.assertTrue(python.execute(smartsql.Param(True) & True, python.State()))
         self.assertFalse(python.execute(smartsql.Param(True) & False, python.State()))
         self.assertFalse(python.execute(smartsql.Param(False) & False, python.State()))
+        self.assertFalse(python.execute(smartsql.Param(True) & True & False, python.State()))
+        self.assertTrue(python.execute(smartsql.Param(True) & True & True, python.State()))
 
     def test_or(self):
         self.assertTrue(python.execute(smartsql.Param(True) | False, python.State()))
@@ -0,0 +1,467 @@
+import operator
+import threading
+from functools import reduce
+from sqlbuilder.smartsql.tests.base import TestCase
+from sqlbuilder.smartsql import (
+    T, P, Q, Add, Binary, Case, Error, Expr, Field, Name, Profiler, Set, State, Union, compile, compile_binary,
+    compile_binary_chain, fingerprint
+)
+from sqlbuilder.smartsql.dialects.cassandra import compile as cassandra_compile
+from sqlbuilder.smartsql.dialects.mysql import compile as mysql_compile
+from sqlbuilder.smartsql.dialects.sqlite import compile as sqlite_compile
+
+__all__ = ('TestCompiler', 'TestPrepared', 'TestSpecialize', 'TestFragmentCache', 'TestProfiler', )
+
+
+class TestCompiler(TestCase):
+
+    def test_handler_cache(self):
+        parent = compile.create_child()
+        child = parent.create_child()
+        self.assertEqual(child(T.author.name), ('"author"."name"', []))
+        self.assertIn(Field, child._handlers)
+
+        @parent.when(Name)
+        def compile_name(compile, expr, state):
+            state.sql.append(expr.name.upper())
+
+        self.assertNotIn(Field, child._handlers)
+        self.assertEqual(child(T.author.name), ('AUTHOR.NAME', []))
+        self.assertEqual(compile(T.author.name), ('"author"."name"', []))
+
+    def test_handler_cache_subclass(self):
+        child = compile.create_child()
+
+        class CustomExpr(Expr):
+            __slots__ = ()
+
+        self.assertEqual(child(CustomExpr('custom')), ('custom', []))
+
+        @child.when(CustomExpr)
+        def compile_customexpr(compile, expr, state):
+            state.sql.append('CUSTOM')
+
+        self.assertEqual(child(CustomExpr('custom')), ('CUSTOM', []))
+        self.assertEqual(compile(CustomExpr('custom')), ('custom', []))
+
+    def test_precedence_cache(self):
+        parent = compile.create_child()
+        child = parent.create_child()
+        expr = (T.author.age + 1) * 2
+        self.assertEqual(child(expr), ('("author"."age" + %s) * %s', [1, 2]))
+        parent.set_precedence(230, Add)
+        self.assertEqual(child(expr), ('"author"."age" + %s * %s', [1, 2]))
+        child.set_precedence(210, (Add, '+'))
+        self.assertEqual(child(expr), ('("author"."age" + %s) * %s', [1, 2]))
+        parent.set_precedence(230, (Add, '+'))
+        self.assertEqual(child(expr), ('("author"."age" + %s) * %s', [1, 2]))
+        self.assertEqual(parent(expr), ('"author"."age" + %s * %s', [1, 2]))
+        self.assertEqual(compile(expr), ('("author"."age" + %s) * %s', [1, 2]))
+
+    def test_precedence_of_any_other_operator(self):
+        self.assertEqual(
+            compile(T.author.tags.op('@>')(['python']) * 2),
+            ('("author"."tags" @> (%s)) * %s', ['python', 2])
+        )
+        self.assertEqual(
+            compile(T.author.tags.op('@>')(['python']) & (T.author.age > 18)),
+            ('"author"."tags" @> (%s) AND "author"."age" > %s', ['python', 18])
+        )
+        self.assertEqual(compile.get_inner_precedence(Binary(1, '@>', 2)), 140)
+        self.assertEqual(compile.get_inner_precedence(Binary(1, 'AND', 2)), 50)
+
+    def test_precedence_of_dynamic_sql(self):
+        self.assertEqual(compile.get_inner_precedence(Union(Q(), Q())), 30)
+        self.assertEqual(compile.get_inner_precedence(Set(Q(), Q(), op='UNION')), 30)
+        self.assertEqual(compile.get_inner_precedence(Expr('raw sql')), 10)
+        self.assertEqual(compile.get_inner_precedence(Expr('AND')), 50)
+        child = compile.create_child()
+        for i in range(child.max_cached_precedences + 1):
+            self.assertEqual(child.get_inner_precedence(Expr('raw sql {0}'.format(i))), 10)
+        self.assertEqual(len(child._precedences), child.max_cached_precedences)
+
+    def test_deep_chain(self):
+        conds = [T.author.id != i for i in range(5000)]
+        sql, params = compile(reduce(operator.and_, conds))
+        self.assertEqual(sql, ' AND '.join(['"author"."id" <> %s'] * 5000))
+        self.assertEqual(params, list(range(5000)))
+
+        sql, params = compile(reduce(lambda a, b: b | a, conds))
+        self.assertEqual(sql, ' OR '.join(['"author"."id" <> %s'] * 5000))
+        self.assertEqual(params, list(reversed(range(5000))))
+
+        q = Q(T.author).fields(T.author.id)
+        for i in range(3000):
+            q = q.where(T.author.id != i, op=(operator.or_ if i % 2 else operator.and_))
+        for dialect_compile in (compile, mysql_compile, sqlite_compile):
+            sql, params = dialect_compile(q)
+            self.assertEqual(params, list(range(3000)))
+            self.assertEqual(sql.count('('), 1499)
+        self.assertEqual(fingerprint(q.where(T.author.id != 1)), fingerprint(q.where(T.author.id != 2)))
+        self.assertEqual(fingerprint.extract(q)[1], list(range(3000)))
+
+    def test_deep_chain_precedence(self):
+        a, b, c = T.t.a, T.t.b, T.t.c
+        for expr in (
+                (a + b) * (c - (a - b)),
+                ((a + b) * c - a) / (b + c * a),
+                (a == 1) & ((b == 2) | (c == 3)) & ~(a == b) | (a + 1 > b * 2),
+                reduce(lambda x, y: (x + y) * (y | x), [a, b, c, a, b, c]),
+        ):
+            state = State()
+            state.precedence = compile.get_inner_precedence(expr)
+            compile_binary_chain(compile, expr, state, compile_binary)
+            self.assertEqual((''.join(state.sql), state.params), compile(expr))
+
+    def test_state_reuse(self):
+        child = compile.create_child()
+
+        class Nested(Expr):
+            __slots__ = ()
+
+        @child.when(Nested)
+        def compile_nested(compile, expr, state):
+            # Top-level compilation inside of another one.
+            state.sql.append(repr(compile(T.book.id == 2)))
+            state.foo = 'bar'
+            raise Error('Nested')
+
+        q = Q(T.author).fields(T.author.id).where(
+            T.author.id.in_(Q(T.book).fields(T.book.author_id).where(T.book.year > 2000))
+        )
+        first = compile(q)
+        self.assertEqual(compile(q), first)
+        self.assertIsNot(compile(q)[1], compile(q)[1])
+        self.assertRaises(Error, child, Q(T.author).where(T.author.id == Nested('')))
+        self.assertEqual(compile(q), first)
+
+        state = State()
+        state.foo = 'bar'
+        compile(q, state)
+        state.reset()
+        compile(q, state)
+        self.assertEqual((''.join(state.sql), state.params), first)
+        self.assertFalse(hasattr(state, 'foo'))
+
+    def test_concurrent_registration(self):
+        parent = compile.create_child()
+        child = parent.create_child()
+        expr = Binary(Name('id'), '=', 1) & Binary(Name('name'), '<>', 'a')
+        # Registration during compilation affects the rest of expression.
+        expected = [('{0} = %s AND {1} <> %s'.format(i, n), [1, 'a']) for i in ('"id"', 'ID') for n in ('"name"', 'NAME')]
+        errors = []
+        done = threading.Event()
+
+        def worker():
+            try:
+                while not done.is_set():
+                    result = child(expr)
+                    if result not in expected:
+                        errors.append(result)
+            except Exception as e:
+                errors.append(e)
+
+        workers = [threading.Thread(target=worker) for _ in range(4)]
+        for worker_thread in workers:
+            worker_thread.start()
+        try:
+            for i in range(200):
+                @parent.when(Name)
+                def compile_name(compile, expr, state):
+                    state.sql.append(expr.name.upper())
+
+                parent.set_precedence(i, (Binary, '@@'))
+                child.create_child()
+        finally:
+            done.set()
+            for worker_thread in workers:
+                worker_thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(child(expr), expected[-1])
+
+
+class TestPrepared(TestCase):
+
+    def test_prepare(self):
+        author_id, status = P(1), P('active')
+        q = Q(T.author).fields(T.author.id, T.author.name).where(
+            (T.author.id == author_id) & (T.author.status == status) & (T.author.age > 18)
+        ).limit(10)
+        prepared = compile.prepare(q)
+        sql = 'SELECT "author"."id", "author"."name" FROM "author" WHERE "author"."id" = %s AND "author"."status" = %s AND "author"."age" > %s LIMIT %s'
+        self.assertEqual(prepared.bind(), (sql, [1, 'active', 18, 10]))
+        self.assertEqual(prepared.bind(), compile(q))
+        self.assertEqual(prepared.bind([2, 'new', 21, 5]), (sql, [2, 'new', 21, 5]))
+        self.assertEqual(prepared.bind({author_id: 3}), (sql, [3, 'active', 18, 10]))
+        self.assertEqual(prepared.bind({status: 'new', author_id: 4}), (sql, [4, 'new', 18, 10]))
+        self.assertRaises(Error, prepared.bind, [1, 2])
+        self.assertRaises(Error, prepared.bind, {P(1): 1})
+
+    def test_prepare_reordered_params(self):
+        book_status, author_status = P('published'), P('active')
+        books = Q(T.book).fields(T.book.author_id).where(T.book.status == book_status).as_table('b')
+        q = Q(books).fields(books.author_id).where(books.author_id > 0).where(T.author.status == author_status)
+        prepared = compile.prepare(q)
+        self.assertEqual(prepared.bind(), compile(q))
+        self.assertEqual(
+            prepared.bind({author_status: 'new', book_status: 'draft'}),
+            ('SELECT "b"."author_id" FROM (SELECT "book"."author_id" FROM "book" WHERE "book"."status" = %s) AS "b" '
+             'WHERE "b"."author_id" > %s AND "author"."status" = %s', ['draft', 0, 'new'])
+        )
+
+    def test_prepare_list(self):
+        ids = P([1, 2, 3])
+        prepared = compile.prepare(Q(T.author).fields(T.author.id).where(T.author.id.in_(ids)))
+        sql = 'SELECT "author"."id" FROM "author" WHERE "author"."id" IN (%s, %s, %s)'
+        self.assertEqual(prepared.bind({ids: [4, 5, 6]}), (sql, [4, 5, 6]))
+        self.assertRaises(Error, prepared.bind, {ids: [4, 5]})
+
+    def test_prepare_dialects(self):
+        status = P('active')
+        q = Q(T.author).fields(T.author.id).where((T.author.status == status) & (T.author.age > 18))
+        for dialect_compile, sql in (
+            (mysql_compile, 'SELECT `author`.`id` FROM `author` WHERE `author`.`status` = %s AND `author`.`age` > %s'),
+            (sqlite_compile, 'SELECT `author`.`id` FROM `author` WHERE `author`.`status` = ? AND `author`.`age` > ?'),
+            (cassandra_compile, 'SELECT "id" FROM "author" WHERE "status" = %s AND "age" > %s'),
+        ):
+            prepared = dialect_compile.prepare(q)
+            self.assertEqual(prepared.bind(), dialect_compile(q))
+            self.assertEqual(prepared.bind({status: 'new'}), (sql, ['new', 18]))
+
+
+class TestSpecialize(TestCase):
+
+    def build_query(self, author_id, status, limit):
+        return Q().tables(
+            (T.author & T.book).on(T.book.author_id == T.author.id)
+        ).fields(
+            T.author.id, T.book.title
+        ).where(
+            (T.author.id > author_id) & (T.author.status == status) & T.book.title.startswith('Python') &
+            T.book.id.in_(Q(T.sale).fields(T.sale.book_id).where(T.sale.amount > author_id * 10))
+        ).order_by(T.author.id)[:limit]
+
+    def test_specialize(self):
+        for dialect_compile in (compile, mysql_compile, sqlite_compile):
+            specialized = dialect_compile.specialize(self.build_query(1, 'active', 10))
+            self.assertIsNotNone(specialized.source)
+            self.assertIs(dialect_compile.specialize(self.build_query(2, 'new', 5)), specialized)
+            for args in ((2, 'new', 5), (3, 'old', 15)):
+                q = self.build_query(*args)
+                self.assertEqual(specialized(q), dialect_compile(q))
+
+    def test_specialize_ambiguous(self):
+        specialized = compile.specialize(Expr('%s + %s', 1, 1))
+        self.assertIsNone(specialized.source)
+        self.assertEqual(specialized(Expr('%s + %s', 2, 3)), ('%s + %s', [2, 3]))
+        specialized = compile.specialize(Expr('%s + %s', 1, 2))
+        self.assertIsNotNone(specialized.source)
+        self.assertEqual(specialized(Expr('%s + %s', 2, 3)), ('%s + %s', [2, 3]))
+
+    def test_specialize_invalidation(self):
+        child = compile.create_child()
+        specialized = child.specialize(T.author.id == 1)
+        self.assertIs(child.specialize(T.author.id == 2), specialized)
+
+        @child.when(int)
+        def compile_int(compile, expr, state):
+            state.sql.append('%s')
+            state.params.append(str(expr))
+
+        specialized = child.specialize(T.author.id == 1)
+        self.assertIsNone(specialized.source)
+        self.assertEqual(specialized(T.author.id == 2), ('"author"."id" = %s', ['2']))
+
+
+class TestFragmentCache(TestCase):
+
+    def test_params(self):
+        sub = Q(T.book).fields(T.book.author_id).where(T.book.status == 'published')
+        q = Q(T.author).fields(T.author.id).where(T.author.id.in_(sub) & (T.author.age > 18))
+        sql = ('SELECT "author"."id" FROM "author" WHERE "author"."id" IN '
+               '(SELECT "book"."author_id" FROM "book" WHERE "book"."status" = %s) AND "author"."age" > %s')
+        self.assertEqual(compile(q), (sql, ['published', 18]))
+        self.assertTrue(sub._fields.__cached__)
+        self.assertEqual(compile(q), (sql, ['published', 18]))
+        q2 = Q(T.author).fields(T.author.id).where((T.author.age > 21) & T.author.id.in_(sub))
+        self.assertEqual(compile(q2), (
+            'SELECT "author"."id" FROM "author" WHERE "author"."age" > %s AND "author"."id" IN '
+            '(SELECT "book"."author_id" FROM "book" WHERE "book"."status" = %s)', [21, 'published']
+        ))
+
+    def test_auto_tables(self):
+        author = T.author
+        field = author.id
+        for _ in range(2):
+            state = State()
+            compile(field, state)
+            self.assertEqual(len(state.auto_tables), 1)
+            self.assertIs(state.auto_tables[0], author)
+
+    def test_invalidation(self):
+        q = Q(T.author).fields(T.author.id).where(T.author.id == 1)
+        self.assertEqual(compile(q), ('SELECT "author"."id" FROM "author" WHERE "author"."id" = %s', [1]))
+        q2 = q.where(T.author.age > 18)
+        self.assertEqual(compile(q2), (
+            'SELECT "author"."id" FROM "author" WHERE "author"."id" = %s AND "author"."age" > %s', [1, 18]
+        ))
+        q3 = q.fields(T.author.name, reset=True)
+        self.assertEqual(compile(q3), ('SELECT "author"."name" FROM "author" WHERE "author"."id" = %s', [1]))
+        self.assertEqual(compile(q), ('SELECT "author"."id" FROM "author" WHERE "author"."id" = %s', [1]))
+        join = (T.author & T.book)
+        self.assertEqual(compile(join), ('"author" INNER JOIN "book"', []))
+        join.on(T.book.author_id == T.author.id)
+        self.assertEqual(compile(join), ('"author" INNER JOIN "book" ON ("book"."author_id" = "author"."id")', []))
+
+    def test_contexts_and_dialects(self):
+        q = Q(T.author).fields(T.author.id)
+        self.assertEqual(compile(q), ('SELECT "author"."id" FROM "author"', []))
+        self.assertEqual(mysql_compile(q), ('SELECT `author`.`id` FROM `author`', []))
+        self.assertEqual(compile(T.book.author_id.in_(q)), (
+            '"book"."author_id" IN (SELECT "author"."id" FROM "author")', []
+        ))
+
+    def test_registration(self):
+        child = compile.create_child()
+        q = Q(T.author).fields(T.author.id).where(T.author.id == 1)
+        self.assertEqual(child(q), ('SELECT "author"."id" FROM "author" WHERE "author"."id" = %s', [1]))
+
+        @child.when(int)
+        def compile_int(compile, expr, state):
+            state.sql.append('%s')
+            state.params.append(str(expr))
+
+        self.assertEqual(child(q), ('SELECT "author"."id" FROM "author" WHERE "author"."id" = %s', ['1']))
+        self.assertEqual(compile(q), ('SELECT "author"."id" FROM "author" WHERE "author"."id" = %s', [1]))
+
+    def test_prepare(self):
+        author_id = P(1)
+        q = Q(T.author).fields(T.author.id).where(T.author.id == author_id)
+        self.assertEqual(compile(q), ('SELECT "author"."id" FROM "author" WHERE "author"."id" = %s', [1]))
+        prepared = compile.prepare(q)
+        self.assertEqual(prepared.bind({author_id: 2}), (
+            'SELECT "author"."id" FROM "author" WHERE "author"."id" = %s', [2]
+        ))
+
+    def test_clone_clauses(self):
+        base = Q(T.author).fields(T.author.id, T.author.name).order_by(T.author.name)
+        compile(base.where(T.author.id == 1))
+        self.assertTrue(base.fields().__cached__)
+        self.assertTrue(base.order_by().__cached__)
+        for i in range(2, 4):
+            self.assertEqual(compile(base.where(T.author.id == i)[:i]), (
+                'SELECT "author"."id", "author"."name" FROM "author" WHERE "author"."id" = %s '
+                'ORDER BY "author"."name" ASC LIMIT %s', [i, i]
+            ))
+        q = base.fields(T.author.status)
+        self.assertEqual(compile(q), ('SELECT "author"."id", "author"."name", "author"."status" FROM "author" '
+                                      'ORDER BY "author"."name" ASC', []))
+        base.order_by().append(T.author.id)  # changed in place
+        self.assertEqual(compile(base), ('SELECT "author"."id", "author"."name" FROM "author" '
+                                         'ORDER BY "author"."name" ASC, "author"."id"', []))
+
+    def test_changed_in_place(self):
+        a = T.author
+        q = Q(a).fields(a.id).where(a.id == 1)
+        self.assertEqual(compile(q), ('SELECT "author"."id" FROM "author" WHERE "author"."id" = %s', [1]))
+        q.fields().append(a.name)
+        q.group_by().append(a.name)
+        q.order_by().append(a.id)
+        self.assertEqual(compile(q), (
+            'SELECT "author"."id", "author"."name" FROM "author" WHERE "author"."id" = %s '
+            'GROUP BY "author"."name" ORDER BY "author"."id"', [1]
+        ))
+
+    def test_error(self):
+        child = compile.create_child()
+
+        @child.when(Name)
+        def compile_name(compile, expr, state):
+            raise Error('Name')
+
+        state = State()
+        sql, params, auto_tables = state.sql, state.params, state.auto_tables
+        self.assertRaises(Error, child, T.author.id, state)
+        self.assertIs(state.sql, sql)
+        self.assertIs(state.params, params)
+        self.assertIs(state.auto_tables, auto_tables)
+
+    def test_nested_join_changed_in_place(self):
+        a, b, c = T.author, T.book, T.category
+        j = a & b
+        q = Q(j & c).fields(a.id)
+        self.assertEqual(compile(q), ('SELECT "author"."id" FROM "author" INNER JOIN "book" INNER JOIN "category"', []))
+        j.on(a.id == b.author_id)
+        self.assertEqual(compile(q), (
+            'SELECT "author"."id" FROM "author" INNER JOIN "book" ON ("author"."id" = "book"."author_id") '
+            'INNER JOIN "category"', []
+        ))
+
+    def test_subquery_changed_in_place(self):
+        a, b = T.author, T.book
+        sub = Q(b).fields(b.author_id)
+        s = sub.as_table('s')
+        q = Q((a & s).on(s.author_id == a.id)).fields(a.id, Case([(a.id.in_(sub), 1)], default=0).as_('writer'))
+        self.assertEqual(compile(q), (
+            'SELECT "author"."id", CASE WHEN ("author"."id" IN (SELECT "book"."author_id" FROM "book")) '
+            'THEN %s ELSE %s END  AS "writer" FROM "author" INNER JOIN (SELECT "book"."author_id" FROM "book") AS "s" '
+            'ON ("s"."author_id" = "author"."id")', [1, 0]
+        ))
+        sub.fields().append(b.id)
+        sub.group_by().append(b.author_id)
+        self.assertEqual(compile(q), (
+            'SELECT "author"."id", CASE WHEN ("author"."id" IN (SELECT "book"."author_id", "book"."id" FROM "book" '
+            'GROUP BY "book"."author_id")) THEN %s ELSE %s END  AS "writer" FROM "author" INNER JOIN '
+            '(SELECT "book"."author_id", "book"."id" FROM "book" GROUP BY "book"."author_id") AS "s" '
+            'ON ("s"."author_id" = "author"."id")', [1, 0]
+        ))
+
+    def test_case_changed_in_place(self):
+        case = Case([(T.author.id == 1, 'one')])
+        q = Q(T.author).fields(case)
+        self.assertEqual(compile(q), ('SELECT CASE WHEN ("author"."id" = %s) THEN %s END  FROM "author"', [1, 'one']))
+        case.cases.append((T.author.id == 2, 'two'))
+        self.assertEqual(compile(q), (
+            'SELECT CASE WHEN ("author"."id" = %s) THEN %s WHEN ("author"."id" = %s) THEN %s END  FROM "author"',
+            [1, 'one', 2, 'two']
+        ))
+
+
+class TestProfiler(TestCase):
+
+    def test_profiler(self):
+        child = compile.create_child()
+        grandchild = child.create_child()
+        profiler = Profiler()
+        child.set_profiler(profiler)
+        q = Q(T.author).fields(T.author.id, T.author.name).where((T.author.id > 1) & (T.author.status == 'active'))
+        self.assertEqual(grandchild(q), compile(q))
+        stats = profiler.as_dict()
+        self.assertEqual(stats['node_types']['Query']['calls'], 1)
+        self.assertEqual(stats['node_types']['And']['calls'], 1)
+        self.assertEqual(stats['handlers']['compile_binary']['calls'], 2)
+        self.assertIn('NameCompiler.__call__', stats['handlers'])
+        select = stats['node_types']['Query']
+        self.assertGreaterEqual(select['inclusive'], select['exclusive'])
+        self.assertGreaterEqual(select['inclusive'], stats['node_types']['And']['inclusive'])
+        self.assertEqual(len(profiler.queries), 1)
+        query = profiler.queries[0]
+        self.assertEqual(query['node_type'], 'Query')
+        self.assertEqual(set(query['node_types']), set(stats['node_types']))
+        self.assertEqual(len(profiler.hottest(2, query)), 2)
+        self.assertEqual(profiler.hottest(1)[0][0], max(stats['node_types'].items(), key=lambda i: i[1]['exclusive'])[0])
+
+        child.set_profiler(None)
+        self.assertIs(grandchild.get_handler(Binary), compile_binary)
+        grandchild(q)
+        self.assertEqual(len(profiler.queries), 1)
+        profiler.reset()
+        self.assertEqual(profiler.as_dict(), {'handlers': {}, 'node_types': {}, 'queries': []})
+
+    def test_profiler_deep_chain(self):
+        child = compile.create_child()
+        profiler = Profiler()
+        child.set_profiler(profiler)
+        expr = reduce(Add, [Name('n{0:d}'.format(i)) for i in range(5000)])
+        self.assertEqual(child(expr), compile(expr))
+        self.assertEqual(profiler.as_dict()['node_types']['Name']['calls'], 5000)
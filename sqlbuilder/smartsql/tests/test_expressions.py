@@ -1,8 +1,19 @@
 import datetime
+import operator
+from functools import reduce
 from sqlbuilder.smartsql.tests.base import TestCase
-from sqlbuilder.smartsql import Q, T, F, P, CompositeExpr, Case, Cast, compile
+from sqlbuilder.smartsql import (
+    Q, T, F, P, And, Binary, BaseType, CompositeExpr, Case, Cast, Field, ILike, In, InList, InListCompiler, NotInList,
+    MaxLengthError, Name, NameCompiler, Representer, Value, ValueCompiler, compile
+)
+from sqlbuilder.smartsql.dialects.cassandra import compile as cassandra_compile
+from sqlbuilder.smartsql.dialects.mysql import compile as mysql_compile
+from sqlbuilder.smartsql.dialects.sqlite import compile as sqlite_compile
 
-__all__ = ('TestExpr', 'TestCaseExpr', 'TestCallable', 'TestCompositeExpr', )
+__all__ = (
+    'TestExpr', 'TestCaseExpr', 'TestNamedFlatCompound', 'TestCallable', 'TestCompositeExpr', 'TestInList',
+    'TestNameCompiler', 'TestValueCompiler', 'TestRepresenter', 'TestDatatype',
+)
 
 
 class TestExpr(TestCase):
@@ -324,6 +335,74 @@ class TestCaseExpr(TestCase):
         )
 
 
+class TestNamedFlatCompound(TestCase):
+
+    def test_absorb(self):
+        a, b, c, d = (T.author.a == 1), (T.author.b == 2), (T.author.c == 3), (T.author.d == 4)
+        ab = a & b
+        abc = ab & c
+        self.assertEqual(ab.data, [a, b])
+        self.assertEqual(abc.data, [a, b, c])
+        self.assertEqual((a & (b & c)).data, [a, b, c])
+        self.assertEqual(((a & b) & (c & d)).data, [a, b, c, d])
+        self.assertEqual(reduce(operator.and_, [a, b, c, d]).data, [a, b, c, d])
+        self.assertEqual(And(a, b, c).data, [a, b, c])
+        self.assertIs(abc.left.__class__, And)
+        self.assertEqual(abc.left.data, [a, b])
+        self.assertIs(abc.right, c)
+        self.assertIs(ab.left, a)
+        self.assertEqual(((a | b) & c).data[0].data, [a, b])
+        self.assertEqual(((a & b) | (c & d)).data[1].data, [c, d])
+
+    def test_left(self):
+        a, b, c, d = (T.author.a == 1), (T.author.b == 2), (T.author.c == 3), (T.author.d == 4)
+        abcd = And(a, b, c, d)
+        left = abcd.left
+        self.assertIs(abcd.left, left)
+        self.assertIs(left.right, c)
+        self.assertEqual(left.left.data, [a, b])
+        self.assertIs(left.left.left, a)
+        self.assertEqual(compile(left), compile(a & b & c))
+        abcd.data.append(a)
+        self.assertIs(abcd.left.right, d)
+        abcd.data[1] = d
+        self.assertEqual(abcd.left.left.left.data, [a, d])
+
+        conds = [T.author.id == i for i in range(5000)]
+        node, depth = And(*conds).left, 1
+        while isinstance(node, And):
+            self.assertEqual(len(node.data), 2)
+            node, depth = node.left, depth + 1
+        self.assertIs(node, conds[0])
+        self.assertEqual(depth, 4999)
+
+    def test_compile(self):
+        a, b, c, d = (T.author.a == 1), (T.author.b == 2), (T.author.c == 3), (T.author.d == 4)
+        self.assertEqual(
+            compile(a & b & c & d),
+            ('"author"."a" = %s AND "author"."b" = %s AND "author"."c" = %s AND "author"."d" = %s', [1, 2, 3, 4])
+        )
+        self.assertEqual(
+            compile((a | b) & (c | d)),
+            ('("author"."a" = %s OR "author"."b" = %s) AND ("author"."c" = %s OR "author"."d" = %s)', [1, 2, 3, 4])
+        )
+        self.assertEqual(
+            compile(a & b | c & d | a),
+            ('"author"."a" = %s AND "author"."b" = %s OR "author"."c" = %s AND "author"."d" = %s OR "author"."a" = %s',
+             [1, 2, 3, 4, 1])
+        )
+        self.assertEqual(
+            compile(~(a & b) & c),
+            ('NOT ("author"."a" = %s AND "author"."b" = %s) AND "author"."c" = %s', [1, 2, 3])
+        )
+        q = Q(T.author).fields(T.author.id).where(a).where(b).where(c, op=operator.or_).where(d)
+        self.assertEqual(
+            compile(q),
+            ('SELECT "author"."id" FROM "author" WHERE ("author"."a" = %s AND "author"."b" = %s OR "author"."c" = %s) AND "author"."d" = %s',
+             [1, 2, 3, 4])
+        )
+
+
 class TestCallable(TestCase):
 
     def test_case(self):
@@ -376,3 +455,197 @@ class TestCompositeExpr(TestCase):
             Q(T.tb).fields(pk, T.tb.title).where(pk.not_in(((1, 'en', today), (2, 'en', today)))).select(),
             ('SELECT "tb"."obj_id" AS "al1", "tb"."land_id" AS "al2", "tb"."date" AS "al3", "tb"."title" FROM "tb" WHERE NOT ("al1" = %s AND "al2" = %s AND "al3" = %s OR "al1" = %s AND "al2" = %s AND "al3" = %s)', [1, 'en', today, 2, 'en', today])
         )
+
+
+class TestInList(TestCase):
+
+    def test_in_list(self):
+        self.assertIsInstance(T.author.id.in_([1, 2]), InList)
+        self.assertIsInstance(T.author.id == (1, 2), InList)
+        self.assertIsInstance(T.author.id.not_in([1, 2]), NotInList)
+        self.assertIsInstance(T.author.id != [1, 2], NotInList)
+        self.assertNotIsInstance(T.author.id.in_(Q(T.book).fields(T.book.author_id)), InList)
+        self.assertEqual(compile(T.author.id.in_([1, 2, 3])), ('"author"."id" IN (%s, %s, %s)', [1, 2, 3]))
+        self.assertEqual(compile(T.author.id.not_in(('a',))), ('"author"."id" NOT IN (%s)', ['a']))
+        self.assertEqual(sqlite_compile(T.author.id.in_([1, 2])), ('`author`.`id` IN (?, ?)', [1, 2]))
+        self.assertEqual(compile.prepare(T.author.id.in_([1, 2])).bind([3, 4]), ('"author"."id" IN (%s, %s)', [3, 4]))
+
+    def test_expressions(self):
+        for values in ([1, T.book.id, Value('a')], [1, None], []):
+            self.assertEqual(compile(T.author.id.in_(values)), compile(In(T.author.id, values)))
+
+    def test_array(self):
+        child = compile.create_child()
+        child.when(InList)(InListCompiler(array=True))
+        child.when(NotInList)(InListCompiler(array=True))
+        self.assertEqual(child(T.author.id.in_([1, 2, 3])), ('"author"."id" = ANY(%s)', [[1, 2, 3]]))
+        self.assertEqual(child(T.author.id.not_in((1, 2))), ('"author"."id" <> ALL(%s)', [[1, 2]]))
+        self.assertEqual(child(T.author.id.in_([1, T.book.id])), ('"author"."id" IN (%s, "book"."id")', [1]))
+
+
+class TestNameCompiler(TestCase):
+
+    def test_escape(self):
+        name = 'a"b`c\\d\000e\nf%'
+        self.assertEqual(compile(Name(name)), ('"a""b`c\\\\d\\0e\\nf%%"', []))
+        self.assertEqual(mysql_compile(Name(name)), ('`a"b``c\\\\d\\0e\\nf%%`', []))
+        self.assertEqual(sqlite_compile(Name(name)), mysql_compile(Name(name)))
+        self.assertEqual(compile(Name('first_name')), ('"first_name"', []))
+
+    def test_single_pass(self):
+        compile_name = NameCompiler(escape_delimiter='\\')
+        self.assertEqual(compile_name._quote('a"b\\c')[0], '"a\\"b\\\\c"')
+        self.assertEqual(compile_name._quote('first_name')[0], '"first_name"')
+
+    def test_cache(self):
+        compile_name = NameCompiler()
+        compile_name.max_cached = 2
+        child = compile.create_child()
+        child.when(Name)(compile_name)
+        for i in range(3):
+            self.assertEqual(child(Name('name{0}'.format(i))), ('"name{0}"'.format(i), []))
+            self.assertEqual(child(Name('name{0}'.format(i))), ('"name{0}"'.format(i), []))
+        self.assertEqual(len(compile_name._cache), 2)
+
+    def test_max_length(self):
+        self.assertEqual(mysql_compile(Name('a' * 64)), ('`{0}`'.format('a' * 64), []))
+        for i in range(2):
+            self.assertRaises(MaxLengthError, mysql_compile, Name('a' * 65))
+        self.assertEqual(compile(Name('a' * 63)), ('"{0}"'.format('a' * 63), []))
+        self.assertRaises(MaxLengthError, compile, Name('a' * 64))
+
+
+class TestValueCompiler(TestCase):
+
+    def test_escape(self):
+        value = Value("a'b\\c\nd%")
+        self.assertEqual(compile(value), ("'a''b\\\\c\\nd%%'", []))
+        self.assertEqual(mysql_compile(value), ("'a\\'b\\\\c\\nd%%'", []))
+        self.assertEqual(cassandra_compile(value), mysql_compile(value))
+        self.assertEqual(compile(Value('abc')), ("'abc'", []))
+
+    def test_cache(self):
+        compile_value = ValueCompiler()
+        compile_value.max_cached_length = 3
+        child = compile.create_child()
+        child.when(Value)(compile_value)
+        for i in range(2):
+            self.assertEqual(child(Value(1)), ("'1'", []))
+            self.assertEqual(child(Value(True)), ("'True'", []))
+            self.assertEqual(child(Value('%')), ("'%%'", []))
+            self.assertEqual(child(Value('abcd')), ("'abcd'", []))
+            self.assertEqual(child(Value(['a'])), ("'[''a'']'", []))
+        self.assertEqual(len(compile_value._cache), 2)
+
+    def test_float(self):
+        child = compile.create_child()
+        child.when(Value)(ValueCompiler())
+        for value, sql in ((0.0, "'0.0'"), (-0.0, "'-0.0'"), (0.0, "'0.0'")):
+            self.assertEqual(child(Value(value)), (sql, []))
+
+    def test_like(self):
+        self.assertEqual(
+            compile(T.author.name.startswith('a_')),
+            (""""author"."name" LIKE REPLACE(REPLACE(REPLACE(%s, '!', '!!'), '_', '!_'), '%%', '!%%') || '%%' ESCAPE '!'""", ['a_'])
+        )
+
+
+class TestRepresenter(TestCase):
+
+    def test_repr(self):
+        tb = T.author
+        self.assertEqual(repr(tb.name == 'Tom'), """<Eq: "author"."name" = %s, ['Tom']>""")
+        q = Q(tb).fields(tb.id).where(tb.name == 'Tom')
+        self.assertEqual(repr(q), """<Query: SELECT "author"."id" FROM "author" WHERE "author"."name" = %s, ['Tom']>""")
+        self.assertEqual(repr(q), """<Query: SELECT "author"."id" FROM "author" WHERE "author"."name" = %s, ['Tom']>""")
+
+    def test_truncated(self):
+        tb = T.author
+        expr_repr = Representer(max_length=40, max_params=2)
+        q = Q(tb).fields(tb.id, tb.name).where(tb.id.in_((1, 2, 3)) | (tb.name == 'Tom'))
+        self.assertEqual(expr_repr(q), """<Query: SELECT "author"."id", "author"."name"..., [...]>""")
+        self.assertEqual(expr_repr(tb.id.in_((1, 2, 3))), """<InList: "author"."id" IN (%s, %s, %s), [1, 2, ...]>""")
+        self.assertEqual(Representer(max_length=None)(q), repr(q))
+        self.assertEqual(
+            compile(q),
+            ('SELECT "author"."id", "author"."name" FROM "author" WHERE "author"."id" IN (%s, %s, %s) OR "author"."name" = %s',
+             [1, 2, 3, 'Tom'])
+        )
+
+    def test_timeout(self):
+        tb = T.author
+        expr = reduce(operator.or_, [tb.id == i for i in range(1000)])
+        result = Representer(max_length=None, max_seconds=0)(expr)
+        self.assertTrue(result.startswith('<Or: "author"."id" = %s OR '))
+        self.assertTrue(result.endswith(']>'))
+        self.assertIn('..., [0, 1, 2', result)
+        self.assertLess(len(result), len(Representer(max_length=None, max_params=None, max_seconds=None)(expr)) // 10)
+
+    def test_truncated_query(self):
+        tb = T.author
+        q = Q(tb).fields(tb.id).where(tb.status == 'active').where(tb.id.in_(list(range(2000))))
+        self.assertEqual(Representer()(q), """<Query: SELECT "author"."id"..., [...]>""")
+        q = Q(Q(tb).fields(tb.id).where(tb.status == 'active').as_table('a')).fields(T.a.id).where(T.a.id > 5)
+        self.assertEqual(Representer(max_length=80)(q), """<Query: SELECT "a"."id"..., [...]>""")
+        self.assertEqual(
+            Representer(max_length=150)(q),
+            """<Query: SELECT "a"."id" FROM (SELECT "author"."id" FROM "author" WHERE "author"."status" = %s) AS "a" """
+            """WHERE "a"."id" > %s, ['active', 5]>"""
+        )
+
+    def test_timeout_in_fragment(self):
+        tables = reduce(operator.and_, [getattr(T, 't{0}'.format(i)) for i in range(100)])
+        result = Representer(max_length=None, max_seconds=0)(Q(tables).fields('*'))
+        self.assertEqual(result, '<Query: SELECT *..., [...]>')
+
+    def test_not_compiled(self):
+        expr = T.author.name == 'Tom'
+        self.assertEqual(Representer(compiled=False)(expr), '<Eq at {0:#x}>'.format(id(expr)))
+
+
+class TestDatatype(TestCase):
+
+    def test_subclass(self):
+        class JsonType(BaseType):
+            def __eq__(self, other):
+                return Binary(self._expr, '@>', other)
+
+            def has_key(self, key):
+                return Binary(self._expr, '?', key)
+
+        field = Field('data', T.author, JsonType)
+        self.assertEqual(compile(field == 1), ('"author"."data" @> %s', [1]))
+        self.assertEqual(compile(field != 1), ('"author"."data" <> %s', [1]))
+        self.assertEqual(compile(field.has_key('a')), ('"author"."data" ? %s', ['a']))
+        self.assertEqual(compile(field.desc()), ('"author"."data" DESC', []))
+        self.assertEqual(compile(JsonType(field).desc()), ('"author"."data" DESC', []))
+        self.assertEqual(compile(T.author.data == 1), ('"author"."data" = %s', [1]))
+        self.assertRaises(AttributeError, getattr, T.author.data, 'has_key')
+
+    def test_changed_datatype(self):
+        class TextType(BaseType):
+            pass
+
+        field = Field('name', T.author, TextType)
+        self.assertEqual(compile(field.ilike('a%')), ('"author"."name" ILIKE %s', ['a%']))
+        TextType.like = lambda self, other: ILike(self._expr, other)
+        self.assertEqual(compile(field.like('a%')), ('"author"."name" ILIKE %s', ['a%']))
+        self.assertEqual(compile(T.author.name.like('a%')), ('"author"."name" LIKE %s', ['a%']))
+
+    def test_custom_op(self):
+        class MyType(BaseType):
+            def _op(self, operator, operands, *args, **kwargs):
+                return Binary(operands[0], 'MY' + operator, operands[1])
+
+        class MySubtype(MyType):
+            pass
+
+        field = Field('n', T.author, MySubtype)
+        self.assertEqual(compile(field + 1), ('"author"."n" MY+ %s', [1]))
+        self.assertEqual(compile(1 + field), ('%s MY+ "author"."n"', [1]))
+        self.assertEqual(compile(field == [1, 2]), ('"author"."n" MYIN (%s, %s)', [1, 2]))
+        self.assertEqual(compile(field.like('a%')), ('"author"."n" MYLIKE %s', ['a%']))
+        self.assertEqual(compile(T.author.n + 1), ('"author"."n" + %s', [1]))
+        del MyType._op
+        self.assertFalse(MySubtype._custom_op)
+        self.assertEqual(compile(field + 1), ('"author"."n" + %s', [1]))
@@ -0,0 +1,161 @@
+from sqlbuilder.smartsql.tests.base import TestCase
+from sqlbuilder.smartsql import (
+    T, Q, Case, CompileCache, Delete, Fingerprinter, Insert, Name, Param, Union, Update, Value,
+    compile, fingerprint, func, structural_key
+)
+from sqlbuilder.smartsql.dialects.mysql import compile as mysql_compile
+from sqlbuilder.smartsql.dialects.sqlite import compile as sqlite_compile
+
+__all__ = ('TestFingerprint', 'TestStructuralKey', 'TestCompileCache', )
+
+
+def build_query(author_id, limit, offset=0):
+    return Q().fields(
+        T.author.id, T.author.name.as_('author_name'), func.Count(T.book.id)
+    ).tables(
+        (T.author & T.book).on(T.author.id == T.book.author_id)
+    ).where(
+        (T.author.id > author_id) & T.author.name.like('a%') &
+        T.author.id.in_(Q(T.book).fields(T.book.author_id).where(T.book.year == author_id + 1))
+    ).group_by(T.author.id).order_by(T.author.id.desc())[offset:offset + limit]
+
+
+class TestFingerprint(TestCase):
+
+    def test_fingerprint(self):
+        self.assertEqual(fingerprint(build_query(1, 10)), fingerprint(build_query(2, 20)))
+        self.assertEqual(fingerprint(T.author.id.in_([1, 2])), fingerprint(T.author.id.in_([3, 4])))
+        self.assertNotEqual(fingerprint(T.author.id.in_([1, 2])), fingerprint(T.author.id.in_([1, 2, 3])))
+        self.assertNotEqual(fingerprint(T.author.id == 1), fingerprint(T.author.id != 1))
+        self.assertNotEqual(fingerprint(T.author.id == 1), fingerprint(T.book.id == 1))
+        self.assertNotEqual(fingerprint(T.author.id == 1), fingerprint(T.author.id == T.author.parent_id))
+        self.assertNotEqual(fingerprint(build_query(1, 10)), fingerprint(build_query(1, 10, 5)))
+        self.assertNotEqual(fingerprint(Value('a')), fingerprint(Value('b')))
+
+    def test_extract(self):
+        for q in (
+                build_query(1, 10, 5),
+                Insert(table=T.author, fields=(T.author.first_name, T.author.last_name), values=(('a', 'b'), ('c', 'd'))),
+                Update(T.author, {T.author.name: 'John'}, where=(T.author.id == 3), limit=10),
+                Delete(T.author, where=(T.author.id == 3)),
+                Union(build_query(1, 10), build_query(2, 20)),
+                Case([(T.author.age < 18, 'child')], T.author.kind, 'adult'),
+                Param(['a', 'b']),
+        ):
+            shape, values = fingerprint.extract(q)
+            self.assertEqual(values, compile(q)[1])
+
+
+class TestStructuralKey(TestCase):
+
+    def test_equality(self):
+        self.assertEqual(structural_key(build_query(1, 10)), structural_key(build_query(1, 10)))
+        self.assertEqual(hash(structural_key(build_query(1, 10))), hash(structural_key(build_query(1, 10))))
+        self.assertNotEqual(structural_key(build_query(1, 10)), structural_key(build_query(2, 10)))
+        self.assertNotEqual(structural_key(T.author.id == 1), structural_key(T.author.id == True))
+        self.assertNotEqual(structural_key(T.author.id == 1), structural_key(T.author.id != 1))
+        self.assertEqual(structural_key(Param(['a', ['b']])), structural_key(Param(['a', ['b']])))
+        self.assertEqual(structural_key(Case([(T.author.age < 18, 'child')], default='adult')),
+                         structural_key(Case([(T.author.age < 18, 'child')], default='adult')))
+        self.assertEqual(structural_key(T.author), structural_key(T.author))
+
+    def test_dedupe(self):
+        predicates = [T.author.id == 1, T.author.name.like('a%'), T.author.id == 1, T.author.id == 2]
+        unique = dict((structural_key(p), p) for p in reversed(predicates))
+        self.assertEqual(len(unique), 3)
+        self.assertIs(unique[structural_key(T.author.id == 1)], predicates[0])
+
+    def test_memoized(self):
+        for expr in (T.author.id == 1, T.author.name, func.Lower(T.author.name)):
+            self.assertIs(structural_key(expr), structural_key(expr))
+
+    def test_invalidation(self):
+        q = build_query(1, 10)
+        key = structural_key(q)
+        self.assertNotEqual(structural_key(q.where(T.author.id < 5)), key)
+        self.assertEqual(structural_key(q), key)
+
+        q.fields().append(T.author.email)
+        self.assertNotEqual(structural_key(q), key)
+        self.assertEqual(structural_key(q), structural_key(build_query(1, 10).fields(T.author.email)))
+        key = structural_key(q)
+        q.where().data.append(T.author.status == 'active')
+        self.assertNotEqual(structural_key(q), key)
+
+        join = T.author & T.book
+        tables = join & T.publisher
+        key = structural_key(tables)
+        join.on(T.author.id == T.book.author_id)
+        self.assertNotEqual(structural_key(tables), key)
+        case = Case([(T.author.id == 1, 'one')])
+        key = structural_key(case)
+        case.cases.append((T.author.id == 2, 'two'))
+        self.assertNotEqual(structural_key(case), key)
+
+        fields = build_query(1, 10).fields()
+        fields.append(T.author.email)
+        self.assertNotEqual(structural_key(fields), structural_key(build_query(1, 10).fields()))
+
+        fingerprinter = Fingerprinter()
+        fingerprinter.when(object)(fingerprint._registry[object])
+        fingerprinter.when(Name)(fingerprint._registry[Name])
+        self.assertIsNot(fingerprinter.key(T.author.name), structural_key(T.author.name))
+
+
+class TestCompileCache(TestCase):
+
+    def test_compile_cache(self):
+        cache = CompileCache()
+        for compile_ in (compile, mysql_compile, sqlite_compile):
+            for q in (
+                    build_query(1, 10),
+                    Insert(T.author, {T.author.name: 'John', T.author.age: 30}),
+                    Update(T.author, {T.author.name: 'John'}, where=(T.author.id == 3)),
+                    Delete(T.author, where=(T.author.id == 3), limit=5),
+                    Union(build_query(1, 10), build_query(2, 20)),
+            ):
+                self.assertEqual(cache(q, compile_), compile_(q))
+                self.assertEqual(cache(q, compile_), compile_(q))
+        self.assertEqual(cache.misses, 15)
+        self.assertEqual(cache.hits, 15)
+
+        self.assertEqual(cache(build_query(7, 70)), compile(build_query(7, 70)))
+        self.assertEqual(cache.hits, 16)
+
+    def test_compile_cache_lru(self):
+        cache = CompileCache(maxsize=2)
+        cache(T.author.id == 1)
+        cache(T.author.id != 1)
+        cache(T.author.id == 2)
+        cache(T.author.id > 1)
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache(T.author.id == 3), ('"author"."id" = %s', [3]))
+        self.assertEqual(cache.hits, 2)
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+
+    def test_compile_cache_invalidation(self):
+        cache = CompileCache()
+        child = compile.create_child()
+        self.assertEqual(cache(T.author.name, child), ('"author"."name"', []))
+
+        @child.when(Name)
+        def compile_name(compile, expr, state):
+            state.sql.append(expr.name.upper())
+
+        self.assertEqual(cache(T.author.name, child), ('AUTHOR.NAME', []))
+        self.assertEqual(cache.hits, 0)
+
+    def test_compile_cache_uncacheable(self):
+        cache = CompileCache()
+        child = compile.create_child()
+
+        @child.when(int)
+        def compile_int(compile, expr, state):
+            state.sql.append('%s')
+            state.params.append(str(expr))
+
+        self.assertEqual(cache(T.author.id == 1, child), ('"author"."id" = %s', ['1']))
+        self.assertEqual(cache(T.author.id == 2, child), ('"author"."id" = %s', ['2']))
+        self.assertEqual(cache.hits, 0)
+        self.assertEqual(len(cache), 1)
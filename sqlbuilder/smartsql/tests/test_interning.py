@@ -0,0 +1,65 @@
+from sqlbuilder.smartsql.tests.base import TestCase
+from sqlbuilder.smartsql import Constant, Field, Interner, Name, Q, Table, compile, func
+
+__all__ = ('TestInterner', )
+
+
+class TestInterner(TestCase):
+
+    def build(self, value):
+        a, b = Table('author'), Table('book')
+        return Q().tables(
+            (a & b).on(b.author_id == a.id)
+        ).fields(
+            a.id, a.name, func.Count(b.id).as_('book_count')
+        ).where(
+            a.status == value
+        ).order_by(a.name)
+
+    def test_shared(self):
+        intern = Interner()
+        q1, q2 = self.build('active'), self.build('blocked')
+        sql1, sql2 = compile(q1), compile(q2)
+        self.assertIs(intern(q1), q1)
+        self.assertIs(intern(q2), q2)
+        self.assertEqual(compile(q1), sql1)
+        self.assertEqual(compile(q2), sql2)
+        self.assertIs(q1._fields.data[0], q2._fields.data[0])
+        self.assertIs(q1._fields.data[1], q2._order_by.data[0].expr)
+        self.assertIs(q1._tables._left._table, q2._tables._left._table)
+        self.assertIs(q1._fields.data[2].sql, q2._fields.data[2].sql)
+        self.assertIsNot(q1._where, q2._where)
+
+    def test_leaf(self):
+        intern = Interner()
+        self.assertIs(intern(Name('author')), intern(Name('author')))
+        self.assertIs(intern(Constant('NOW')), intern(Constant('NOW')))
+        self.assertIsNot(intern(Name('author')), intern(Name('book')))
+        field = intern(Table('author').id)
+        self.assertIs(intern(Table('author').id), field)
+        self.assertIs(intern(Field('id', Table('author'))), field)
+        self.assertIsNot(intern(Table('book').id), field)
+        self.assertEqual(len(intern), 8)
+
+    def test_not_interned(self):
+
+        class Author(Table):
+            pass
+
+        intern = Interner()
+        self.assertIsNot(intern(Author('author')), intern(Author('author')))
+        self.assertIsNot(intern(Table('author', [Field('id')])), intern(Table('author', [Field('id')])))
+        self.assertIsNot(intern(Table('author').as_('a')), intern(Table('author').as_('a')))
+
+    def test_deep(self):
+        intern = Interner()
+        expr = Table('author').age
+        for i in range(5000):
+            expr = expr + i
+        sql = compile(expr)
+        self.assertIs(intern(expr), expr)
+        self.assertEqual(compile(expr), sql)
+        node = expr
+        while hasattr(node, 'left'):
+            node = node.left
+        self.assertIs(node, intern(Table('author').age))
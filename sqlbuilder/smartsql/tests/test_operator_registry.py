@@ -0,0 +1,64 @@
+from sqlbuilder.smartsql.tests.base import TestCase
+from sqlbuilder.smartsql import T, Add, BaseType, Binary, Field, OperatorRegistry, compile
+from sqlbuilder.smartsql.constants import OPERATOR
+
+__all__ = ('TestOperatorRegistry', )
+
+
+class TextType(BaseType):
+    pass
+
+
+class CitextType(TextType):
+    pass
+
+
+class TestOperatorRegistry(TestCase):
+
+    def test_hierarchy(self):
+        registry = OperatorRegistry()
+        registry.register(OPERATOR.ADD, (BaseType, BaseType), BaseType, Add)
+        self.assertEqual(registry.get(OPERATOR.ADD, (CitextType, BaseType)), (BaseType, Add))
+        registry.register(OPERATOR.ADD, (TextType, BaseType), TextType, Binary)
+        self.assertEqual(registry.get(OPERATOR.ADD, (CitextType, BaseType)), (TextType, Binary))
+        self.assertEqual(registry.get(OPERATOR.ADD, (BaseType, CitextType)), (BaseType, Add))
+
+    def test_default(self):
+        registry = OperatorRegistry()
+        result_type, factory = registry.get('@@', (TextType, BaseType))
+        self.assertIs(result_type, BaseType)
+        self.assertIs(registry.get('@@', (TextType, BaseType))[1], factory)
+        self.assertIs(registry.get('@@', (BaseType, BaseType))[1], factory)
+        self.assertEqual(compile(factory(T.author.name, 'a')), ('"author"."name" @@ %s', ['a']))
+        registry.register('@@', (TextType, BaseType), TextType, Add)
+        self.assertEqual(registry.get('@@', (TextType, BaseType)), (TextType, Add))
+
+    def test_child(self):
+        parent = OperatorRegistry()
+        child = parent.create_child()
+        grandchild = child.create_child()
+        self.assertIs(grandchild.get(OPERATOR.ADD, (TextType, BaseType))[0], BaseType)
+        parent.register(OPERATOR.ADD, (TextType, BaseType), TextType, Add)
+        self.assertEqual(grandchild.get(OPERATOR.ADD, (TextType, BaseType)), (TextType, Add))
+        child.register(OPERATOR.ADD, (CitextType, BaseType), CitextType, Binary)
+        self.assertEqual(grandchild.get(OPERATOR.ADD, (CitextType, BaseType)), (CitextType, Binary))
+        self.assertEqual(parent.get(OPERATOR.ADD, (CitextType, BaseType)), (TextType, Add))
+
+    def test_max_resolved(self):
+        registry = OperatorRegistry()
+        registry.max_resolved = 3
+        types = (BaseType, TextType, CitextType)
+        for left in types:
+            for right in types:
+                registry.get(OPERATOR.ADD, (left, right))
+        self.assertEqual(sum(len(entries) for entries in registry._resolved.values()), 3)
+        self.assertEqual(registry.get(OPERATOR.ADD, (CitextType, CitextType))[0], BaseType)
+        registry.register(OPERATOR.ADD, (TextType, BaseType), TextType, Add)
+        self.assertEqual(registry._resolved, {})
+        self.assertEqual(registry.get(OPERATOR.ADD, (CitextType, CitextType)), (TextType, Add))
+        self.assertEqual(len(registry._resolved[OPERATOR.ADD]), 1)
+
+    def test_datatype_subclass(self):
+        field = Field('name', T.author, TextType)
+        self.assertEqual(compile(field.like('a%')), ('"author"."name" LIKE %s', ['a%']))
+        self.assertIsInstance(field + 1, Add)
@@ -3,7 +3,10 @@ import datetime
 from collections import OrderedDict
 from sqlbuilder.smartsql.tests.base import TestCase
 
-from sqlbuilder.smartsql import Q, T, F, func, FieldList, ExprList, Result, TableAlias, TableJoin, compile
+from sqlbuilder.smartsql import (
+    Q, T, F, func, FieldList, ExprList, Result, SelectCount, Set, Intersect, Union, TableAlias, TableJoin,
+    compile, fingerprint
+)
 from sqlbuilder.smartsql.dialects.mysql import compile as mysql_compile
 
 __all__ = ('TestQuery', 'TestResult', )
@@ -514,6 +517,45 @@ class TestQuery(TestCase):
             ('SELECT "author"."id", (SELECT COUNT("book"."id") FROM "book" WHERE "book"."pub_date" > %s AND "book"."author_id" = "author"."id" GROUP BY "book"."author_id") AS "book_count" FROM "author" WHERE "author"."status" = %s ORDER BY "book_count" DESC', ['2015-01-01', 'active'])
         )
 
+    def test_clone(self):
+        a = T.author
+        q = Q(a).fields(a.id).where(a.status == 'active').order_by(a.name)
+        q2 = q.fields(a.name).limit(10)
+        self.assertIs(q2._where, q._where)
+        self.assertIs(q2._order_by, q._order_by)
+        self.assertIsNot(q2._fields, q._fields)
+        self.assertIsNot(q2.result, q.result)
+        self.assertEqual(compile(q), ('SELECT "author"."id" FROM "author" WHERE "author"."status" = %s ORDER BY "author"."name" ASC', ['active']))
+        self.assertEqual(
+            compile(q2),
+            ('SELECT "author"."id", "author"."name" FROM "author" WHERE "author"."status" = %s ORDER BY "author"."name" ASC LIMIT %s', ['active', 10])
+        )
+
+    def test_clauses(self):
+        a = T.author
+        q = Q(a)
+        self.assertFalse(hasattr(q, '__dict__'))
+        self.assertIsNone(q._fields)
+        self.assertEqual(compile(q), ('SELECT  FROM "author"', []))
+        q2 = q.order_by(a.name).order_by(reset=True)
+        self.assertIsNone(q2._order_by)
+        self.assertEqual(compile(q2), compile(q))
+        self.assertEqual(fingerprint(q2), fingerprint(q))
+        self.assertEqual(len(q.group_by()), 0)
+        q.group_by().append(a.status)
+        self.assertEqual(compile(q.fields(a.id)), ('SELECT "author"."id" FROM "author" GROUP BY "author"."status"', []))
+        self.assertEqual(compile(SelectCount(q)), (
+            'SELECT COUNT(1) AS "count_value" FROM (SELECT  FROM "author" GROUP BY "author"."status") AS "count_list"', []
+        ))
+        s = Set(q.fields(a.id), q.fields(a.name), op='UNION')
+        self.assertEqual(s.sql, 'UNION')
+        self.assertIsNone(q.as_set().sql)
+        self.assertEqual(s.union(q.fields(a.age)).sql, 'UNION')
+        u = Union(q.fields(a.id), q.fields(a.name), op='UNION ALL')
+        self.assertEqual(compile(u)[0], '(SELECT "author"."id" FROM "author" GROUP BY "author"."status") UNION ALL '
+                                        '(SELECT "author"."name" FROM "author" GROUP BY "author"."status")')
+        self.assertEqual(Intersect(q, q).sql, 'INTERSECT')
+
 
 class TestResult(TestCase):
 
@@ -542,3 +584,17 @@ class TestResult(TestCase):
         q3 = q.find_by_name('John')
         self.assertIsNot(q3, q)
         self.assertEqual(q3.select(), ('SELECT `author`.`id`, `author`.`name` FROM `author` WHERE `author`.`name` = %s', ['John']))
+
+    def test_defaults(self):
+
+        class MysqlResult(Result):
+            compile = mysql_compile
+
+        class MysqlQuery(Q):
+            result = MysqlResult()
+
+        q = MysqlQuery(T.author).fields(T.author.id)
+        self.assertIsInstance(q.result, MysqlResult)
+        self.assertEqual(q.select(), ('SELECT `author`.`id` FROM `author`', []))
+        self.assertEqual(Q(T.author).fields(T.author.id).select(), ('SELECT "author"."id" FROM "author"', []))
+        self.assertIs(Result().compile, compile)
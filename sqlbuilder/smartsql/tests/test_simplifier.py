@@ -0,0 +1,101 @@
+from sqlbuilder.smartsql.tests.base import TestCase
+from sqlbuilder.smartsql import And, Case, Eq, Or, Parentheses, Q, T, compile, func, simplify
+
+__all__ = ('TestSimplifier', )
+
+
+class TestSimplifier(TestCase):
+
+    def test_and_or(self):
+        a = T.author
+        self.assertEqual(
+            compile(simplify(((a.id == 1) & True) | False)),
+            ('"author"."id" = %s', [1])
+        )
+        self.assertIs(simplify((a.id == 1) & False), False)
+        self.assertIs(simplify((a.id == 1) | True), True)
+        self.assertIs(simplify(And(True, True)), True)
+        self.assertEqual(
+            compile(simplify((a.id == 1) | (a.id == 2) | (a.id == 1))),
+            ('"author"."id" = %s OR "author"."id" = %s', [1, 2])
+        )
+        self.assertEqual(
+            compile(simplify(Or(a.id == 1, a.id == 1))),
+            ('"author"."id" = %s', [1])
+        )
+
+    def test_not(self):
+        a = T.author
+        self.assertEqual(compile(simplify(~~(a.id == 1))), ('"author"."id" = %s', [1]))
+        self.assertEqual(compile(simplify(~~~(a.id == 1))), ('NOT "author"."id" = %s', [1]))
+        self.assertIs(simplify(~(a.id.in_([]))), True)
+
+    def test_in(self):
+        a = T.author
+        self.assertEqual(compile(simplify(a.id.in_([5]))), ('"author"."id" = %s', [5]))
+        self.assertEqual(compile(simplify(a.id.not_in((5,)))), ('"author"."id" <> %s', [5]))
+        self.assertIs(simplify(a.id.in_([])), False)
+        self.assertIs(simplify(a.id.not_in([])), True)
+        expr = a.id.in_([1, 2])
+        self.assertIs(simplify(expr), expr)
+
+    def test_case(self):
+        a = T.author
+        expr = Case([(False, 'a'), (a.age < 18, 'child'), (True, 'adult'), (a.age > 60, 'old')])
+        self.assertEqual(
+            compile(simplify(expr)),
+            ('CASE WHEN ("author"."age" < %s) THEN %s ELSE %s END ', [18, 'child', 'adult'])
+        )
+        self.assertEqual(simplify(Case([(False, 'a'), (True, 'b')])), 'b')
+        self.assertIs(simplify(Case([(a.id.in_([]), 'a')])), None)
+        expr = Case([(1, 'a')], a.age)
+        self.assertIs(simplify(expr), expr)
+
+    def test_select(self):
+        a = T.author
+        q = Q(a).fields(a.id).where(a.id.not_in([]) & True)
+        self.assertEqual(compile(simplify(q)), ('SELECT "author"."id" FROM "author"', []))
+        self.assertEqual(
+            compile(q),
+            ('SELECT "author"."id" FROM "author" WHERE "author"."id" NOT IN () AND %s', [True])
+        )
+        q = Q(a).fields(a.id).where(a.id.in_([]))
+        self.assertEqual(compile(simplify(q)), ('SELECT "author"."id" FROM "author" WHERE %s', [False]))
+        q = Q(a).fields(a.id).where(a.id > 1)
+        self.assertIs(simplify(q), q)
+
+    def test_nested(self):
+        a = T.author
+        expr = a.name.like(Parentheses(a.status.in_(['active']) & True))
+        self.assertEqual(
+            compile(simplify(expr)),
+            ('"author"."name" LIKE ("author"."status" = %s)', ['active'])
+        )
+        self.assertEqual(compile(expr), ('"author"."name" LIKE ("author"."status" IN (%s) AND %s)', ['active', True]))
+        self.assertEqual(
+            compile(simplify(func.Coalesce(a.id, 1) + (Case([(True, 1)])))),
+            ('COALESCE("author"."id", %s) + %s', [1, 1])
+        )
+
+    def test_apply(self):
+        a = T.author
+        result, removed = simplify.apply((a.id == 1) & True)
+        self.assertEqual(compile(result), ('"author"."id" = %s', [1]))
+        self.assertEqual(removed, 2)
+        expr = a.id == 1
+        result, removed = simplify.apply(expr)
+        self.assertIs(result, expr)
+        self.assertEqual(removed, 0)
+        result, removed = simplify.apply(a.id.in_([5]))
+        self.assertIsInstance(result, Eq)
+        self.assertEqual(removed, 1)
+
+    def test_deep(self):
+        a = T.author
+        expr = a.id == 0
+        for i in range(1, 5000):
+            expr = (expr & (a.id == i)) if i % 2 else (expr | (a.id == i))
+        self.assertIs(simplify(expr | False), expr)
+        sql, params = compile(simplify(expr | (a.id.in_([1]) & False)))
+        self.assertEqual(sql, compile(expr)[0])
+        self.assertEqual(len(params), 5000)
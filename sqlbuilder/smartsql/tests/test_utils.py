@@ -1,3 +1,4 @@
+import threading
 from sqlbuilder.smartsql.tests.base import TestCase
 from sqlbuilder.smartsql.utils import AutoName
 
@@ -13,3 +14,17 @@ class TestAutoName(TestCase):
         for i in range(length):
             unique_names.add(next(auto_name))
         self.assertEqual(len(unique_names), length)
+
+    def test_autoname_threads(self):
+        auto_name = AutoName()
+        names = []
+
+        def worker():
+            names.extend([next(auto_name) for i in range(1000)])
+
+        workers = [threading.Thread(target=worker) for _ in range(4)]
+        for worker_thread in workers:
+            worker_thread.start()
+        for worker_thread in workers:
+            worker_thread.join()
+        self.assertEqual(len(set(names)), 4000)
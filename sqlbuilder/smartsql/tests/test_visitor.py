@@ -0,0 +1,132 @@
+from sqlbuilder.smartsql.tests.base import TestCase
+from sqlbuilder.smartsql import (
+    Case, Field, Name, Operable, Param, Q, T, Table, Transformer, Visitor, children, compile, func, replace, walk
+)
+
+__all__ = ('TestWalk', 'TestVisitor', 'TestTransformer', )
+
+
+class TestWalk(TestCase):
+
+    def test_children(self):
+        a = T.author
+        expr = a.age > 18
+        self.assertEqual(children(expr), [('left', a.age), ('right', 18)])
+        self.assertEqual(children([1, 2]), [(0, 1), (1, 2)])
+        self.assertEqual(children(Name('author')), [])
+
+    def test_walk(self):
+        a = T.author
+        expr = (a.age > 18) & Case([(a.status == 'active', 1)], default=0)
+        self.assertEqual(
+            [type(node).__name__ for node in walk(expr) if not isinstance(node, Name)],
+            ['And', 'Gt', 'Field', 'Table', 'int', 'Case', 'UndefType', 'Eq', 'Field', 'str', 'int', 'int']
+        )
+
+    def test_shared(self):
+        a = T.author
+        cond = (a.age > 18) & (a.status == 'active')
+        q = Q(a).fields(a.id).where(cond | ~cond)
+        self.assertEqual(len([node for node in walk(q) if node is cond]), 1)
+        nodes = [node for node in walk(q) if isinstance(node, (Operable, Table))]
+        self.assertEqual(len(nodes), len(set(map(id, nodes))))
+
+    def test_leaves(self):
+        a = T.author
+        expr = (a.x == 5) & (a.y == 5) & (a.name == 'a') & (a.title == 'a')
+        self.assertEqual([node for node in walk(expr) if isinstance(node, (int, str))], [5, 5, 'a', 'a'])
+        self.assertEqual([node for node in walk(expr) if isinstance(node, (int, str))], compile(expr)[1])
+
+    def test_deep(self):
+        expr = T.author.age
+        for i in range(10000):
+            expr = expr + i
+        self.assertEqual(len([node for node in walk(expr) if isinstance(node, int)]), 10000)
+
+
+class TestVisitor(TestCase):
+
+    def test_visitor(self):
+        collect_tables = Visitor()
+
+        @collect_tables.when(Table)
+        def collect_table(visitor, node, state):
+            state.append(node)
+
+        a, b, c = Table('author'), Table('book'), Table('category')
+        q = Q((a & b).on(b.author_id == a.id)).fields(a.id, func.Count(b.id)).where(b.category_id.in_(Q(c).fields(c.id)))
+        self.assertEqual([t._name.name for t in collect_tables(q, [])], ['author', 'book', 'category'])
+
+    def test_params(self):
+        collect_params = Visitor()
+
+        @collect_params.when(Param)
+        def collect_param(visitor, node, state):
+            state.append(node.params)
+
+        a = T.author
+        q = Q(a).fields(a.id).where((a.age > Param(18)) & (a.status == Param('active')))
+        self.assertEqual(collect_params(q, []), [18, 'active'])
+
+
+class TestTransformer(TestCase):
+
+    def setUp(self):
+        self.rename = Transformer()
+
+        @self.rename.when(Field)
+        def rename_field(transformer, node):
+            if node._name.name == 'age':
+                return replace(node, _name=Name('years'))
+            return node
+
+    def test_transformer(self):
+        a = T.author
+        q = Q(a).fields(a.id, a.age).where((a.age > 18) & (a.status == 'active')).order_by(a.name)
+        sql = compile(q)
+        result = self.rename(q)
+        self.assertEqual(
+            compile(result),
+            ('SELECT "author"."id", "author"."years" FROM "author" WHERE "author"."years" > %s AND "author"."status" = %s '
+             'ORDER BY "author"."name" ASC', [18, 'active'])
+        )
+        self.assertEqual(compile(q), sql)
+        self.assertIs(result._order_by, q._order_by)
+        self.assertIs(result._where.data[1], q._where.data[1])
+        self.assertIsNot(result._where, q._where)
+
+    def test_unchanged(self):
+        a = T.author
+        q = Q(a).fields(a.id).where(a.status == 'active')
+        self.assertIs(self.rename(q), q)
+
+    def test_shared(self):
+        a = T.author
+        cond = a.age > 18
+        result = self.rename((cond & (a.id == 1)) | cond)
+        self.assertIs(result.data[0].data[0], result.data[1])
+
+    def test_containers(self):
+        increment = Transformer()
+
+        @increment.when(int)
+        def increment_int(transformer, node):
+            return node + 1
+
+        a = T.author
+        expr = a.id.in_((1, 2)) & Case([(a.age > 1, 2)], default=3)
+        self.assertEqual(
+            compile(increment(expr)),
+            ('"author"."id" IN (%s, %s) AND CASE WHEN ("author"."age" > %s) THEN %s ELSE %s END ', [2, 3, 2, 3, 4])
+        )
+        self.assertEqual(compile(expr)[1], [1, 2, 1, 2, 3])
+
+    def test_deep(self):
+        expr = T.author.age
+        for i in range(10000):
+            expr = expr + i
+        result = self.rename(expr)
+        node = result
+        while hasattr(node, 'left'):
+            node = node.left
+        self.assertEqual(node._name.name, 'years')
@@ -1,4 +1,5 @@
 from __future__ import absolute_import
+import threading
 import warnings
 from functools import wraps
 
@@ -21,13 +22,16 @@ class AutoName(object):
     def __init__(self, prefix="_auto_"):
         self.counter = 0
         self.prefix = prefix
+        self._lock = threading.Lock()
 
     def __iter__(self):
         return self
 
     def __next__(self):
-        self.counter += 1
-        return "{0}{1}".format(self.prefix, self.counter)
+        with self._lock:
+            self.counter += 1
+            counter = self.counter
+        return "{0}{1}".format(self.prefix, counter)
 
     next = __next__
 
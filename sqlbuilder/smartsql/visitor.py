@@ -0,0 +1,227 @@
+"""Iterative traversal and rewriting of expression trees, see Visitor and Transformer."""
+from __future__ import absolute_import
+import copy
+import threading
+from sqlbuilder.smartsql.pycompat import string_types
+
+__all__ = ('Children', 'Visitor', 'Transformer', 'children', 'walk', 'replace', 'copy_node', )
+
+
+class _Dispatcher(object):
+    """Registry of handlers per class, which are looked up by MRO, like in Compiler."""
+
+    def __init__(self):
+        self._registry = {}
+        self._handlers = {}
+        self._lock = threading.Lock()
+
+    def when(self, cls):
+        def deco(func):
+            with self._lock:
+                registry = dict(self._registry)
+                registry[cls] = func
+                self._registry = registry
+                self._handlers = {}
+            return func
+        return deco
+
+    def get_handler(self, cls):
+        """Returns handler of cls, or None if the handler is not registered."""
+        handlers = self._handlers
+        try:
+            return handlers[cls]
+        except KeyError:
+            pass
+        registry = self._registry  # is replaced on registration, like in Compiler
+        handler = None
+        for c in cls.__mro__:
+            if c in registry:
+                handler = registry[c]
+                break
+        handlers[cls] = handler
+        return handler
+
+
+class Children(_Dispatcher):
+    """Protocol of child enumeration.
+
+    Handler returns the names of attributes, which keep the children of node.
+    Lists and tuples are enumerated by items. Nodes without handler, like Name or parameters, are leaves.
+    Attributes of other state, like caches or Result of Query, are not children.
+    """
+
+    def __call__(self, node):
+        """Returns list of tuples (name, child) of node, where name is index for list or tuple."""
+        cls = node.__class__
+        if cls is list or cls is tuple:
+            return list(enumerate(node))
+        try:
+            handler = self._handlers[cls]
+        except KeyError:
+            handler = self.get_handler(cls)
+        if handler is None:
+            return []
+        return [(name, getattr(node, name)) for name in handler(self, node)]
+
+
+children = Children()
+
+
+def walk(expr, children=children):
+    """Yields nodes of expr in pre-order, every shared node is yielded once.
+
+    Traversal is iterative, so deep chains of operators don't exhaust the stack.
+    Lists and tuples are traversed, but not yielded.
+    Only expressions, tables, joins and queries are deduplicated, other leaves, like parameters,
+    are yielded for each occurrence, like they are compiled, even if equal ints or strings are the same object.
+    """
+    from sqlbuilder.smartsql.expressions import Operable
+    from sqlbuilder.smartsql.queries import Modify
+    from sqlbuilder.smartsql.tables import Table, TableJoin
+    node_types = (Operable, Table, TableJoin, Modify)
+    seen = set()
+    stack = [expr]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, node_types):
+            if id(node) in seen:
+                continue
+            seen.add(id(node))
+        cls = node.__class__
+        if cls is not list and cls is not tuple:
+            yield node
+        stack.extend(child for name, child in reversed(children(node)))
+
+
+class Visitor(_Dispatcher):
+    """Calls the registered handlers for nodes of expression.
+
+    Handlers are registered in the same way as for Compiler, and have signature handler(visitor, node, state).
+    Nodes without handler are just traversed. For example::
+
+        collect_tables = Visitor()
+
+        @collect_tables.when(Table)
+        def collect_table(visitor, node, state):
+            state.append(node)
+
+        tables = collect_tables(query, [])
+    """
+
+    def __init__(self, children=children):
+        _Dispatcher.__init__(self)
+        self.children = children
+
+    def __call__(self, expr, state=None):
+        """Visits nodes of expr in pre-order and returns state."""
+        handlers = self._handlers
+        for node in walk(expr, self.children):
+            cls = node.__class__
+            try:
+                handler = handlers[cls]
+            except KeyError:
+                handler = self.get_handler(cls)
+            if handler is not None:
+                handler(self, node, state)
+        return state
+
+
+class Transformer(_Dispatcher):
+    """Rewrites expression by the registered handlers, the given expression is not changed.
+
+    Handler has signature handler(transformer, node) and returns replacement of node.
+    Nodes are handled in post-order, so node is passed with the already transformed children.
+    Only the nodes along the paths to changed nodes are copied, other nodes are shared with the given expression.
+    Every shared node is transformed once.
+    """
+
+    def __init__(self, children=children):
+        _Dispatcher.__init__(self)
+        self.children = children
+
+    def __call__(self, expr):
+        """Returns transformed expr."""
+        children = self.children
+        results = {}
+        stack = [(expr, None)]
+        while stack:
+            node, items = stack.pop()
+            key = id(node)
+            if key in results:
+                continue
+            if items is None:
+                items = children(node)
+                stack.append((node, items))
+                stack.extend((child, None) for name, child in reversed(items) if id(child) not in results)
+                continue
+            changes = [(name, results[id(child)]) for name, child in items if results[id(child)] is not child]
+            cls = node.__class__
+            if changes and (cls is list or cls is tuple):
+                items = list(node)
+                for i, value in changes:
+                    items[i] = value
+                node = cls(items)
+            elif changes:
+                node = replace(node, **dict(changes))
+            try:
+                handler = self._handlers[cls]
+            except KeyError:
+                handler = self.get_handler(cls)
+            results[key] = node if handler is None else handler(self, node)
+        return results[id(expr)]
+
+
+def replace(obj, **attrs):
+    """Returns copy of obj with the given attributes.
+
+    Nodes with __copy__() are copied by it, other nodes are copied by copy_node(). Caches of the copy are reset.
+    """
+    dup = copy.copy(obj) if hasattr(type(obj), '__copy__') else copy_node(obj)
+    if isinstance(getattr(dup, '__cached__', None), dict):
+        dup.__cached__ = {}
+    for name, value in attrs.items():
+        setattr(dup, name, value)
+    return dup
+
+
+def copy_node(obj):
+    """Returns shallow copy of obj, without the memoized structural key and without calling __copy__().
+
+    Slots are copied by their descriptors, since subclasses shadow some slots by class attributes, like Eq.sql.
+    It's much cheaper than copy.copy() of slotted object, so __copy__() of nodes can use it.
+    """
+    cls = type(obj)
+    try:
+        descriptors, has_dict = _descriptors[cls]
+    except KeyError:
+        descriptors, has_dict = _descriptors[cls] = _get_descriptors(cls), cls.__dictoffset__ != 0
+    dup = cls.__new__(cls)
+    for get, set in descriptors:
+        try:
+            set(dup, get(obj))
+        except AttributeError:  # unset slot
+            pass
+    if has_dict:
+        dup.__dict__.update(obj.__dict__)
+    return dup
+
+
+_descriptors = {}
+
+
+def _get_descriptors(cls):
+    descriptors = []
+    for c in cls.__mro__:
+        slots = c.__dict__.get('__slots__', ())
+        if isinstance(slots, string_types):
+            slots = (slots,)
+        for name in slots:
+            if name in ('__dict__', '__weakref__', '__structural__'):
+                continue  # The memoized structural key is not copied, see Fingerprinter.key().
+            if name.startswith('__') and not name.endswith('__'):
+                name = '_{0}{1}'.format(c.__name__.lstrip('_'), name)
+            descriptor = c.__dict__[name]
+            if getattr(cls, name, descriptor) is not descriptor:
+                continue  # The slot is shadowed by class attribute of subclass, like Eq.sql.
+            descriptors.append((descriptor.__get__, descriptor.__set__))
+    return tuple(descriptors)